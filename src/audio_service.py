@@ -0,0 +1,367 @@
+"""
+kettlebrain app
+audio_service.py
+
+Low-latency alert playback. The WAVs in assets/ are decoded once into PCM and
+each output device gets its own worker thread that keeps one `aplay` process
+open, reading raw PCM from a pipe. An alert is then a queue put plus a pipe
+write instead of a fork/exec and a file open on every beep.
+
+play() never blocks. A request for a sound that is already queued or still
+audible on the same device is collapsed, so nag repeats and back-to-back
+step alerts don't stack up. Request-to-first-write latency is recorded per
+play for stats()/summary().
+
+Only the configured device keeps its stream open. A worker for any other
+device (the Settings test button) closes its aplay after IDLE_CLOSE_S, so it
+doesn't hold that ALSA hw device busy, and configure() retires the workers
+of a device that is no longer selected.
+"""
+
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import wave
+from collections import deque, namedtuple
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+QUEUE_SIZE = 8
+CHUNK_FRAMES = 2048         # frames per pipe write; small so the first write lands quickly
+LATENCY_SAMPLES = 200
+IDLE_CLOSE_S = 10.0         # a non-configured device's stream closes after this long idle
+APLAY_BUFFER_US = 200000    # aplay --buffer-time; aplay only plays whole periods of it
+TAIL_PAD_S = 0.25           # silence after each clip (> one buffer) pushes its last period out
+
+Clip = namedtuple("Clip", "name channels sampwidth rate pcm duration wav_bytes")
+
+# wave sample width (bytes) -> aplay -f format
+_APLAY_FORMATS = {1: "U8", 2: "S16_LE", 3: "S24_3LE", 4: "S32_LE"}
+
+_STOP = None
+
+
+def load_clip(path):
+    """Decodes a WAV file into a Clip (raw PCM plus its format)."""
+    with wave.open(path, "rb") as w:
+        channels = w.getnchannels()
+        sampwidth = w.getsampwidth()
+        rate = w.getframerate()
+        pcm = w.readframes(w.getnframes())
+    wav_bytes = None
+    if sys.platform == 'win32':
+        with open(path, "rb") as f:
+            wav_bytes = f.read()
+    duration = len(pcm) / float(channels * sampwidth * rate) if rate else 0.0
+    # The stream never sees EOF, so a partial last period would sit in aplay and
+    # play in front of the next alert; pad with silence (U8 silence is 0x80)
+    pad_frames = int(rate * TAIL_PAD_S)
+    pcm += (b"\x80" if sampwidth == 1 else b"\x00") * (pad_frames * channels * sampwidth)
+    return Clip(os.path.basename(path), channels, sampwidth, rate, pcm, duration, wav_bytes)
+
+
+class AudioService:
+    def __init__(self, device="default", sound="alert.wav", assets_dir=ASSETS_DIR):
+        self.assets_dir = assets_dir
+        self.device = device or "default"
+        self.sound = sound
+
+        self._clips = {}
+        self._clip_lock = threading.Lock()
+        self._workers = {}              # device -> _DeviceWorker
+        self._lock = threading.Lock()
+        self.available = True           # False once aplay turns out to be missing
+
+        # --- STATS ---
+        self.played = 0
+        self.collapsed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+        # Decode everything off the caller's thread; play() loads on demand if it gets there first
+        threading.Thread(target=self.preload_all, name="AudioPreload", daemon=True).start()
+
+    def configure(self, device=None, sound=None):
+        """Applies the alert_sound_file / audio_device settings."""
+        if device is not None:
+            self.device = device or "default"
+        if sound is not None:
+            self.sound = sound
+        with self._lock:
+            stale = [w for d, w in self._workers.items() if d != self.device]
+            for worker in stale:
+                del self._workers[worker.device]
+        for worker in stale:
+            worker.retire()
+        # Open the stream now so the first real alert doesn't pay for the spawn
+        self._worker(self.device).warm(self.sound)
+
+    # --- CLIPS ---
+
+    def preload_all(self):
+        try:
+            names = sorted(n for n in os.listdir(self.assets_dir) if n.lower().endswith(".wav"))
+        except OSError:
+            return
+        for name in names:
+            self.get_clip(name)
+
+    def get_clip(self, name):
+        """Cached decoded clip, or None if the file is missing or unreadable."""
+        clip = self._clips.get(name)
+        if clip is not None:
+            return clip
+        with self._clip_lock:
+            if name in self._clips:
+                return self._clips[name]
+            path = os.path.join(self.assets_dir, name)
+            try:
+                clip = load_clip(path) if os.path.exists(path) else None
+            except (wave.Error, EOFError, OSError) as e:
+                print(f"[Audio] Could not decode {name}: {e}")
+                clip = None
+            self._clips[name] = clip
+            return clip
+
+    # --- PRODUCER API ---
+
+    def play(self, sound=None, device=None):
+        """
+        Queues a sound (default: the configured alert) on a device (default: the
+        configured one). Returns False if it was collapsed into one already
+        queued/playing, or dropped.
+        """
+        if not self.available:
+            return False
+        sound = sound or self.sound
+        device = device or self.device
+        requested_at = time.monotonic()
+        for _ in (1, 2):
+            queued = self._worker(device).submit(sound, requested_at)
+            if queued is not None:
+                return queued
+            # Raced with that worker retiring; the retry gets a fresh one
+        return False
+
+    def _worker(self, device):
+        worker = self._workers.get(device)
+        if worker is None:
+            with self._lock:
+                worker = self._workers.get(device)
+                if worker is None:
+                    worker = _DeviceWorker(self, device)
+                    self._workers[device] = worker
+        return worker
+
+    def _retire_idle(self, worker):
+        """Called by an idle worker; True if it may close its stream and exit."""
+        with self._lock:
+            with worker._lock:
+                if worker.device == self.device or not worker._queue.empty():
+                    return False
+                worker._retired = True
+            if self._workers.get(worker.device) is worker:
+                del self._workers[worker.device]
+        return True
+
+    def close(self, timeout=2.0):
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers = {}
+        for worker in workers:
+            worker.stop(timeout)
+
+    # --- REPORTING ---
+
+    def _record_latency(self, seconds):
+        self.played += 1
+        self._latencies.append(seconds)
+
+    def stats(self):
+        lat = sorted(self._latencies)
+        n = len(lat)
+        return {
+            "played": self.played,
+            "collapsed": self.collapsed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "latency_p50_ms": lat[n // 2] * 1000.0 if n else None,
+            "latency_p95_ms": lat[min(n - 1, int(n * 0.95))] * 1000.0 if n else None,
+            "latency_max_ms": lat[-1] * 1000.0 if n else None,
+        }
+
+    def summary(self):
+        s = self.stats()
+        text = f"{s['played']} played, {s['collapsed']} collapsed, {s['dropped']} dropped, {s['errors']} errors"
+        if s["played"]:
+            text += (f", latency p50 {s['latency_p50_ms']:.1f} ms"
+                     f" / p95 {s['latency_p95_ms']:.1f} ms / max {s['latency_max_ms']:.1f} ms")
+        return text
+
+
+class _DeviceWorker:
+    """One thread + one persistent aplay stream per output device."""
+
+    def __init__(self, service, device):
+        self.service = service
+        self.device = device
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._pending = set()           # sounds queued, not yet started
+        self._audible_until = {}        # sound -> monotonic time its playback ends
+        self._lock = threading.Lock()
+        self._retired = False           # no new requests; exit once the queue is empty
+
+        self._proc = None
+        self._proc_format = None
+
+        self._thread = threading.Thread(target=self._run, name=f"Audio[{device}]", daemon=True)
+        self._thread.start()
+
+    def submit(self, sound, requested_at):
+        """True if queued, False if collapsed or dropped, None if this worker is retired."""
+        with self._lock:
+            if self._retired:
+                return None
+            if sound in self._pending or self._audible_until.get(sound, 0.0) > requested_at:
+                self.service.collapsed += 1
+                return False
+            try:
+                self._queue.put_nowait((sound, requested_at))
+            except queue.Full:
+                self.service.dropped += 1
+                return False
+            self._pending.add(sound)
+        return True
+
+    def warm(self, sound):
+        """Decodes sound and opens the stream in its format, without playing anything."""
+        if self._retired:
+            return
+        try:
+            self._queue.put_nowait((sound, None))
+        except queue.Full:
+            pass
+
+    def retire(self):
+        """Finishes what is queued, then closes the stream and exits. Never blocks."""
+        with self._lock:
+            self._retired = True
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass                        # _run sees _retired once the queue drains
+
+    def stop(self, timeout):
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # --- WORKER ---
+
+    def _run(self):
+        while True:
+            if self._retired and self._queue.empty():
+                self._close_stream()
+                return
+            idle_timeout = None if self.device == self.service.device else IDLE_CLOSE_S
+            try:
+                item = self._queue.get(timeout=idle_timeout)
+            except queue.Empty:
+                if self.service._retire_idle(self):
+                    self._close_stream()
+                    print(f"[Audio] Closed idle stream on {self.device}")
+                    return
+                continue
+            if item is _STOP:
+                self._close_stream()
+                return
+            sound, requested_at = item
+            try:
+                clip = self.service.get_clip(sound)
+                if clip is None:
+                    continue
+                if requested_at is None:
+                    if sys.platform != 'win32':
+                        self._stream((clip.channels, clip.sampwidth, clip.rate))
+                    continue
+                with self._lock:
+                    self._pending.discard(sound)
+                    self._audible_until[sound] = time.monotonic() + clip.duration
+                self._play(clip, requested_at)
+            except FileNotFoundError:
+                # No aplay on this host (dev box): say so once instead of on every alert
+                self.service.available = False
+                print("[Audio] aplay not found, alert sounds disabled")
+            except Exception as e:
+                self.service.errors += 1
+                print(f"[Audio] Playback error on {self.device}: {e}")
+            finally:
+                if requested_at is not None:
+                    with self._lock:
+                        self._pending.discard(sound)
+
+    def _play(self, clip, requested_at):
+        if sys.platform == 'win32':
+            import winsound
+            # SND_MEMORY can't be combined with SND_ASYNC; this thread is ours to block
+            self.service._record_latency(time.monotonic() - requested_at)
+            winsound.PlaySound(clip.wav_bytes, winsound.SND_MEMORY)
+            return
+
+        fmt = (clip.channels, clip.sampwidth, clip.rate)
+        for attempt in (1, 2):
+            try:
+                stream = self._stream(fmt)
+                self._write(stream, clip, requested_at)
+                return
+            except FileNotFoundError:
+                raise
+            except (BrokenPipeError, OSError) as e:
+                # aplay died (device unplugged, format rejected): respawn once
+                self._close_stream()
+                if attempt == 2:
+                    raise e
+
+    def _write(self, stream, clip, requested_at):
+        step = CHUNK_FRAMES * clip.channels * clip.sampwidth
+        pcm = clip.pcm
+        stream.write(pcm[:step])
+        stream.flush()
+        self.service._record_latency(time.monotonic() - requested_at)
+        for i in range(step, len(pcm), step):
+            stream.write(pcm[i:i + step])
+        stream.flush()
+
+    def _stream(self, fmt):
+        if self._proc is not None and self._proc.poll() is None and self._proc_format == fmt:
+            return self._proc.stdin
+        self._close_stream()
+        channels, sampwidth, rate = fmt
+        cmd = ["aplay", "-q", "-t", "raw", "-f", _APLAY_FORMATS.get(sampwidth, "S16_LE"),
+               "-c", str(channels), "-r", str(rate), f"--buffer-time={APLAY_BUFFER_US}"]
+        if self.device != "default":
+            cmd.extend(["-D", self.device])
+        cmd.append("-")
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._proc_format = fmt
+        print(f"[Audio] Stream opened on {self.device} ({rate} Hz, {channels} ch)")
+        return self._proc.stdin
+
+    def _close_stream(self):
+        proc = self._proc
+        self._proc = None
+        self._proc_format = None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=3.0)
+        except Exception:
+            proc.kill()
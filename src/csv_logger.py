@@ -0,0 +1,216 @@
+"""
+kettlebrain app
+csv_logger.py
+
+Background CSV logger. The control thread only enqueues row tuples; a worker
+thread owns the open file, formats timestamps, flushes on a cadence, rotates
+by size/age and gzips files once they are closed.
+
+Files live in kettlebrain-data/logs/, one per brew session:
+    session-<session_id>.csv, session-<session_id>-part2.csv, ...
+"""
+
+import csv
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+LOG_DIR_NAME = "logs"
+CSV_COLUMNS = ["Timestamp", "Mode", "Status", "Temp(F)", "Target(F)", "Power(W)", "Step", "Timer"]
+
+DEFAULT_FLUSH_INTERVAL = 10.0       # seconds between flushes of the open file
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024  # rotate a session file after 5 MB
+DEFAULT_MAX_AGE = 24 * 3600.0       # ... or after 24 hours
+QUEUE_SIZE = 2000
+
+# Queue message kinds
+_ROW = 0
+_START = 1
+_END = 2
+_STOP = 3
+
+
+class CsvSessionLogger:
+    def __init__(self, data_dir, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, compress=True):
+        self.log_dir = os.path.join(data_dir, LOG_DIR_NAME)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+
+        self.dropped_rows = 0
+
+        # Worker-thread state
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._file = None
+        self._writer = None
+        self._path = None
+        self._session = None
+        self._part = 1
+        self._opened_at = 0.0
+        self._last_flush = 0.0
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="CsvSessionLogger", daemon=True)
+        self._thread.start()
+
+    # --- PRODUCER API (control thread) ---
+
+    def start_session(self, session_id, metadata=None):
+        """Begins a new session file. metadata is written as '# key: value' lines."""
+        self._put((_START, (session_id, dict(metadata or {}))))
+
+    def log(self, row):
+        """
+        Enqueues one row: (epoch, mode, status, temp, target, watts, step, timer).
+        Never blocks; rows are dropped (and counted) if the writer falls behind.
+        """
+        try:
+            self._queue.put_nowait((_ROW, row))
+        except queue.Full:
+            self.dropped_rows += 1
+
+    def end_session(self):
+        self._put((_END, None))
+
+    def close(self, timeout=5.0):
+        self._put((_STOP, None))
+        self._thread.join(timeout)
+
+    def _put(self, item):
+        # Control messages must not be lost; wait briefly for room.
+        try:
+            self._queue.put(item, timeout=1.0)
+        except queue.Full:
+            print("[CsvLogger] Queue full, control message dropped")
+
+    # --- WORKER ---
+
+    def _run(self):
+        while True:
+            try:
+                kind, payload = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._flush_if_due()
+                continue
+
+            try:
+                if kind == _ROW:
+                    self._write_row(payload)
+                elif kind == _START:
+                    self._close_file()
+                    self._session = payload
+                    self._part = 1
+                    self._open_file()
+                elif kind == _END:
+                    self._close_file()
+                    self._session = None
+                elif kind == _STOP:
+                    self._close_file()
+                    return
+                self._flush_if_due()
+            except Exception as e:
+                print(f"[CsvLogger] Error: {e}")
+
+    def _write_row(self, row):
+        if self._session is None:
+            return
+        if self._file is None:
+            self._open_file()
+        elif self._should_rotate():
+            self._close_file()
+            self._part += 1
+            self._open_file()
+
+        epoch, mode, status, temp, target, watts, step_info, timer_str = row
+        self._writer.writerow([
+            datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S"),
+            mode,
+            status,
+            f"{temp:.2f}" if temp else "0.00",
+            f"{target:.0f}",
+            watts,
+            step_info,
+            timer_str
+        ])
+
+    def _should_rotate(self):
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        if self.max_age and (time.monotonic() - self._opened_at) >= self.max_age:
+            return True
+        return False
+
+    def _open_file(self):
+        session_id, meta = self._session
+        suffix = "" if self._part == 1 else f"-part{self._part}"
+        self._path = os.path.join(self.log_dir, f"session-{session_id}{suffix}.csv")
+
+        self._file = open(self._path, 'a', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._opened_at = time.monotonic()
+        self._last_flush = self._opened_at
+
+        if self._file.tell() == 0:
+            self._file.write(f"# session_id: {session_id}\n")
+            self._file.write(f"# part: {self._part}\n")
+            self._file.write(f"# opened: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            for key, value in meta.items():
+                if isinstance(value, (dict, list)):
+                    value = json.dumps(value, separators=(',', ':'))
+                self._file.write(f"# {key}: {value}\n")
+            self._writer.writerow(CSV_COLUMNS)
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        path = self._path
+        try:
+            self._file.close()
+        finally:
+            self._file = None
+            self._writer = None
+            self._path = None
+        if self.compress:
+            self._gzip(path)
+
+    def _flush_if_due(self):
+        if self._file is None:
+            return
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    @staticmethod
+    def _gzip(path):
+        try:
+            with open(path, 'rb') as src, _create_exclusive(path[:-len(".csv")]) as raw, \
+                    gzip.GzipFile(fileobj=raw, mode='wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except Exception as e:
+            print(f"[CsvLogger] Could not compress {os.path.basename(path)}: {e}")
+
+
+def _create_exclusive(stem):
+    """
+    Creates <stem>.csv.gz (binary) without replacing an existing archive. On a
+    collision the session id gets a -2, -3, ... suffix (before any -partN).
+    """
+    head, sep, part = stem.rpartition("-part")
+    if not sep or not part.isdigit():
+        head, sep, part = stem, "", ""
+    n = 1
+    while True:
+        name = f"{head}{sep}{part}.csv.gz" if n == 1 else f"{head}-{n}{sep}{part}.csv.gz"
+        try:
+            return open(name, 'xb')
+        except FileExistsError:
+            n += 1
@@ -0,0 +1,242 @@
+"""
+kettlebrain app
+device_discovery.py
+
+Background discovery of 1-Wire temperature probes and ALSA playback devices.
+The scans (a sysfs glob and `aplay -l`) run on this module's thread and their
+results are cached, so the settings screen reads lists instead of waiting on
+a subprocess.
+
+Changes are picked up two ways:
+    inotify     /sys/bus/w1/devices, /proc/asound and /dev/snd via ctypes, so
+                a USB sound card appears as soon as udev creates its nodes
+    polling     a cheap listdir() fingerprint of the same directories every
+                POLL_INTERVAL seconds; sysfs and procfs don't report most
+                kernel-side changes through inotify, and non-Linux hosts have
+                no inotify at all
+
+A full rescan only runs when a source's fingerprint changes. Listeners get
+(kind, devices) from the discovery thread when a list actually differs.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+
+SENSORS = "sensors"
+AUDIO = "audio"
+
+POLL_INTERVAL = 3.0
+SETTLE_DELAY = 0.5      # udev creates a card's nodes one by one; let them land
+
+# source -> directories whose listing changes when devices come and go
+WATCH_DIRS = {
+    SENSORS: ["/sys/bus/w1/devices"],
+    AUDIO: ["/proc/asound", "/dev/snd"],
+}
+
+# <sys/inotify.h>
+_IN_ATTRIB = 0x004
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_WATCH_MASK = _IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+
+class _Inotify:
+    """Minimal ctypes inotify. Raises OSError if the platform doesn't have it."""
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is Linux-only")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}   # watch descriptor -> source
+
+    def watch(self, path, source):
+        wd = self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            return False
+        self.watches[wd] = source
+        return True
+
+    def drain(self):
+        """Reads all pending events; returns the set of sources they belong to."""
+        sources = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 4096)
+            except OSError:   # EAGAIN once the queue is empty
+                return sources
+            if not buf:
+                return sources
+            # struct inotify_event { int wd; uint32 mask, cookie, len; char name[len]; }
+            offset = 0
+            while offset + 16 <= len(buf):
+                wd = int.from_bytes(buf[offset:offset + 4], sys.byteorder, signed=True)
+                name_len = int.from_bytes(buf[offset + 12:offset + 16], sys.byteorder)
+                if wd in self.watches:
+                    sources.add(self.watches[wd])
+                offset += 16 + name_len
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class DeviceDiscovery:
+    def __init__(self, hardware_interface, poll_interval=POLL_INTERVAL):
+        self.hw = hardware_interface
+        self.poll_interval = poll_interval
+
+        # Cached results; replaced (never mutated) so readers need no lock
+        self.sensors = []
+        self.audio_devices = [("Default (System)", "default")]
+        self.scans = {SENSORS: 0, AUDIO: 0}
+
+        self._scanners = {
+            SENSORS: self.hw.scan_available_sensors,
+            AUDIO: self.hw.scan_audio_devices,
+        }
+        self._fingerprints = {}
+        self._listeners = []
+        self._stop = False
+        self._force = set()
+        self._lock = threading.Lock()
+
+        self._inotify = None
+        try:
+            self._inotify = _Inotify()
+            for source, dirs in WATCH_DIRS.items():
+                for path in dirs:
+                    if os.path.isdir(path):
+                        self._inotify.watch(path, source)
+        except (OSError, AttributeError) as e:
+            print(f"[Discovery] inotify unavailable ({e}), polling every {poll_interval:.0f}s")
+            self._inotify = None
+
+        # Self-pipe so refresh()/close() wake the select() immediately
+        self._wake_r, self._wake_w = (os.pipe() if self._inotify else (None, None))
+        self._wake_event = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name="DeviceDiscovery", daemon=True)
+        self._thread.start()
+
+    # --- PUBLIC API ---
+
+    def subscribe(self, callback):
+        """callback(kind, devices) is called on the discovery thread when a list changes."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def refresh(self, kind=None):
+        """Forces a rescan (e.g. after toggling dev mode) without waiting for the next poll."""
+        with self._lock:
+            self._force.update([kind] if kind else self._scanners.keys())
+        self._wake()
+
+    def close(self, timeout=2.0):
+        self._stop = True
+        self._wake()
+        self._thread.join(timeout)
+        if self._inotify:
+            self._inotify.close()
+            for fd in (self._wake_r, self._wake_w):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+    # --- WORKER ---
+
+    def _wake(self):
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"x")
+            except OSError:
+                pass
+        self._wake_event.set()
+
+    def _wait(self):
+        """Blocks until an inotify event, a wake-up or the poll interval. Returns sources flagged by inotify."""
+        if not self._inotify:
+            self._wake_event.wait(self.poll_interval)
+            self._wake_event.clear()
+            return set()
+
+        ready, _, _ = select.select([self._inotify.fd, self._wake_r], [], [], self.poll_interval)
+        if self._wake_r in ready:
+            try:
+                os.read(self._wake_r, 512)
+            except OSError:
+                pass
+        if self._inotify.fd in ready:
+            if self._stop:
+                return set()
+            time.sleep(SETTLE_DELAY)
+            return self._inotify.drain()
+        return set()
+
+    def _run(self):
+        self._scan_all(set(self._scanners))
+        while not self._stop:
+            notified = self._wait()
+            if self._stop:
+                return
+            with self._lock:
+                forced = self._force
+                self._force = set()
+            self._scan_all(notified | forced)
+
+    def _fingerprint(self, source):
+        parts = [self.hw.is_dev_mode()]
+        for path in WATCH_DIRS[source]:
+            try:
+                parts.append(tuple(sorted(os.listdir(path))))
+            except OSError:
+                parts.append(None)
+        return tuple(parts)
+
+    def _scan_all(self, forced):
+        for source, scanner in self._scanners.items():
+            fp = self._fingerprint(source)
+            if source not in forced and self._fingerprints.get(source) == fp:
+                continue
+            self._fingerprints[source] = fp
+            try:
+                devices = list(scanner())
+            except Exception as e:
+                print(f"[Discovery] {source} scan failed: {e}")
+                continue
+            self.scans[source] += 1
+            self._publish(source, devices)
+
+    def _publish(self, source, devices):
+        if source == SENSORS:
+            if devices == self.sensors:
+                return
+            self.sensors = devices
+        else:
+            if devices == self.audio_devices:
+                return
+            self.audio_devices = devices
+        print(f"[Discovery] {source} changed: {len(devices)} found")
+        for callback in list(self._listeners):
+            try:
+                callback(source, devices)
+            except Exception as e:
+                print(f"[Discovery] Listener error: {e}")
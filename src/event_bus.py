@@ -0,0 +1,125 @@
+"""
+kettlebrain app
+event_bus.py
+
+In-process publish/subscribe for sequencer state changes. publish() never
+blocks the publisher (the control thread): every subscriber has its own
+bounded queue and, when a slow subscriber's queue is full, its oldest event
+is dropped and counted. Subscribers pick the kinds they want, so a consumer
+that only cares about status changes never sees the 10 Hz samples.
+
+Consumers either poll (drain() from a Kivy Clock tick), block (get() on
+their own thread), or pass notify= to be poked from the publishing thread
+when their queue goes from empty to non-empty.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+# --- EVENT KINDS ---
+STATUS_CHANGED = "status_changed"       # old, new (SequenceStatus)
+STEP_CHANGED = "step_changed"           # old, new (index), name
+PROFILE_LOADED = "profile_loaded"       # profile_id, name
+TEMP_REACHED = "temp_reached"           # step, temp_f
+ALERT_RAISED = "alert_raised"           # text
+ALERT_CLEARED = "alert_cleared"         # text
+RELAYS_CHANGED = "relays_changed"       # mask, watts
+SAMPLE = "sample"                       # temp_f, target_f, watts, relay_mask (every control tick)
+
+KINDS = (STATUS_CHANGED, STEP_CHANGED, PROFILE_LOADED, TEMP_REACHED,
+         ALERT_RAISED, ALERT_CLEARED, RELAYS_CHANGED, SAMPLE)
+
+DEFAULT_QUEUE_SIZE = 256
+
+Event = namedtuple("Event", "kind seq ts data")
+
+
+class Subscription:
+    def __init__(self, bus, name, kinds, maxsize, notify):
+        self.bus = bus
+        self.name = name
+        self.kinds = frozenset(kinds) if kinds else None
+        self.notify = notify
+        self.dropped = 0
+        self.delivered = 0
+        self._queue = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def wants(self, kind):
+        return self.kinds is None or kind in self.kinds
+
+    def _put(self, event):
+        with self._cond:
+            was_empty = not self._queue
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(event)
+            self.delivered += 1
+            self._cond.notify()
+        if was_empty and self.notify is not None:
+            try:
+                self.notify()
+            except Exception as e:
+                print(f"[EventBus] {self.name} notify failed: {e}")
+
+    def drain(self):
+        """Returns (and removes) every queued event, oldest first. Never blocks."""
+        with self._cond:
+            events = list(self._queue)
+            self._queue.clear()
+        return events
+
+    def get(self, timeout=None):
+        """Next event, waiting up to timeout seconds; None on timeout or close."""
+        with self._cond:
+            if not self._queue and not self.closed:
+                self._cond.wait(timeout)
+            return self._queue.popleft() if self._queue else None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class EventBus:
+    def __init__(self):
+        self._subs = ()             # replaced on (un)subscribe so publish iterates without a lock
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.published = {}         # kind -> count
+
+    def subscribe(self, name, kinds=None, maxsize=DEFAULT_QUEUE_SIZE, notify=None):
+        """kinds: iterable of event kinds (None = everything)."""
+        sub = Subscription(self, name, kinds, maxsize, notify)
+        with self._lock:
+            self._subs = self._subs + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+
+    def publish(self, kind, **data):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            subs = self._subs
+        self.published[kind] = self.published.get(kind, 0) + 1
+        event = None
+        for sub in subs:
+            if sub.wants(kind):
+                if event is None:
+                    event = Event(kind, seq, time.time(), data)
+                sub._put(event)
+        return event
+
+    def summary(self):
+        parts = [f"{kind} {n}" for kind, n in sorted(self.published.items())]
+        for sub in self._subs:
+            if sub.dropped:
+                parts.append(f"{sub.name} dropped {sub.dropped}")
+        return ", ".join(parts) if parts else "no events"
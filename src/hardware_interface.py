@@ -1,11 +1,16 @@
 """
 src/hardware_interface.py
 Handles sensor readings and the "Developer Mode" simulation logic.
+
+A DS18B20 conversion blocks its reader for ~750 ms, so the physical probe is
+read on its own thread and read_temperature() returns the latest smoothed
+value without waiting. The control thread stays free to run UI commands.
 """
 import random
 import os
 import glob
 import sys
+import threading
 import time
 from collections import deque
 
@@ -13,6 +18,9 @@ from collections import deque
 MOCK_TEMP_F = 70.0
 MOCK_SENSOR_IDS = ["28-MOCK-TEMP001"]
 
+SENSOR_POLL_S = 0.25    # minimum gap between probe reads (a real read takes longer)
+SENSOR_STALE_S = 5.0    # a reading older than this counts as a failed sensor
+
 class HardwareInterface:
     def __init__(self, settings_mgr):
         self.settings = settings_mgr
@@ -23,6 +31,11 @@ class HardwareInterface:
         
         # SMOOTHING: Buffer for last 5 readings
         self._temp_buffer = deque(maxlen=5)
+
+        # Latest (smoothed temp or None, monotonic time) from the sensor thread
+        self._latest = (None, 0.0)
+        self._sensor_thread = None
+        self._sensor_stop = threading.Event()
         
         if self._dev_mode_active:
             print("[HARDWARE] Developer Mode Active (Virtual Sensors).")
@@ -118,14 +131,27 @@ class HardwareInterface:
 
     def read_temperature(self):
         """
-        Returns the SMOOTHED temperature in Fahrenheit.
+        Returns the SMOOTHED temperature in Fahrenheit. Never blocks.
         Returns None if sensor is missing/error.
         """
         if self._dev_mode_active:
-            raw_val = self._virtual_temp
-        else:
-            raw_val = self._read_physical_sensor()
-            
+            return self._smooth(self._virtual_temp)
+
+        if self._sensor_thread is None:
+            self._sensor_thread = threading.Thread(target=self._sensor_loop, name="TempSensor", daemon=True)
+            self._sensor_thread.start()
+
+        temp_f, read_at = self._latest
+        if time.monotonic() - read_at > SENSOR_STALE_S:
+            return None
+        return temp_f
+
+    def close(self, timeout=2.0):
+        self._sensor_stop.set()
+        if self._sensor_thread is not None:
+            self._sensor_thread.join(timeout)
+
+    def _smooth(self, raw_val):
         if raw_val is not None:
             self._temp_buffer.append(raw_val)
             # Return the average of the buffer
@@ -133,6 +159,15 @@ class HardwareInterface:
             
         return None
 
+    def _sensor_loop(self):
+        while not self._sensor_stop.is_set():
+            started = time.monotonic()
+            if not self._dev_mode_active:
+                raw_val = self._read_physical_sensor()
+                # Replace the tuple whole so readers never see a torn pair
+                self._latest = (self._smooth(raw_val), time.monotonic())
+            self._sensor_stop.wait(max(0.0, SENSOR_POLL_S - (time.monotonic() - started)))
+
     def _read_physical_sensor(self):
         sensor_id = self.settings.get_system_setting("temp_sensor_id", "unassigned")
         if not sensor_id or sensor_id == "unassigned":
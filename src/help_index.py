@@ -0,0 +1,148 @@
+"""
+kettlebrain app
+help_index.py
+
+Parsed, searchable view of assets/help.txt. The file is split into its
+[SECTION: name] blocks once and cached by path + mtime, so opening Help only
+costs a stat() unless the file changed. An inverted index over each section's
+plain text (markup stripped, titles weighted up) answers searches with
+TF-IDF ranked sections; the last query word also matches as a prefix so
+results update while typing.
+"""
+
+import bisect
+import math
+import os
+import re
+from collections import namedtuple
+
+HelpSection = namedtuple("HelpSection", "name title body text")
+SearchHit = namedtuple("SearchHit", "name title score snippet")
+
+TITLE_WEIGHT = 8
+SNIPPET_CHARS = 70
+
+_MARKUP_RE = re.compile(r"\[/?[a-z_]+(?:=[^\]]*)?\]")
+_TITLE_RE = re.compile(r"\[size=2\d\]\[b\](?:\[color=[0-9a-fA-F]+\])?(.*?)\[/")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_cache = {}   # path -> (mtime, HelpIndex)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def strip_markup(text):
+    return _MARKUP_RE.sub("", text)
+
+
+def get_help_index(path):
+    """Returns the cached HelpIndex for path, re-parsing only if the file's mtime changed."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    if mtime is None:
+        raw_text = "[SECTION: main]\nHelp file (assets/help.txt) not found."
+    else:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                raw_text = f.read()
+        except Exception as e:
+            raw_text = f"[SECTION: main]\nError reading help file: {e}"
+
+    index = HelpIndex(raw_text)
+    _cache[path] = (mtime, index)
+    return index
+
+
+class HelpIndex:
+    def __init__(self, raw_text):
+        self.sections = {}
+        self.postings = {}      # token -> {section name: weighted term count}
+        self._parse(raw_text)
+        self._build_index()
+        self._tokens = sorted(self.postings)
+
+    def _parse(self, text):
+        for part in text.split('[SECTION:'):
+            if not part.strip():
+                continue
+            try:
+                header, content = part.split(']', 1)
+            except ValueError:
+                continue
+            name = header.strip()
+            body = content.strip()
+            match = _TITLE_RE.search(body)
+            title = strip_markup(match.group(1)).strip() if match else name
+            self.sections[name] = HelpSection(name, title, body, strip_markup(body))
+
+    def _build_index(self):
+        for name, section in self.sections.items():
+            counts = {}
+            for tok in tokenize(section.text):
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok in tokenize(section.title):
+                counts[tok] = counts.get(tok, 0) + TITLE_WEIGHT
+            for tok, n in counts.items():
+                self.postings.setdefault(tok, {})[name] = n
+
+    def get(self, name):
+        return self.sections.get(name)
+
+    def _expand(self, term, prefix):
+        """Index tokens matching term (exact, or every token starting with it)."""
+        if not prefix:
+            return [term] if term in self.postings else []
+        i = bisect.bisect_left(self._tokens, term)
+        out = []
+        while i < len(self._tokens) and self._tokens[i].startswith(term):
+            out.append(self._tokens[i])
+            i += 1
+        return out
+
+    def search(self, query, limit=10):
+        """Ranked SearchHits. Sections must match every query word."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        n_sections = len(self.sections) or 1
+
+        scores = None
+        for pos, term in enumerate(terms):
+            term_scores = {}
+            for tok in self._expand(term, prefix=(pos == len(terms) - 1)):
+                posting = self.postings[tok]
+                idf = math.log(n_sections / len(posting)) + 1.0
+                for name, tf in posting.items():
+                    term_scores[name] = term_scores.get(name, 0.0) + (1.0 + math.log(tf)) * idf
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {name: s + term_scores[name] for name, s in scores.items() if name in term_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda kv: -kv[1])[:limit]
+        return [SearchHit(name, self.sections[name].title, score, self._snippet(name, terms))
+                for name, score in ranked]
+
+    def _snippet(self, name, terms):
+        text = self.sections[name].text
+        lower = text.lower()
+        at = -1
+        for term in terms:
+            at = lower.find(term)
+            if at != -1:
+                break
+        if at == -1:
+            at = 0
+        start = max(0, at - SNIPPET_CHARS // 2)
+        snippet = " ".join(text[start:start + SNIPPET_CHARS].split())
+        return ("..." if start else "") + snippet + "..."
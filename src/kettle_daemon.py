@@ -0,0 +1,487 @@
+"""
+kettlebrain app
+kettle_daemon.py
+
+Headless control core: SettingsManager, HardwareInterface, RelayControl and
+SequenceManager without Kivy, controlled over a local UNIX socket. Suits a
+headless Pi such as a Zero 2 W. The touchscreen app (main.py) runs its own
+control core rather than acting as a client of this one, so only one of the
+two can run at a time: both take the relay control lock on startup.
+
+Protocol: one JSON object per line in each direction.
+    -> {"id": 1, "cmd": "load_profile", "args": {"profile_id": "..."}}
+    <- {"id": 1, "ok": true, "result": ...}
+    <- {"id": 1, "ok": false, "error": "..."}
+
+"subscribe" turns the connection into an event stream (see event_bus.py):
+    -> {"cmd": "subscribe", "args": {"kinds": ["status_changed", "sample"]}}
+    <- {"ok": true, "result": "subscribed"}
+    <- {"event": "status_changed", "seq": 12, "ts": ..., "data": {"old": "IDLE", "new": "RUNNING"}}
+Use another connection for commands while streaming. "help" lists commands.
+
+CLI (run from src/):
+    python kettle_daemon.py serve
+    python kettle_daemon.py serve --http 8080        # also run the HTTP/WebSocket API
+    python kettle_daemon.py call status
+    python kettle_daemon.py call load_profile profile_id=<id>
+    python kettle_daemon.py call set_manual_target temp_f=152
+    python kettle_daemon.py watch --kinds status_changed,step_changed
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from enum import Enum
+
+import event_bus
+from log_query import default_data_dir
+
+SOCKET_NAME = "kettlebrain.sock"
+SOCKET_MODE = 0o660
+MAX_LINE = 64 * 1024
+
+# Without an explicit kinds list a subscriber gets every change but not the 10 Hz samples
+DEFAULT_STREAM_KINDS = tuple(k for k in event_bus.KINDS if k != event_bus.SAMPLE)
+
+
+def default_socket_path():
+    return os.path.join(default_data_dir(), SOCKET_NAME)
+
+
+def _json_default(value):
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(obj):
+    return (json.dumps(obj, default=_json_default, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def status_snapshot(seq):
+    """Everything a remote display needs for one frame, as plain JSON types."""
+    profile = seq.current_profile
+    step_name = ""
+    if profile and 0 <= seq.current_step_index < len(profile.steps):
+        step_name = profile.steps[seq.current_step_index].name
+    return {
+        "status": seq.status.value,
+        "message": seq.get_status_message(),
+        "profile_id": profile.id if profile else None,
+        "profile_name": profile.name if profile else None,
+        "step_index": seq.current_step_index,
+        "step_name": step_name,
+        "temp_f": seq.current_temp,
+        "target_f": seq.get_target_temp(),
+        "temp_reached": seq.temp_reached,
+        "watts": seq.current_watts,
+        "relays": dict(seq.relay.relay_states),
+        "timer": seq.get_display_timer(),
+        "elapsed": seq.get_global_elapsed_time_str(),
+        "alert": seq.current_alert_text,
+        "upcoming": seq.get_upcoming_additions(),
+        "manual_running": seq.is_manual_running,
+        "kwh": seq.total_watt_seconds / 3600000.0,
+    }
+
+
+class CommandError(Exception):
+    pass
+
+
+class ControlCommands:
+    """
+    The remote command set (cmd_* methods), shared by the socket daemon and
+    web_api.py. Sequencer calls are control commands, so they are applied on
+    the control thread whichever thread dispatches them.
+    """
+
+    def __init__(self, settings_manager, sequencer):
+        self.settings = settings_manager
+        self.sequencer = sequencer
+
+    def dispatch(self, cmd, args):
+        method = getattr(self, f"cmd_{cmd}", None) if isinstance(cmd, str) else None
+        if method is None:
+            raise CommandError(f"Unknown command: {cmd}")
+        if not isinstance(args, dict):
+            raise CommandError("args must be an object")
+        try:
+            return method(**args)
+        except TypeError as e:
+            raise CommandError(f"{cmd}: {e}")
+
+    # --- COMMANDS ---
+
+    def cmd_help(self):
+        """List commands."""
+        names = sorted(n[4:] for n in dir(self) if n.startswith("cmd_"))
+        return {n: (getattr(self, f"cmd_{n}").__doc__ or "").strip() for n in names}
+
+    def cmd_ping(self):
+        """Liveness check."""
+        return "pong"
+
+    def cmd_status(self):
+        """Current state snapshot."""
+        return status_snapshot(self.sequencer)
+
+    def cmd_profiles(self):
+        """Saved profiles (id, name)."""
+        return [{"id": pid, "name": name} for pid, name in self.settings.list_profiles()]
+
+    def cmd_schedule(self):
+        """Projected step ready/end times (epoch) and energy for the loaded profile."""
+        sched = self.sequencer.get_schedule()
+        if sched is None:
+            return None
+        return {
+            "end_epoch": sched.end_epoch,
+            "energy_kwh": sched.energy_kwh,
+            "steps": [step._asdict() for step in sched.steps],
+        }
+
+    def cmd_load_profile(self, profile_id):
+        """Stop whatever is running and load a saved profile (profile_id)."""
+        profile = self.settings.get_profile_by_id(profile_id)
+        if profile is None:
+            raise CommandError(f"No profile with id {profile_id}")
+        self.sequencer.stop()
+        self.sequencer.load_profile(profile)
+        return profile.name
+
+    def cmd_start(self):
+        """Start the loaded profile."""
+        if not self.sequencer.current_profile:
+            raise CommandError("No profile loaded")
+        self.sequencer.start_sequence()
+
+    def cmd_pause(self):
+        """Pause the step timer; heaters keep holding temperature (use emergency_stop to cut power)."""
+        self.sequencer.pause_sequence()
+
+    def cmd_resume(self):
+        """Resume a paused profile or acknowledge an alert."""
+        self.sequencer.resume_sequence()
+
+    def cmd_advance(self):
+        """Skip to the next step."""
+        self.sequencer.advance_step()
+
+    def cmd_reset(self):
+        """Reset the loaded profile to step 1."""
+        self.sequencer.reset_profile()
+
+    def cmd_stop(self):
+        """Stop and return to idle (relays off)."""
+        self.sequencer.stop()
+
+    def cmd_emergency_stop(self):
+        """Cut heater power immediately."""
+        self.sequencer.emergency_cut_power()
+
+    def cmd_manual(self):
+        """Enter manual mode."""
+        self.sequencer.stop()
+        self.sequencer.enter_manual_mode()
+
+    def cmd_manual_start(self):
+        """Start heating in manual mode."""
+        self.sequencer.start_manual()
+
+    def cmd_manual_pause(self):
+        """Freeze the manual timer; heaters keep holding temperature (before the target is reached this resets manual mode instead)."""
+        self.sequencer.pause_manual()
+
+    def cmd_set_manual_target(self, temp_f):
+        """Manual target temperature (temp_f)."""
+        self.sequencer.set_manual_target(float(temp_f))
+
+    def cmd_set_manual_power(self, watts):
+        """Manual power limit (watts)."""
+        self.sequencer.set_manual_power(int(watts))
+
+    def cmd_set_manual_timer(self, minutes):
+        """Manual timer duration (minutes)."""
+        self.sequencer.set_manual_timer_duration(float(minutes))
+
+    def cmd_toggle_manual_timer(self):
+        """Start/stop the manual timer."""
+        self.sequencer.toggle_manual_timer()
+
+
+class KettleDaemon:
+    """Owns the control core and serves ControlCommands on the socket."""
+
+    def __init__(self, root_dir, socket_path=None, http_port=None):
+        # Backend only: importing these never pulls in Kivy
+        from settings_manager import SettingsManager, data_dir_for
+        from hardware_interface import HardwareInterface
+        from relay_control import RelayControl, acquire_control_lock
+        from sequence_manager import SequenceManager
+
+        # Raises ControlLockHeld if the touchscreen app or another daemon owns the relays.
+        # Taken before SettingsManager, whose load rewrites the settings file.
+        self._control_lock = acquire_control_lock(data_dir_for(root_dir))
+        self.settings = SettingsManager(root_dir)
+        self.hw = HardwareInterface(self.settings)
+        self.relay = RelayControl(self.settings)
+        self.sequencer = SequenceManager(self.settings, self.relay, self.hw)
+        # Same initial state as the touchscreen app: manual mode, heater off
+        self.sequencer.enter_manual_mode()
+        self.commands = ControlCommands(self.settings, self.sequencer)
+
+        self.socket_path = socket_path or os.path.join(self.settings.data_dir, SOCKET_NAME)
+        self.server = None
+        self._stopped = threading.Event()
+
+        # HTTP + WebSocket API: the enable_web_api setting, or --http PORT
+        self.web_api = None
+        if http_port or self.settings.get_system_setting("enable_web_api", False):
+            from web_api import WebApi, DEFAULT_HOST
+            self.web_api = WebApi(
+                self.settings, self.sequencer,
+                self.settings.get_system_setting("web_api_host", DEFAULT_HOST),
+                http_port or self.settings.get_system_setting("web_api_port", 8080),
+                self.settings.get_system_setting("web_api_token", "")
+            )
+
+    # --- SERVER ---
+
+    def serve_forever(self):
+        self._remove_stale_socket()
+        self.server = _Server(self.socket_path, _Handler)
+        self.server.daemon = self
+        os.chmod(self.socket_path, SOCKET_MODE)
+        print(f"[Daemon] Listening on {self.socket_path}")
+        if self.web_api:
+            self.web_api.start()
+        try:
+            self.server.serve_forever(poll_interval=0.5)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        print("[Daemon] Shutting down...")
+        if self.web_api:
+            self.web_api.close()
+            print(f"[Daemon] Web API: {self.web_api.summary()}")
+        if self.server:
+            self.server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+        from sequence_manager import SHUTDOWN_WAIT_S
+        try:
+            self.sequencer.submit("shutdown").result(SHUTDOWN_WAIT_S)
+        except Exception as e:
+            print(f"[Daemon] Sequencer shutdown incomplete: {e}")
+        self.relay.stop_all()
+        self.sequencer.audio.close()
+        self.hw.close()
+        self._control_lock.close()
+        print(f"[Daemon] Control commands: {self.sequencer.command_summary()}")
+        print(f"[Daemon] Sequencer events: {self.sequencer.events.summary()}")
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)     # left behind by a crash
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"Another daemon is already listening on {self.socket_path}")
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    daemon = None       # KettleDaemon, set after construction
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.daemon
+        while True:
+            line = self.rfile.readline(MAX_LINE)
+            if not line:
+                return
+            if not line.strip():
+                continue
+            req_id = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise CommandError("request must be an object")
+                req_id = request.get("id")
+                cmd = request.get("cmd")
+                args = request.get("args") or {}
+                if cmd == "subscribe":
+                    self._stream(daemon, req_id, args.get("kinds"))
+                    return
+                reply = {"id": req_id, "ok": True, "result": daemon.commands.dispatch(cmd, args)}
+            except (ValueError, CommandError) as e:
+                reply = {"id": req_id, "ok": False, "error": str(e)}
+            except Exception as e:
+                print(f"[Daemon] Command failed: {e}")
+                reply = {"id": req_id, "ok": False, "error": f"internal error: {e}"}
+            try:
+                self.wfile.write(encode(reply))
+            except OSError:
+                return
+
+    def _stream(self, daemon, req_id, kinds):
+        kinds = tuple(kinds) if kinds else DEFAULT_STREAM_KINDS
+        unknown = [k for k in kinds if k not in event_bus.KINDS]
+        if unknown:
+            raise CommandError(f"Unknown event kinds: {', '.join(unknown)}")
+        sub = daemon.sequencer.events.subscribe(f"socket-{self.request.fileno()}", kinds=kinds)
+        try:
+            self.wfile.write(encode({"id": req_id, "ok": True, "result": "subscribed"}))
+            while not daemon._stopped.is_set():
+                event = sub.get(timeout=1.0)
+                if event is None:
+                    continue
+                self.wfile.write(encode({"event": event.kind, "seq": event.seq,
+                                         "ts": event.ts, "data": event.data}))
+        except OSError:
+            pass    # client went away
+        finally:
+            sub.close()
+
+
+# --- CLIENT ---
+
+class KettleClientError(RuntimeError):
+    pass
+
+
+class KettleClient:
+    """Blocking client for the daemon socket (one request at a time)."""
+
+    def __init__(self, socket_path=None, timeout=10.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path or default_socket_path())
+        self._file = self.sock.makefile("rb")
+        self._next_id = 0
+
+    def call(self, cmd, **args):
+        self._next_id += 1
+        self.sock.sendall(encode({"id": self._next_id, "cmd": cmd, "args": args}))
+        reply = self._read()
+        if not reply.get("ok"):
+            raise KettleClientError(reply.get("error"))
+        return reply.get("result")
+
+    def events(self, kinds=None):
+        """Subscribes this connection and yields event dicts until it closes."""
+        self.call("subscribe", **({"kinds": list(kinds)} if kinds else {}))
+        self.sock.settimeout(None)
+        while True:
+            try:
+                yield self._read()
+            except KettleClientError:
+                return
+
+    def _read(self):
+        line = self._file.readline(MAX_LINE)
+        if not line:
+            raise KettleClientError("daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self._file.close()
+        self.sock.close()
+
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _default_root_dir():
+    """Same layout as main.py: data lives next to the project folder."""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.dirname(os.path.dirname(src_dir))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless KettleBrain control daemon and client.")
+    parser.add_argument("--socket", default=None, help="socket path (default: kettlebrain-data/kettlebrain.sock)")
+    sub = parser.add_subparsers(dest="action")
+    serve = sub.add_parser("serve", help="run the control core (default)")
+    serve.add_argument("--root", default=None, help="folder that holds kettlebrain-data (default: app location)")
+    serve.add_argument("--http", type=int, default=None, metavar="PORT", help="also serve web_api.py on PORT")
+    call = sub.add_parser("call", help="send one command and print the result")
+    call.add_argument("cmd")
+    call.add_argument("params", nargs="*", help="key=value (values parsed as JSON when possible)")
+    watch = sub.add_parser("watch", help="print sequencer events as they happen")
+    watch.add_argument("--kinds", default=None, help="comma separated event kinds")
+    args = parser.parse_args(argv)
+
+    if args.action in (None, "serve"):
+        from relay_control import ControlLockHeld
+        try:
+            daemon = KettleDaemon(getattr(args, "root", None) or _default_root_dir(), args.socket,
+                                  getattr(args, "http", None))
+        except ControlLockHeld as e:
+            print(f"Cannot start daemon: {e}", file=sys.stderr)
+            return 1
+
+        def handle_signal(signum, frame):
+            print(f"[Daemon] Caught Signal {signum}.")
+            if daemon.server is None:
+                daemon.shutdown()
+                sys.exit(0)
+            # serve_forever must be stopped from another thread
+            threading.Thread(target=daemon.server.shutdown, daemon=True).start()
+
+        for name in ("SIGTERM", "SIGINT", "SIGHUP"):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), handle_signal)
+        daemon.serve_forever()
+        return 0
+
+    try:
+        client = KettleClient(args.socket)
+    except OSError as e:
+        print(f"Cannot connect to daemon: {e}", file=sys.stderr)
+        return 1
+    try:
+        if args.action == "call":
+            params = dict(p.partition("=")[::2] for p in args.params)
+            result = client.call(args.cmd, **{k: _parse_value(v) for k, v in params.items()})
+            print(json.dumps(result, indent=2, default=_json_default))
+        else:
+            kinds = args.kinds.split(",") if args.kinds else None
+            for event in client.events(kinds):
+                print(json.dumps(event, default=_json_default), flush=True)
+    except KettleClientError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+"""
+kettlebrain app
+log_archive.py
+
+Compact long-term archive format (.kbla) for closed brew sessions.
+
+Each sample is bit-packed Gorilla-style:
+  - timestamps (ms) as delta-of-delta
+  - temperature (0.01 F), target (0.1 F) and power (1 W) as quantized deltas
+  - relay bitmask, status and step label as run-length encoded state
+Small deltas take 1-11 bits, and a steady state costs nothing until it
+changes, so a 10 Hz session shrinks by well over 10x compared to CSV text.
+
+Usage:
+    python log_archive.py convert <log.csv[.gz]> [out.kbla]
+    python log_archive.py dump <file.kbla>
+    python log_archive.py info <file.kbla>
+"""
+
+import csv
+import gzip
+import json
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+ARCHIVE_DIR_NAME = "archive"
+ARCHIVE_EXT = ".kbla"
+
+_MAGIC = b"KBLA"
+_VERSION = 1
+_PREAMBLE = struct.Struct("<4sBI")  # magic, version, header length
+READ_BLOCK = 64 * 1024              # iter_archive reads the body this much at a time
+
+# Quantization (stored integer = round(value * scale))
+TEMP_SCALE = 100
+TARGET_SCALE = 10
+WATTS_SCALE = 1
+
+ArchiveRecord = namedtuple(
+    "ArchiveRecord",
+    ["timestamp", "temp_f", "target_f", "watts", "relay_mask", "status", "label"]
+)
+
+
+# --- BIT I/O ---
+
+class BitWriter:
+    def __init__(self):
+        self._out = bytearray()
+        self._acc = 0
+        self._nbits = 0
+
+    def write(self, value, bits):
+        self._acc = (self._acc << bits) | value
+        self._nbits += bits
+        if self._nbits >= 64:
+            extra = self._nbits & 7
+            whole = self._nbits - extra
+            self._out += (self._acc >> extra).to_bytes(whole >> 3, 'big')
+            self._acc &= (1 << extra) - 1
+            self._nbits = extra
+
+    def getvalue(self):
+        pad = (-self._nbits) & 7
+        tail = (self._acc << pad).to_bytes((self._nbits + pad) >> 3, 'big')
+        return bytes(self._out) + tail
+
+
+class BitReader:
+    def __init__(self, data):
+        self._data = data
+        self._pos = 0
+
+    def read(self, bits):
+        pos = self._pos
+        first = pos >> 3
+        last = (pos + bits + 7) >> 3
+        chunk = int.from_bytes(self._data[first:last], 'big')
+        shift = ((last - first) << 3) - (pos & 7) - bits
+        self._pos = pos + bits
+        return (chunk >> shift) & ((1 << bits) - 1)
+
+
+class StreamBitReader(BitReader):
+    """BitReader over a file object, holding only the unread tail of one block."""
+
+    def __init__(self, f, block_size=READ_BLOCK):
+        super().__init__(b"")
+        self._f = f
+        self._block_size = block_size
+
+    def read(self, bits):
+        if (self._pos + bits + 7) >> 3 > len(self._data):
+            self._refill(bits)
+        return BitReader.read(self, bits)
+
+    def _refill(self, bits):
+        drop = self._pos >> 3
+        data = self._data[drop:]
+        self._pos -= drop << 3
+        need = (self._pos + bits + 7) >> 3
+        while len(data) < need:
+            block = self._f.read(self._block_size)
+            if not block:
+                raise ValueError("Truncated kettlebrain log archive")
+            data += block
+        self._data = data
+
+
+def _zigzag(v):
+    return (v << 1) if v >= 0 else ((-v << 1) - 1)
+
+
+def _unzigzag(z):
+    return (z >> 1) if not (z & 1) else -((z + 1) >> 1)
+
+
+def _write_delta(w, v):
+    """Gorilla-style buckets: 0 -> '0', then '10'+7, '110'+9, '1110'+12, '1111'+64 bits."""
+    z = _zigzag(v)
+    if z == 0:
+        w.write(0, 1)
+    elif z < 0x80:
+        w.write(0b10, 2)
+        w.write(z, 7)
+    elif z < 0x200:
+        w.write(0b110, 3)
+        w.write(z, 9)
+    elif z < 0x1000:
+        w.write(0b1110, 4)
+        w.write(z, 12)
+    else:
+        w.write(0b1111, 4)
+        w.write(z, 64)
+
+
+def _read_delta(r):
+    if not r.read(1):
+        return 0
+    if not r.read(1):
+        return _unzigzag(r.read(7))
+    if not r.read(1):
+        return _unzigzag(r.read(9))
+    if not r.read(1):
+        return _unzigzag(r.read(12))
+    return _unzigzag(r.read(64))
+
+
+def _write_varuint(w, n):
+    while n >= 0x80:
+        w.write(0x80 | (n & 0x7F), 8)
+        n >>= 7
+    w.write(n, 8)
+
+
+def _read_varuint(r):
+    shift = 0
+    n = 0
+    while True:
+        byte = r.read(8)
+        n |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return n
+        shift += 7
+
+
+# --- ENCODER ---
+
+def encode_records(records, meta=None):
+    """
+    Encodes an iterable of ArchiveRecord (timestamp order) into archive bytes.
+    Values are quantized: temp 0.01 F, target 0.1 F, power 1 W.
+    """
+    records = list(records)
+    strings = []
+    string_idx = {}
+
+    def intern(text):
+        text = text or ""
+        idx = string_idx.get(text)
+        if idx is None:
+            idx = string_idx[text] = len(strings)
+            strings.append(text)
+        return idx
+
+    w = BitWriter()
+    first_ts = int(round(records[0].timestamp * 1000)) if records else 0
+    prev_ts = first_ts
+    prev_dt = 0
+    prev_temp = prev_target = prev_watts = 0
+
+    # Run-length state: each run is written once, ahead of its first sample
+    n = len(records)
+    run_left = 0
+    states = [
+        (r.relay_mask & 0x7, r.temp_f is None, intern(r.status), intern(r.label))
+        for r in records
+    ]
+
+    for i in range(n):
+        r = records[i]
+        if run_left == 0:
+            state = states[i]
+            run_left = 1
+            while i + run_left < n and states[i + run_left] == state:
+                run_left += 1
+            _write_varuint(w, run_left)
+            w.write(state[0], 3)
+            w.write(1 if state[1] else 0, 1)
+            _write_varuint(w, state[2])
+            _write_varuint(w, state[3])
+        run_left -= 1
+
+        ts = int(round(r.timestamp * 1000))
+        dt = ts - prev_ts
+        _write_delta(w, dt - prev_dt)
+        prev_ts, prev_dt = ts, dt
+
+        if r.temp_f is not None:
+            q = int(round(r.temp_f * TEMP_SCALE))
+            _write_delta(w, q - prev_temp)
+            prev_temp = q
+
+        q = int(round((r.target_f or 0.0) * TARGET_SCALE))
+        _write_delta(w, q - prev_target)
+        prev_target = q
+
+        q = int(round((r.watts or 0) * WATTS_SCALE))
+        _write_delta(w, q - prev_watts)
+        prev_watts = q
+
+    header = {
+        "count": n,
+        "first_ts_ms": first_ts,
+        "strings": strings,
+        "scales": {"temp": TEMP_SCALE, "target": TARGET_SCALE, "watts": WATTS_SCALE},
+        "meta": meta or {},
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return _PREAMBLE.pack(_MAGIC, _VERSION, len(header_bytes)) + header_bytes + w.getvalue()
+
+
+def write_archive(path, records, meta=None):
+    """Writes an archive atomically. Returns the number of bytes written."""
+    data = encode_records(records, meta)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+# --- DECODER ---
+
+def _parse_header(preamble, header_bytes):
+    magic, version, _header_len = _PREAMBLE.unpack(preamble)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("Not a kettlebrain log archive")
+    return json.loads(header_bytes.decode('utf-8'))
+
+
+def _split(data):
+    _magic, _version, header_len = _PREAMBLE.unpack_from(data, 0)
+    start = _PREAMBLE.size
+    header = _parse_header(data[:start], data[start:start + header_len])
+    return header, data[start + header_len:]
+
+
+def _read_header_from(f):
+    preamble = f.read(_PREAMBLE.size)
+    if len(preamble) < _PREAMBLE.size:
+        raise ValueError("Not a kettlebrain log archive")
+    _magic, _version, header_len = _PREAMBLE.unpack(preamble)
+    return _parse_header(preamble, f.read(header_len))
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        return _read_header_from(f)
+
+
+def decode_records(data):
+    """Generator: yields ArchiveRecord one at a time from archive bytes."""
+    header, body = _split(data)
+    yield from _decode_body(header, BitReader(body))
+
+
+def _decode_body(header, r):
+    strings = header["strings"]
+    scales = header["scales"]
+    temp_scale = float(scales["temp"])
+    target_scale = float(scales["target"])
+    watts_scale = float(scales["watts"])
+
+    prev_ts = header["first_ts_ms"]
+    prev_dt = 0
+    temp = target = watts = 0
+
+    run_left = 0
+    mask = missing = 0
+    status = label = ""
+
+    for _ in range(header["count"]):
+        if run_left == 0:
+            run_left = _read_varuint(r)
+            mask = r.read(3)
+            missing = r.read(1)
+            status = strings[_read_varuint(r)]
+            label = strings[_read_varuint(r)]
+        run_left -= 1
+
+        prev_dt += _read_delta(r)
+        prev_ts += prev_dt
+
+        if not missing:
+            temp += _read_delta(r)
+        target += _read_delta(r)
+        watts += _read_delta(r)
+
+        yield ArchiveRecord(
+            prev_ts / 1000.0,
+            None if missing else temp / temp_scale,
+            target / target_scale,
+            watts / watts_scale,
+            mask, status, label
+        )
+
+
+def iter_archive(path):
+    """Streams the records of an archive file, reading the body block by block."""
+    with open(path, 'rb') as f:
+        header = _read_header_from(f)
+        yield from _decode_body(header, StreamBitReader(f))
+
+
+# --- SOURCES ---
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def iter_csv_records(path, meta_out=None):
+    """
+    Reads a kettlebrain CSV log (legacy kettlebrain-log.csv or a session file,
+    optionally gzipped). '# key: value' header lines are collected into meta_out.
+    CSV logs carry no relay states, so relay_mask is 0.
+    """
+    with _open_text(path) as f:
+        lines = iter(f)
+        fields = None
+        for line in lines:
+            if line.startswith("#"):
+                if meta_out is not None and ":" in line:
+                    key, _, value = line[1:].partition(":")
+                    meta_out[key.strip()] = value.strip()
+                continue
+            # First non-comment line is the column header
+            fields = next(csv.reader([line]))
+            break
+        if fields is None:
+            return
+
+        for row in csv.DictReader(lines, fieldnames=fields):
+            try:
+                ts = time.mktime(datetime.strptime(row["Timestamp"], "%Y-%m-%d %H:%M:%S").timetuple())
+                temp = float(row.get("Temp(F)") or 0.0)
+                yield ArchiveRecord(
+                    ts,
+                    temp if temp != 0.0 else None,  # the logger wrote 0.00 for a missing sensor
+                    float(row.get("Target(F)") or 0.0),
+                    float(row.get("Power(W)") or 0.0),
+                    0,
+                    row.get("Status", ""),
+                    row.get("Step", "")
+                )
+            except (KeyError, ValueError) as e:
+                print(f"[LogArchive] Skipping bad row: {e}")
+
+
+def iter_session_records(store, session_id):
+    """Reads a session's raw ticks from SessionStore, labelled with the step that was running."""
+    steps = [(s[4], s[5], s[2]) for s in store.get_steps(session_id)]
+    step_pos = 0
+    for ts, temp, target, watts, status, mask in store.iter_raw(session_id):
+        while step_pos < len(steps) and steps[step_pos][1] is not None and ts >= steps[step_pos][1]:
+            step_pos += 1
+        label = ""
+        if step_pos < len(steps) and ts >= steps[step_pos][0]:
+            label = steps[step_pos][2]
+        yield ArchiveRecord(ts, temp, target or 0.0, watts or 0.0, mask or 0, status or "", label)
+
+
+# --- HIGH LEVEL ---
+
+def convert_csv(csv_path, out_path=None):
+    """Converts a CSV log to an archive. Returns (out_path, csv_bytes, archive_bytes, rows)."""
+    if out_path is None:
+        base = csv_path[:-3] if csv_path.endswith(".gz") else csv_path
+        out_path = os.path.splitext(base)[0] + ARCHIVE_EXT
+    meta = {"source": os.path.basename(csv_path)}
+    records = list(iter_csv_records(csv_path, meta))
+    size = write_archive(out_path, records, meta)
+    return out_path, os.path.getsize(csv_path), size, len(records)
+
+
+def archive_session(store, session_id, archive_dir):
+    """Writes a closed session from SessionStore to <archive_dir>/<session_id>.kbla. Returns the path."""
+    os.makedirs(archive_dir, exist_ok=True)
+    info = store.get_session(session_id)
+    meta = {"session_id": session_id}
+    if info:
+        meta.update({"mode": info[1], "profile": info[2], "started": info[3], "ended": info[4]})
+    path = os.path.join(archive_dir, f"{session_id}{ARCHIVE_EXT}")
+    records = list(iter_session_records(store, session_id))
+    if not records:
+        return None
+    size = write_archive(path, records, meta)
+    print(f"[LogArchive] Archived session {session_id}: {len(records)} samples, {size // 1024} KiB")
+    return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("convert", "dump", "info"):
+        print(__doc__.strip())
+        sys.exit(1)
+
+    cmd, target_path = sys.argv[1], sys.argv[2]
+    if cmd == "convert":
+        out, in_size, out_size, rows = convert_csv(target_path, sys.argv[3] if len(sys.argv) > 3 else None)
+        ratio = (in_size / out_size) if out_size else 0.0
+        print(f"[LogArchive] {rows} rows: {in_size} -> {out_size} bytes ({ratio:.1f}x) -> {out}")
+    elif cmd == "info":
+        print(json.dumps(read_header(target_path), indent=2))
+    else:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["Timestamp", "Temp(F)", "Target(F)", "Power(W)", "Relays", "Status", "Step"])
+        for rec in iter_archive(target_path):
+            writer.writerow([
+                datetime.fromtimestamp(rec.timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                "" if rec.temp_f is None else f"{rec.temp_f:.2f}",
+                f"{rec.target_f:.1f}", f"{rec.watts:.0f}", rec.relay_mask, rec.status, rec.label
+            ])
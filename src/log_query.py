@@ -0,0 +1,396 @@
+"""
+kettlebrain app
+log_query.py
+
+Streaming queries over brew session logs. Sources, newest layout first:
+  - compressed session archives       kettlebrain-data/archive/*.kbla
+  - session raw ticks not yet archived kettlebrain-data/kettlebrain_sessions.db
+  - per-session CSV logs              kettlebrain-data/logs/session-*.csv[.gz]
+  - the legacy single log             kettlebrain-data/kettlebrain-log.csv
+
+Everything is a generator: rows are read, filtered and formatted one at a
+time, so memory stays flat no matter how large the logs are.
+
+CLI (run from src/):
+    python log_query.py --list
+    python log_query.py --mode AUTO --step Mash --since 2026-01-01 --format csv -o mash.csv
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+from log_archive import ARCHIVE_DIR_NAME, ARCHIVE_EXT, read_header, iter_archive, iter_csv_records
+from session_store import SESSION_DB_FILE
+from csv_logger import LOG_DIR_NAME
+
+LEGACY_LOG_FILE = "kettlebrain-log.csv"
+LEGACY_SESSION_ID = "legacy"
+
+MODES = ("AUTO", "MANUAL", "DELAY")
+
+# A session can change mode part way (a delayed start turns into AUTO or
+# MANUAL), so each row's mode comes from the status it was logged with.
+_STATUS_MODES = {
+    "DELAY_WAIT": "DELAY",
+    "MANUAL": "MANUAL",
+    "RUNNING": "AUTO",
+    "PAUSED": "AUTO",
+    "WAITING": "AUTO",
+    "COMPLETED": "AUTO",
+}
+
+LogRow = namedtuple(
+    "LogRow",
+    ["session_id", "timestamp", "mode", "status", "temp_f", "target_f", "watts", "step"]
+)
+
+# kind: 'archive' | 'db' | 'csv' | 'legacy'
+SessionSource = namedtuple("SessionSource", ["session_id", "kind", "path", "mode", "started", "ended"])
+
+
+def default_data_dir():
+    """Same location the app uses: <parent of project>/kettlebrain-data."""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(os.path.dirname(os.path.dirname(src_dir)), 'kettlebrain-data')
+
+
+def _session_start_from_id(session_id):
+    try:
+        return datetime.strptime(session_id[:15], "%Y%m%d-%H%M%S").timestamp()
+    except ValueError:
+        return None
+
+
+def _read_csv_meta(path):
+    """Reads only the '# key: value' lines at the top of a session CSV."""
+    meta = {}
+    if path.endswith(".gz"):
+        f = gzip.open(path, 'rt', encoding='utf-8')
+    else:
+        f = open(path, 'r', encoding='utf-8')
+    with f:
+        for line in f:
+            if not line.startswith("#"):
+                break
+            key, _, value = line[1:].partition(":")
+            meta[key.strip()] = value.strip()
+    return meta
+
+
+# --- DISCOVERY ---
+
+def discover_sessions(data_dir):
+    """Returns SessionSource entries, one per session, oldest first."""
+    found = {}
+
+    # 1. Archives (authoritative once written)
+    for path in glob.glob(os.path.join(data_dir, ARCHIVE_DIR_NAME, "*" + ARCHIVE_EXT)):
+        try:
+            meta = read_header(path).get("meta", {})
+        except Exception as e:
+            print(f"[LogQuery] Skipping {os.path.basename(path)}: {e}", file=sys.stderr)
+            continue
+        sid = meta.get("session_id") or os.path.basename(path)[:-len(ARCHIVE_EXT)]
+        found[sid] = SessionSource(sid, "archive", path, meta.get("mode"),
+                                   meta.get("started"), meta.get("ended"))
+
+    # 2. Session DB rows that have not been archived yet (e.g. the live session)
+    db_path = os.path.join(data_dir, SESSION_DB_FILE)
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute(
+                "SELECT id, mode, started, ended FROM sessions"
+                " WHERE EXISTS (SELECT 1 FROM samples WHERE session_id = sessions.id)"
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        finally:
+            conn.close()
+        for sid, mode, started, ended in rows:
+            if sid not in found:
+                found[sid] = SessionSource(sid, "db", db_path, mode, started, ended)
+
+    # 3. Per-session CSV logs (all parts of a session share one entry)
+    csv_parts = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, LOG_DIR_NAME, "session-*.csv*"))):
+        name = os.path.basename(path)
+        sid = name[len("session-"):].split(".")[0].split("-part")[0]
+        csv_parts.setdefault(sid, []).append(path)
+    for sid, paths in csv_parts.items():
+        if sid in found:
+            continue
+        try:
+            mode = _read_csv_meta(paths[0]).get("mode")
+        except Exception:
+            mode = None
+        paths.sort(key=_part_number)
+        found[sid] = SessionSource(sid, "csv", tuple(paths), mode, _session_start_from_id(sid), None)
+
+    # 4. Legacy single log (mixed modes; filtered per row)
+    legacy = os.path.join(data_dir, LEGACY_LOG_FILE)
+    if os.path.exists(legacy):
+        found[LEGACY_SESSION_ID] = SessionSource(LEGACY_SESSION_ID, "legacy", legacy, None, None, None)
+
+    return sorted(found.values(), key=lambda s: (s.started or 0.0, s.session_id))
+
+
+def _part_number(path):
+    name = os.path.basename(path).split(".")[0]
+    if "-part" in name:
+        try:
+            return int(name.rsplit("-part", 1)[1])
+        except ValueError:
+            pass
+    return 1
+
+
+# --- ROW STREAMS PER SOURCE ---
+
+def _row_mode(status, session_mode):
+    """Mode a row was logged in; falls back to the session's mode for IDLE/unknown."""
+    return _STATUS_MODES.get(status, session_mode)
+
+
+def _rows_from_archive(src):
+    for r in iter_archive(src.path):
+        yield LogRow(src.session_id, r.timestamp, _row_mode(r.status, src.mode), r.status, r.temp_f, r.target_f, r.watts, r.label)
+
+
+def _rows_from_db(src, since=None, until=None):
+    conn = sqlite3.connect(src.path)
+    try:
+        steps = conn.execute(
+            "SELECT started, ended, name FROM steps WHERE session_id = ? ORDER BY started",
+            (src.session_id,)
+        ).fetchall()
+        cur = conn.execute(
+            "SELECT ts, temp, target, watts, status FROM samples"
+            " WHERE session_id = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            (src.session_id, since if since is not None else 0.0,
+             until if until is not None else float("inf"))
+        )
+        step_pos = 0
+        while True:
+            batch = cur.fetchmany(2000)
+            if not batch:
+                break
+            for ts, temp, target, watts, status in batch:
+                while step_pos < len(steps) and steps[step_pos][1] is not None and ts >= steps[step_pos][1]:
+                    step_pos += 1
+                label = ""
+                if step_pos < len(steps) and ts >= steps[step_pos][0]:
+                    label = steps[step_pos][2]
+                yield LogRow(src.session_id, ts, _row_mode(status, src.mode), status, temp, target, watts, label)
+    finally:
+        conn.close()
+
+
+def _rows_from_csv(src, paths):
+    for path in paths:
+        for r in iter_csv_records(path):
+            yield LogRow(src.session_id, r.timestamp, _row_mode(r.status, src.mode), r.status, r.temp_f, r.target_f, r.watts, r.label)
+
+
+def _rows_from_legacy(src):
+    # The legacy log has a Mode column per row; read it directly
+    with open(src.path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                ts = datetime.strptime(row["Timestamp"], "%Y-%m-%d %H:%M:%S").timestamp()
+                temp = float(row.get("Temp(F)") or 0.0)
+                yield LogRow(
+                    src.session_id, ts, row.get("Mode"), row.get("Status", ""),
+                    temp if temp != 0.0 else None,
+                    float(row.get("Target(F)") or 0.0),
+                    float(row.get("Power(W)") or 0.0),
+                    row.get("Step", "")
+                )
+            except (KeyError, ValueError):
+                continue
+
+
+# --- QUERY ---
+
+def query(data_dir=None, sessions=None, since=None, until=None, modes=None, step=None):
+    """
+    Generator of LogRow matching all given filters.
+      sessions: iterable of session ids
+      since/until: epoch seconds (inclusive)
+      modes: iterable of 'AUTO' / 'MANUAL' / 'DELAY'
+      step: step name (case-insensitive exact match)
+    """
+    data_dir = data_dir or default_data_dir()
+    session_set = set(sessions) if sessions else None
+    mode_set = set(m.upper() for m in modes) if modes else None
+    step_key = step.lower() if step else None
+
+    for src in discover_sessions(data_dir):
+        if session_set is not None and src.session_id not in session_set:
+            continue
+        # Whole-session pruning where the source tells us enough up front.
+        # Modes are filtered per row: one session can hold DELAY and AUTO rows.
+        if until is not None and src.started is not None and src.started > until:
+            continue
+        if since is not None and src.ended is not None and src.ended < since:
+            continue
+
+        if src.kind == "archive":
+            rows = _rows_from_archive(src)
+        elif src.kind == "db":
+            rows = _rows_from_db(src, since, until)
+        elif src.kind == "csv":
+            rows = _rows_from_csv(src, src.path)
+        else:
+            rows = _rows_from_legacy(src)
+
+        for row in rows:
+            if since is not None and row.timestamp < since:
+                continue
+            if until is not None and row.timestamp > until:
+                if src.kind == "legacy":
+                    continue  # legacy rows may be out of order across restarts
+                break
+            if mode_set is not None and row.mode not in mode_set:
+                continue
+            if step_key is not None and (row.step or "").lower() != step_key:
+                continue
+            yield row
+
+
+# --- OUTPUT FORMATS ---
+
+CSV_HEADER = ["Session", "Timestamp", "Epoch", "Mode", "Status", "Temp(F)", "Target(F)", "Power(W)", "Step"]
+
+
+def _csv_fields(row):
+    return [
+        row.session_id,
+        datetime.fromtimestamp(row.timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+        f"{row.timestamp:.3f}",
+        row.mode or "",
+        row.status or "",
+        "" if row.temp_f is None else f"{row.temp_f:.2f}",
+        f"{row.target_f:.1f}",
+        f"{row.watts:.0f}",
+        row.step or ""
+    ]
+
+
+def iter_csv_chunks(rows, chunk_rows=500, header=True):
+    """Yields CSV text in chunks of up to chunk_rows rows."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(CSV_HEADER)
+    n = 0
+    for row in rows:
+        writer.writerow(_csv_fields(row))
+        n += 1
+        if n >= chunk_rows:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+            n = 0
+    tail = buf.getvalue()
+    if tail:
+        yield tail
+
+
+def _json_obj(row):
+    return {
+        "session": row.session_id, "ts": round(row.timestamp, 3), "mode": row.mode,
+        "status": row.status, "temp_f": row.temp_f, "target_f": row.target_f,
+        "watts": row.watts, "step": row.step
+    }
+
+
+def iter_json_chunks(rows, chunk_rows=500, lines=False):
+    """
+    Yields JSON text in chunks. lines=False produces one JSON array spread
+    over the chunks; lines=True produces newline-delimited JSON objects.
+    """
+    parts = []
+    first = True
+    if not lines:
+        parts.append("[")
+    for row in rows:
+        text = json.dumps(_json_obj(row), separators=(',', ':'))
+        if lines:
+            parts.append(text + "\n")
+        else:
+            parts.append(text if first else "," + text)
+        first = False
+        if len(parts) >= chunk_rows:
+            yield "".join(parts)
+            parts = []
+    if not lines:
+        parts.append("]\n")
+    if parts:
+        yield "".join(parts)
+
+
+# --- CLI ---
+
+def _parse_time(text):
+    """Accepts epoch seconds, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM[:SS]'."""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Unrecognized time: {text}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and export KettleBrain session logs.")
+    parser.add_argument("--data-dir", default=None, help="kettlebrain-data folder (default: app location)")
+    parser.add_argument("--list", action="store_true", help="list sessions and exit")
+    parser.add_argument("--session", action="append", help="session id (repeatable)")
+    parser.add_argument("--since", type=_parse_time, help="start time (epoch or YYYY-MM-DD[ HH:MM[:SS]])")
+    parser.add_argument("--until", type=_parse_time, help="end time")
+    parser.add_argument("--mode", action="append", choices=MODES, help="mode filter (repeatable)")
+    parser.add_argument("--step", help="step name (case-insensitive)")
+    parser.add_argument("--format", choices=("csv", "json", "ndjson"), default="csv")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    data_dir = args.data_dir or default_data_dir()
+
+    if args.list:
+        for src in discover_sessions(data_dir):
+            started = datetime.fromtimestamp(src.started).strftime("%Y-%m-%d %H:%M") if src.started else "-"
+            print(f"{src.session_id:<20} {src.kind:<8} {src.mode or '-':<7} {started}")
+        return 0
+
+    rows = query(data_dir, args.session, args.since, args.until, args.mode, args.step)
+    if args.format == "csv":
+        chunks = iter_csv_chunks(rows)
+    else:
+        chunks = iter_json_chunks(rows, lines=(args.format == "ndjson"))
+
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
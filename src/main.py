@@ -2,6 +2,22 @@
 # main.py
 # test for update function with windows deployment
 
+import startup_profiler
+startup_profiler.maybe_install_import_timer()
+startup_profiler.mark("main_start")
+
+# --- EARLY SPLASH ---
+# Forked before Kivy is imported so it appears as soon as the interpreter is up
+splash_queue = None
+splash_process = None
+if __name__ == '__main__':
+    import multiprocessing
+    from splash import run_splash_screen
+    splash_queue = multiprocessing.Queue()
+    splash_process = multiprocessing.Process(target=run_splash_screen, args=(splash_queue,))
+    splash_process.start()
+    startup_profiler.mark("splash_started")
+
 import os
 import uuid
 import copy
@@ -11,10 +27,17 @@ import threading
 import signal
 import atexit
 import json
+import time
 from datetime import datetime, timedelta
 from sequence_manager import SequenceStatus
 from profile_data import BrewProfile, BrewStep, BrewAddition, StepType, TimeoutBehavior
 from brew_math import BrewMath
+from main_view_model import build_main_view_model, diff_view_models, PropertyWriteCounter
+from ui_governor import UiRateGovernor, BLANK, set_display_power
+from help_index import get_help_index
+from device_discovery import DeviceDiscovery, SENSORS, AUDIO
+from mixer_service import MixerService
+from event_bus import STATUS_CHANGED, STEP_CHANGED, PROFILE_LOADED
 
 # This tells the OS: "My Window ID is 'KettleBrain', not 'python'"
 os.environ['SDL_VIDEO_X11_WMCLASS'] = "KettleBrain"
@@ -64,6 +87,10 @@ from kivy.uix.screenmanager import SlideTransition
 from kivy.uix.spinner import Spinner
 from kivy.core.window import Window
 from kivy.factory import Factory
+from kivy.utils import escape_markup
+from kivy.uix.widget import Widget
+from kivy.graphics import Color, Line, Rectangle
+from trend_buffer import MinMaxDecimator
 
 # --- GLOBAL SLIDER TOUCH/THUMB POLICY ---
 _ORIG_SLIDER_ON_TOUCH_DOWN = Slider.on_touch_down
@@ -114,12 +141,18 @@ def _uniform_thumb_on_kv_post(self, base_widget):
 Slider.on_touch_down = _thumb_only_on_touch_down
 Slider.on_kv_post = _uniform_thumb_on_kv_post
 
+startup_profiler.mark("kivy_imported")
+
 # --- BACKEND IMPORTS ---
-from settings_manager import SettingsManager 
+from settings_manager import SettingsManager, data_dir_for
 from hardware_interface import HardwareInterface
-from sequence_manager import SequenceManager, SequenceStatus
+from sequence_manager import SequenceManager, SequenceStatus, SHUTDOWN_WAIT_S
+startup_profiler.mark("backend_imported")
 
 # --- FAILSAFE SHUTDOWN ---
+# Open lock file while this process owns the relays (see relay_control.acquire_control_lock)
+_control_lock = None
+
 def failsafe_cleanup():
     """
     Nuclear option: Forces all Relays OFF when python exits.
@@ -134,7 +167,7 @@ def failsafe_cleanup():
             print("[Main] Relays disabled via App reference.")
         else:
             # Fallback: Create a temporary RelayControl to force shutdown
-            from relay_control import RelayControl
+            from relay_control import RelayControl, ControlLockHeld, acquire_control_lock
             from settings_manager import SettingsManager
             
             # 1. Determine Path (Match logic in build() to avoid creating wrong data folder)
@@ -150,6 +183,13 @@ def failsafe_cleanup():
                 project_dir = os.path.dirname(src_dir) # e.g. /home/pi/kettlebrain
                 root_dir = os.path.dirname(project_dir) # e.g. /home/pi
             
+            if _control_lock is None:
+                # Never touch the relays (or the settings file) of a running daemon or other app
+                try:
+                    acquire_control_lock(data_dir_for(root_dir))
+                except ControlLockHeld as e:
+                    print(f"[Main] Failsafe skipped: {e}")
+                    return
             sm = SettingsManager(root_dir)
             rc = RelayControl(sm)
             rc.stop_all()
@@ -192,6 +232,103 @@ class StepItem(BoxLayout):
     bg_color = ListProperty([0.2, 0.2, 0.2, 1])
     text_color = ListProperty([1, 1, 1, 1])
 
+# --- LIVE TREND CHART ---
+class TrendChart(Widget):
+    """
+    Temperature / target / power trend for the hero row. Redraws from a
+    MinMaxDecimator, so each refresh costs one point pair per pixel column
+    no matter how long the window is.
+    """
+    window_minutes = NumericProperty(10)
+    axis_hi = StringProperty("")
+    axis_lo = StringProperty("")
+    max_watts = NumericProperty(2800)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._decimator = None
+        self._event = None
+        with self.canvas:
+            Color(0.08, 0.08, 0.08, 1)
+            self._bg = Rectangle(pos=self.pos, size=self.size)
+            Color(1, 0.5, 0.1, 0.45)
+            self._watts_line = Line(points=[], width=1)
+            Color(0.6, 0.6, 0.6, 1)
+            self._target_line = Line(points=[], width=1, dash_length=4, dash_offset=4)
+            Color(0.2, 0.8, 1, 1)
+            self._temp_line = Line(points=[], width=1.2)
+        self.bind(pos=self._on_geometry, size=self._on_geometry)
+        self.bind(window_minutes=self._on_geometry)
+
+    def start(self):
+        """Begins refreshing (called when the chart becomes visible)."""
+        if self._event is None:
+            self._event = Clock.schedule_interval(self.redraw, 1.0)
+        self.redraw()
+
+    def stop(self):
+        """Stops refreshing; the buffer keeps filling in the control thread."""
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def _on_geometry(self, *args):
+        self._bg.pos = self.pos
+        self._bg.size = self.size
+        if self._decimator is not None:
+            self._decimator.configure(self.window_minutes * 60, self.width)
+        if self._event is not None:
+            self.redraw()
+
+    def redraw(self, *args):
+        app = App.get_running_app()
+        seq = getattr(app, 'sequencer', None)
+        if seq is None or self.width < 2 or self.height < 2:
+            return
+        if self._decimator is None:
+            self._decimator = MinMaxDecimator(seq.trend, self.window_minutes * 60, self.width)
+
+        dec = self._decimator
+        now = time.time()
+        cols = dec.update(now)
+
+        # Y axis: visible temps/targets, at least 10 degrees F tall
+        rng = dec.value_range()
+        if rng is None:
+            lo, hi = 50.0, 212.0
+        else:
+            lo, hi = rng
+            if hi - lo < 10.0:
+                mid = (hi + lo) / 2.0
+                lo, hi = mid - 5.0, mid + 5.0
+            pad = (hi - lo) * 0.08
+            lo, hi = lo - pad, hi + pad
+
+        x0, y0, w, h = self.x, self.y, self.width, self.height
+        start_ts = now - dec.window_s
+        x_scale = w / dec.window_s
+        y_scale = h / (hi - lo)
+        w_scale = (h * 0.3) / max(1.0, self.max_watts)
+        width_s = dec.col_width
+
+        temp_pts, target_pts, watt_pts = [], [], []
+        for col_id, tmin, tmax, target, watts in cols:
+            x = x0 + (col_id * width_s - start_ts) * x_scale
+            if tmin == tmin:  # not NaN
+                temp_pts += (x, y0 + (tmin - lo) * y_scale, x, y0 + (tmax - lo) * y_scale)
+            if target > 0:
+                target_pts += (x, y0 + (target - lo) * y_scale)
+            watt_pts += (x, y0 + watts * w_scale)
+
+        self._temp_line.points = temp_pts
+        self._target_line.points = target_pts
+        self._watts_line.points = watt_pts
+
+        unit = "C" if app.is_metric else "F"
+        self.axis_hi = f"{app.to_user_units(hi, 'temp'):.0f}°{unit}"
+        self.axis_lo = f"{app.to_user_units(lo, 'temp'):.0f}°{unit}"
+
+
 class ProfileOptionsPopup(Popup):
     profile_name = StringProperty("")
     profile_id = StringProperty("")
@@ -943,6 +1080,10 @@ class MainScreen(Screen):
     cost_per_kwh = NumericProperty(0.12)
     cost_slider_value = NumericProperty(0.12)
     kwh_display_text = StringProperty("kWh: 0.000")
+
+    # Trend chart window (minutes) and power axis scale
+    trend_window_min = NumericProperty(10)
+    heater_total_watts = NumericProperty(2800)
     
     # Manual Mode Sliders
     slider_temp_val = NumericProperty(150.0)
@@ -989,12 +1130,13 @@ class MainScreen(Screen):
         self.app = App.get_running_app()
         
         # --- UI State & Logic Memory ---
-        from profile_data import SequenceStatus
-        self.last_status = SequenceStatus.IDLE
-        self.last_profile_id = None
-        self.last_step_index = -1
         self.last_refresh_time = 0
         self._last_scrolled_index = -1
+
+        # Step list row model (see refresh_step_list)
+        self._row_keys = []
+        self._static_rows = []
+        self._static_rows_key = None
         
         # --- UI Interaction Flags ---
         # FIX 1: Must be a list [], because code uses .append() and .remove()
@@ -1069,6 +1211,7 @@ class MainScreen(Screen):
         """Syncs UI with saved settings."""
         self._load_manual_settings()
         self.refresh_heater_labels()
+        self.app.invalidate_view_model()
         
         # Load Cost Setting
         sm = self.app.settings_manager
@@ -1087,6 +1230,20 @@ class MainScreen(Screen):
         self.heater_1_text = str(w1) if w1 > 0 else "OFF"
         self.heater_2_text = str(w2) if w2 > 0 else "OFF"
         self.heater_3_text = str(w3) if w3 > 0 else "OFF"
+        self.heater_total_watts = max(1, w1 + w2 + w3)
+
+    # --- TREND CHART METHODS ---
+    def open_trend(self):
+        """Slide to the live trend chart hero screen."""
+        self.ids.hero_manager.transition.direction = 'left'
+        self.ids.hero_manager.current = 'hero_trend'
+
+    def close_trend(self):
+        self.ids.hero_manager.transition.direction = 'right'
+        self.ids.hero_manager.current = 'hero_standard'
+
+    def set_trend_window(self, minutes):
+        self.trend_window_min = minutes
 
     # --- COST SETUP METHODS ---
     def open_cost_setup(self):
@@ -1254,6 +1411,10 @@ class MainScreen(Screen):
         self._update_prediction()
 
     def _update_prediction(self):
+        # Outside manual mode update_ui owns the status line; let it re-assert it next frame
+        if self.app.sequencer.status != SequenceStatus.MANUAL:
+            self.app.invalidate_view_model()
+
         # Retrieve System Settings
         sm = self.app.settings_manager
         ref_vol = sm.get_system_setting("heater_ref_volume_gal", 8.0)
@@ -1303,62 +1464,19 @@ class MainScreen(Screen):
 
     def _update_est_end(self):
         """
-        Calculates estimated completion time by simulating the full profile.
+        Shows the projected completion time from the sequencer's cached schedule.
         """
         seq = self.app.sequencer
-        status = seq.status
 
-        if not seq.current_profile or status == SequenceStatus.MANUAL:
+        sched = None
+        if seq.status != SequenceStatus.MANUAL:
+            sched = seq.get_schedule()
+
+        if sched is None:
             self.est_end_display = "Est. End: --:-- --"
             return
 
-        if status == SequenceStatus.DELAYED_WAIT and self.delay_target_dt:
-            start_time = self.delay_target_dt
-            sim_temp = seq.current_temp if seq.current_temp else 60.0
-        else:
-            start_time = datetime.now()
-            sim_temp = seq.current_temp if seq.current_temp else 60.0
-
-        total_minutes = 0.0
-        
-        steps = seq.current_profile.steps
-        current_idx = seq.current_step_index
-        
-        start_list_idx = 0
-        if status in [SequenceStatus.RUNNING, SequenceStatus.PAUSED, SequenceStatus.WAITING_FOR_USER]:
-            start_list_idx = current_idx if current_idx >= 0 else 0
-
-        def get_ramp_min(start_f, end_f, vol_gal, watts):
-            if end_f > start_f and hasattr(seq, 'calculate_ramp_minutes'):
-                return seq.calculate_ramp_minutes(start_f, end_f, vol_gal, watts)
-            return 0.0
-
-        for i in range(start_list_idx, len(steps)):
-            step = steps[i]
-            target = float(step.setpoint_f or 0.0)
-            vol = float(step.lauter_volume or 6.0)
-            
-            # FIX: Utilize the new dual power properties instead of legacy 'power_watts'
-            legacy = getattr(step, 'power_watts', 1800)
-            watts = step.ramp_power_watts if step.ramp_power_watts is not None else legacy
-            
-            dur = float(step.duration_min or 0.0)
-
-            if i == current_idx and status not in [SequenceStatus.DELAYED_WAIT, SequenceStatus.IDLE]:
-                if getattr(seq, 'temp_reached', False):
-                    if hasattr(seq, 'timer'):
-                         total_minutes += (seq.timer.remaining_time / 60.0)
-                else:
-                    total_minutes += get_ramp_min(sim_temp, target, vol, watts)
-                    total_minutes += dur
-            else:
-                total_minutes += get_ramp_min(sim_temp, target, vol, watts)
-                total_minutes += dur
-            
-            if target >= 60:
-                sim_temp = target
-        
-        end_dt = start_time + timedelta(minutes=total_minutes)
+        end_dt = datetime.fromtimestamp(sched.end_epoch)
         self.est_end_display = f"Est. End: {end_dt.strftime('%I:%M %p')}"
         
     def open_water_calculator(self):
@@ -1523,7 +1641,8 @@ class MainScreen(Screen):
             return
         if seq.status == SequenceStatus.IDLE:
             return
-        self.app.sequencer.emergency_cut_power()
+        # Don't wait on the control thread: the cut lands within milliseconds, the nav flips now
+        self.app.sequencer.submit("emergency_cut_power")
         self.ids.bottom_nav.transition.direction = 'up'
         self.ids.bottom_nav.current = 'nav_confirm'
 
@@ -1567,14 +1686,11 @@ class MainScreen(Screen):
         self.manager.transition.direction = 'left'
         self.manager.current = 'sys_settings'
 
+    # Help section for each center page; anything else gets the main screen topic
+    CONTEXT_HELP = {'page_manual': 'manualMode', 'page_auto': 'autoMode'}
+
     def go_to_contextual_help(self):
-        center = self.ids.center_content.current
-        if center == 'page_manual':
-            section = 'manualMode'
-        elif center == 'page_auto':
-            section = 'autoMode'
-        else:
-            section = 'mainScreen'
+        section = self.CONTEXT_HELP.get(self.ids.center_content.current, 'mainScreen')
         App.get_running_app().open_help_section(section, return_screen='main')
 
     def get_delay_time_str(self, total_minutes):
@@ -1602,6 +1718,7 @@ class MainScreen(Screen):
         seq = self.app.sequencer
         if not seq.current_profile:
             self.ids.rv_steps.data = []
+            self._row_keys = []
             return
         
         if hasattr(seq, 'update_predictions'):
@@ -1611,21 +1728,17 @@ class MainScreen(Screen):
         if current_idx != -1 and current_idx not in self.expanded_indices:
             self.expanded_indices.append(current_idx)
 
-        data = []
+        static_rows = self._get_static_step_rows(seq.current_profile)
+
+        keys = []
+        rows = []
         active_list_index = -1
-        current_row_count = 0
         active_alert_name = None
         if seq.status == SequenceStatus.WAITING_FOR_USER and seq.current_alert_text:
             active_alert_name = seq.current_alert_text
 
-        unit = "C" if self.app.is_metric else "F"
-        u_vol = "L" if self.app.is_metric else "Gal"
-        try:
-            sys_boil_f = float(self.app.settings_manager.get_system_setting("boil_temp_f", 212.0))
-        except (ValueError, TypeError):
-            sys_boil_f = 212.0
-
         for i, step in enumerate(seq.current_profile.steps):
+            t_str, v_str, d_str, children = static_rows[i]
             is_current_step = (i == current_idx)
             is_done = (i < current_idx)
             
@@ -1637,46 +1750,18 @@ class MainScreen(Screen):
                     bg = [0.2, 0.4, 0.6, 1]
                 else:
                     bg = [0.2, 0.8, 0.2, 1] 
-                    active_list_index = current_row_count 
+                    active_list_index = len(rows)
             elif is_done:
                 txt = [0.5, 0.5, 0.5, 1]
 
-            raw_f = float(step.setpoint_f) if step.setpoint_f is not None else 0.0
-            is_boil_type = (step.step_type == StepType.BOIL)
-            is_high_temp = (raw_f >= sys_boil_f)
-
-            if is_boil_type:
-                user_boil = self.app.to_user_units(sys_boil_f, 'boil_temp')
-                t_str = f"{user_boil:.0f}°{unit} (BOIL)"
-            elif is_high_temp:
-                user_val = self.app.to_user_units(raw_f, 'temp')
-                t_str = f"{user_val:.0f}°{unit} (BOIL)"
-            elif raw_f >= 60:
-                user_val = self.app.to_user_units(raw_f, 'temp')
-                t_str = f"{user_val:.0f}°{unit}"
-            else:
-                t_str = "--"
-
-            if step.lauter_volume and step.lauter_volume > 0:
-                user_vol = self.app.to_user_units(step.lauter_volume, 'vol')
-                v_str = f"{user_vol:.2f} {u_vol}"
-            else:
-                v_str = "--"
-
-            if step.duration_min and step.duration_min > 0:
-                d_str = f"{int(step.duration_min)} min"
-            else:
-                d_str = "--"
-            
-            r_str = getattr(step, 'predicted_ready_time', "--")
-
-            has_children = (len(step.additions) > 0)
+            has_children = bool(children)
             is_expanded = (i in self.expanded_indices)
             arrow_icon = ""
             if has_children:
                 arrow_icon = "v" if is_expanded else ">"
 
-            data.append({
+            keys.append(('step', i))
+            rows.append({
                 'view_type': 'StepItem',
                 'step_index': str(i + 1),
                 'internal_index': i,
@@ -1684,20 +1769,18 @@ class MainScreen(Screen):
                 'step_volume': v_str,
                 'step_target': t_str,
                 'step_duration': d_str,
-                'step_ready': r_str,
+                'step_ready': getattr(step, 'predicted_ready_time', "--"),
                 'bg_color': bg,
                 'text_color': txt,
                 'arrow_text': arrow_icon,
                 'arrow_disabled': not has_children
             })
-            current_row_count += 1
 
             if is_expanded and has_children:
-                sorted_adds = sorted(step.additions, key=lambda x: x.time_point_min, reverse=True)
-                for add in sorted_adds:
+                for j, (add_name, label) in enumerate(children):
                     is_active_child = False
                     if is_current_step and active_alert_name:
-                        if add.name in active_alert_name or active_alert_name in add.name:
+                        if add_name in active_alert_name or active_alert_name in add_name:
                             is_active_child = True
                     
                     child_bg = [0.15, 0.15, 0.15, 1]
@@ -1706,19 +1789,116 @@ class MainScreen(Screen):
                     if is_active_child:
                         child_bg = [0.2, 0.8, 0.2, 1] 
                         child_txt = [1, 1, 1, 1]        
-                        active_list_index = current_row_count 
+                        active_list_index = len(rows)
 
-                    data.append({
+                    keys.append(('add', i, j))
+                    rows.append({
                         'view_type': 'AlertChildItem',
-                        'alert_name': f"(@ {int(add.time_point_min)} min) {add.name}",
+                        'alert_name': label,
                         'bg_color': child_bg,
                         'text_color': child_txt
                     })
-                    current_row_count += 1
 
-        self.ids.rv_steps.data = data
+        self._patch_step_rows(keys, rows)
         if active_list_index != -1:
             self.scroll_to_active(active_list_index)
+
+    def invalidate_step_rows(self):
+        """Drops the cached step strings (units, boil temp or the loaded profile's steps changed)."""
+        self._static_rows_key = None
+
+    def _get_static_step_rows(self, profile):
+        """
+        Per-step strings that only change with the profile or units, plus each
+        step's additions pre-sorted (latest first) into their row labels.
+        Built once per profile load instead of on every refresh.
+        """
+        try:
+            sys_boil_f = float(self.app.settings_manager.get_system_setting("boil_temp_f", 212.0))
+        except (ValueError, TypeError):
+            sys_boil_f = 212.0
+
+        # profile_loads, not id(profile): a reloaded profile can reuse a freed object's id
+        key = (getattr(self.app.sequencer, 'profile_loads', 0), profile.id, len(profile.steps),
+               self.app.is_metric, sys_boil_f)
+        if key == self._static_rows_key:
+            return self._static_rows
+
+        unit = "C" if self.app.is_metric else "F"
+        u_vol = "L" if self.app.is_metric else "Gal"
+        static_rows = []
+
+        for step in profile.steps:
+            raw_f = float(step.setpoint_f) if step.setpoint_f is not None else 0.0
+            is_boil_type = (step.step_type == StepType.BOIL)
+            is_high_temp = (raw_f >= sys_boil_f)
+
+            if is_boil_type:
+                user_boil = self.app.to_user_units(sys_boil_f, 'boil_temp')
+                t_str = f"{user_boil:.0f}°{unit} (BOIL)"
+            elif is_high_temp:
+                user_val = self.app.to_user_units(raw_f, 'temp')
+                t_str = f"{user_val:.0f}°{unit} (BOIL)"
+            elif raw_f >= 60:
+                user_val = self.app.to_user_units(raw_f, 'temp')
+                t_str = f"{user_val:.0f}°{unit}"
+            else:
+                t_str = "--"
+
+            if step.lauter_volume and step.lauter_volume > 0:
+                user_vol = self.app.to_user_units(step.lauter_volume, 'vol')
+                v_str = f"{user_vol:.2f} {u_vol}"
+            else:
+                v_str = "--"
+
+            if step.duration_min and step.duration_min > 0:
+                d_str = f"{int(step.duration_min)} min"
+            else:
+                d_str = "--"
+
+            sorted_adds = sorted(step.additions, key=lambda x: x.time_point_min, reverse=True)
+            children = tuple(
+                (add.name, f"(@ {int(add.time_point_min)} min) {add.name}") for add in sorted_adds
+            )
+            static_rows.append((t_str, v_str, d_str, children))
+
+        self._static_rows = static_rows
+        self._static_rows_key = key
+        return static_rows
+
+    def _patch_step_rows(self, keys, rows):
+        """
+        Applies rows to rv_steps in place. Rows are keyed ('step', i) /
+        ('add', i, j); unchanged rows are left alone, changed rows are
+        replaced by index, and an expand/collapse becomes one slice splice,
+        so the RecycleView only refreshes the affected views.
+        """
+        data = self.ids.rv_steps.data
+        old_keys = self._row_keys
+
+        if len(data) != len(old_keys) or not old_keys:
+            self.ids.rv_steps.data = rows
+            self._row_keys = keys
+            return
+
+        if old_keys != keys:
+            n_old, n_new = len(old_keys), len(keys)
+            limit = min(n_old, n_new)
+            head = 0
+            while head < limit and old_keys[head] == keys[head]:
+                head += 1
+            tail = 0
+            while tail < limit - head and old_keys[n_old - 1 - tail] == keys[n_new - 1 - tail]:
+                tail += 1
+            data[head:n_old - tail] = rows[head:n_new - tail]
+            changed = [i for i in range(head) if data[i] != rows[i]]
+            changed += [i for i in range(n_new - tail, n_new) if data[i] != rows[i]]
+        else:
+            changed = [i for i in range(len(rows)) if data[i] != rows[i]]
+
+        for i in changed:
+            data[i] = rows[i]
+        self._row_keys = keys
         
     def scroll_to_active(self, index):
         rv = self.ids.rv_steps
@@ -1815,6 +1995,7 @@ class MainScreen(Screen):
     def update_status_display(self):
         seq = self.app.sequencer
         status = seq.status
+        self.app.invalidate_view_model()
         if status == SequenceStatus.DELAYED_WAIT:
             self.is_delay_active = True
             self.controls_disabled = True
@@ -1871,16 +2052,17 @@ class MainScreen(Screen):
 class ProfilesScreen(Screen):
     def refresh_list(self):
         app = App.get_running_app()
-        profiles = app.settings_manager.get_all_profiles()
-        default = [p for p in profiles if p.name == "Default Profile"]
-        others = sorted([p for p in profiles if p.name != "Default Profile"], key=lambda x: x.name)
+        # Listing only needs id/name, so avoid inflating every profile
+        profiles = app.settings_manager.list_profiles()
+        default = [p for p in profiles if p[1] == "Default Profile"]
+        others = sorted([p for p in profiles if p[1] != "Default Profile"], key=lambda x: x[1])
         sorted_profiles = default + others
         data_list = []
-        for p in sorted_profiles:
+        for p_id, p_name in sorted_profiles:
             data_list.append({
-                'text': f"{p.name}",
-                'profile_name': p.name,
-                'profile_id': p.id
+                'text': f"{p_name}",
+                'profile_name': p_name,
+                'profile_id': p_id
             })
         self.ids.rv_profiles.data = data_list
 
@@ -1890,47 +2072,49 @@ class ProfilesScreen(Screen):
 class HelpScreen(Screen):
     help_text = StringProperty("Loading...")
     return_screen = StringProperty('main')
-    sections = {}
+    search_text = StringProperty("")
+    index = None
     _pending_section = 'main'
+    _current_section = 'main'
 
     def on_pre_enter(self, *args):
         self.load_help()
+        self.search_text = ""
         self.go_to_section(self._pending_section)
         self._pending_section = 'main'
 
     def load_help(self):
+        """Cached parse + search index; only re-read when help.txt changes on disk."""
         base_path = os.path.dirname(os.path.abspath(__file__))
-        help_file = os.path.join(base_path, 'assets', 'help.txt')
-        raw_text = ""
-        if os.path.exists(help_file):
-            try:
-                with open(help_file, 'r', encoding='utf-8') as f:
-                    raw_text = f.read()
-            except Exception as e:
-                raw_text = f"[SECTION: main]\nError reading help file: {e}"
-        else:
-            raw_text = "[SECTION: main]\nHelp file (assets/help.txt) not found."
-        self._parse_sections(raw_text)
-
-    def _parse_sections(self, text):
-        self.sections = {}
-        parts = text.split('[SECTION:')
-        for part in parts:
-            if not part.strip():
-                continue
-            try:
-                header, content = part.split(']', 1)
-                section_name = header.strip()
-                self.sections[section_name] = content.strip()
-            except ValueError:
-                continue
+        self.index = get_help_index(os.path.join(base_path, 'assets', 'help.txt'))
 
     def go_to_section(self, section_name):
-        if section_name in self.sections:
-            self.help_text = self.sections[section_name]
+        section = self.index.get(section_name) if self.index else None
+        if section:
+            self.help_text = section.body
+            self._current_section = section_name
         else:
             self.help_text = f"[color=ff4444]Section '{section_name}' not found.[/color]"
 
+    def on_search_text(self, instance, value):
+        if not value.strip():
+            self.go_to_section(self._current_section)
+            return
+        hits = self.index.search(value) if self.index else []
+        lines = [f"[size=18][b][color=33ccff]Search: {escape_markup(value.strip())}[/color][/b][/size]", ""]
+        if not hits:
+            lines.append("No matching help topics.")
+        for hit in hits:
+            lines.append(f"[ref={hit.name}][b][color=33ccff]{escape_markup(hit.title)}[/color][/b][/ref]")
+            lines.append(f"[color=aaaaaa]{escape_markup(hit.snippet)}[/color]")
+            lines.append("")
+        self.help_text = "\n".join(lines)
+
+    def open_result(self, section_name):
+        """Ref links (in sections and search results) land here."""
+        self.search_text = ""
+        self.go_to_section(section_name)
+
     def go_back(self):
         app = App.get_running_app()
         app.root.transition.direction = 'right'
@@ -2193,6 +2377,42 @@ class HardwareSettingsScreen(Screen):
         # Map friendly names back to internal IDs
         self.sensor_map = {} 
         self.audio_map = {}
+        self.app.device_discovery.subscribe(self._on_devices_changed)
+
+    def _on_devices_changed(self, kind, devices):
+        # Discovery thread -> UI thread
+        Clock.schedule_once(lambda dt: self._apply_device_list(kind, devices), 0)
+
+    def _apply_device_list(self, kind, devices):
+        """Refreshes a spinner's choices in place, keeping the current (possibly unsaved) selection."""
+        # A hotplug is not a user edit
+        was_suppressed = self.app._suppress_dirty
+        self.app._suppress_dirty = True
+        try:
+            if kind == SENSORS:
+                self._load_sensor_list(devices, self.ids.spinner_sensor.text)
+            else:
+                current_friendly = self.ids.spinner_audio.text
+                self._load_audio_list(devices, self.audio_map.get(current_friendly, "default"))
+        finally:
+            self.app._suppress_dirty = was_suppressed
+
+    def _load_sensor_list(self, raw_sensors, current_sensor):
+        self.sensor_list = ["unassigned"] + raw_sensors
+        if current_sensor not in self.sensor_list:
+            self.sensor_list.append(current_sensor)
+        self.ids.spinner_sensor.text = current_sensor
+
+    def _load_audio_list(self, raw_audio, current_audio_dev):
+        self.audio_list = []
+        self.audio_map = {}
+        current_friendly_text = "Default"
+        for friendly, dev_str in raw_audio:
+            self.audio_list.append(friendly)
+            self.audio_map[friendly] = dev_str
+            if dev_str == current_audio_dev:
+                current_friendly_text = friendly
+        self.ids.spinner_audio.text = current_friendly_text
 
     def on_pre_enter(self):
         """Load current values when entering the screen."""
@@ -2200,32 +2420,17 @@ class HardwareSettingsScreen(Screen):
         app._suppress_dirty = True
         try:
             sm = self.app.settings_manager
-            hw = self.app.hw
 
             # 1. LOAD BOIL TEMP (With Conversion)
             raw_boil = sm.get_system_setting("boil_temp_f", 212)
             self.app.configure_slider(self.ids.s_boil, raw_boil, 'boil_temp')
 
-            # 2. LOAD SENSORS
-            raw_sensors = hw.scan_available_sensors()
-            self.sensor_list = ["unassigned"] + raw_sensors
-            current_sensor = sm.get_system_setting("temp_sensor_id", "unassigned")
-            if current_sensor not in self.sensor_list:
-                self.sensor_list.append(current_sensor)
-            self.ids.spinner_sensor.text = current_sensor
+            # 2. LOAD SENSORS (cached by device discovery; changes arrive via _on_devices_changed)
+            discovery = self.app.device_discovery
+            self._load_sensor_list(discovery.sensors, sm.get_system_setting("temp_sensor_id", "unassigned"))
 
             # 3. LOAD AUDIO DEVICES
-            raw_audio = hw.scan_audio_devices()
-            self.audio_list = []
-            self.audio_map = {}
-            current_audio_dev = sm.get_system_setting("audio_device", "default")
-            current_friendly_text = "Default"
-            for friendly, dev_str in raw_audio:
-                self.audio_list.append(friendly)
-                self.audio_map[friendly] = dev_str
-                if dev_str == current_audio_dev:
-                    current_friendly_text = friendly
-            self.ids.spinner_audio.text = current_friendly_text
+            self._load_audio_list(discovery.audio_devices, sm.get_system_setting("audio_device", "default"))
 
             # 4. LOAD SOUNDS
             self.sound_list = [
@@ -2274,6 +2479,7 @@ class HardwareSettingsScreen(Screen):
         # Boil Temp: Convert User Value -> Imperial for Backend
         sys_val = self.app.to_backend_units(self.boil_temp, 'temp')
         sm.set_system_setting("boil_temp_f", int(sys_val))
+        self.app.invalidate_view_model()
         
         # Sensor
         sm.set_system_setting("temp_sensor_id", self.ids.spinner_sensor.text)
@@ -2285,6 +2491,7 @@ class HardwareSettingsScreen(Screen):
         
         # Sound File
         sm.set_system_setting("alert_sound_file", self.ids.spinner_sound.text)
+        self.app.sequencer.audio.configure(dev_str, self.ids.spinner_sound.text)
         
         # Alert Frequency
         sm.set_system_setting("alert_repeat_freq", int(self.alert_repeat_freq))
@@ -2304,52 +2511,18 @@ class HardwareSettingsScreen(Screen):
 
     def test_audio(self):
         """Play the selected sound on the selected device."""
-        import os
-        selected_sound = self.ids.spinner_sound.text
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        sound_path = os.path.join(base_dir, "assets", selected_sound)
-
-        if not os.path.exists(sound_path):
-            return
-
-        if sys.platform == 'win32':
-            try:
-                import winsound
-                winsound.PlaySound(sound_path, winsound.SND_FILENAME | winsound.SND_ASYNC)
-            except Exception as e:
-                print(f"[Hardware] Audio test failed (Windows): {e}")
-        else:
-            selected_friendly = self.ids.spinner_audio.text
-            dev_str = self.audio_map.get(selected_friendly, "default")
-            cmd = ["aplay", "-q"]
-            if dev_str != "default":
-                cmd.extend(["-D", dev_str])
-            cmd.append(sound_path)
-            try:
-                subprocess.Popen(cmd, stderr=subprocess.DEVNULL)
-            except Exception as e:
-                print(f"[Hardware] Audio test failed: {e}")
-
-    def set_volume_live(self, value):
-        """Called on_touch_up of slider to set amixer volume."""
+        selected_friendly = self.ids.spinner_audio.text
+        dev_str = self.audio_map.get(selected_friendly, "default")
         try:
-            vol_int = int(value)
-            selected_friendly = self.ids.spinner_audio.text
-            dev_str = self.audio_map.get(selected_friendly, "default")
-            
-            card_flag = []
-            if dev_str.startswith("plughw:"):
-                import re
-                match = re.search(r'plughw:(\d+),', dev_str)
-                if match:
-                    card_flag = ["-c", match.group(1)]
-
-            controls = ["PCM", "Master", "Speaker", "HDMI"]
-            for control in controls:
-                cmd = ["amixer"] + card_flag + ["sset", control, f"{vol_int}%"]
-                subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self.app.sequencer.audio.play(self.ids.spinner_sound.text, dev_str)
         except Exception as e:
-            print(f"Vol Error: {e}")
+            print(f"[Hardware] Audio test failed: {e}")
+
+    def set_volume_live(self, value):
+        """Called on_touch_up of slider; the mixer service applies it off the UI thread."""
+        selected_friendly = self.ids.spinner_audio.text
+        dev_str = self.audio_map.get(selected_friendly, "default")
+        self.app.mixer.set_volume(dev_str, value)
         
 class AppSettingsScreen(Screen):
     """
@@ -2787,6 +2960,56 @@ class UpdatesSettingsScreen(Screen):
         
         
 
+# --- LAZY SCREEN MANAGER ---
+class LazyScreenManager(ScreenManager):
+    """
+    ScreenManager whose screens can be registered as factories. A lazy screen
+    is built and added the first time anything asks for it: get_screen(),
+    setting 'current' (Kivy resolves it through get_screen) or prewarm().
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._factories = {}
+        self.build_times = {}
+
+    def register_lazy(self, name, factory):
+        self._factories[name] = factory
+
+    def is_built(self, name):
+        return name not in self._factories and super().has_screen(name)
+
+    def has_screen(self, name):
+        return name in self._factories or super().has_screen(name)
+
+    def pending_screens(self):
+        return list(self._factories)
+
+    def get_screen(self, name):
+        factory = self._factories.pop(name, None)
+        if factory is not None:
+            t0 = time.perf_counter()
+            self.add_widget(factory())
+            self.build_times[name] = time.perf_counter() - t0
+            print(f"[App] Built screen '{name}' in {self.build_times[name] * 1000:.0f} ms")
+        return super().get_screen(name)
+
+    def prewarm(self, names=None):
+        """Builds pending screens one per frame so no single frame stalls."""
+        queue = list(names) if names else self.pending_screens()
+
+        def _next(dt):
+            while queue:
+                name = queue.pop(0)
+                if name in self._factories:
+                    self.get_screen(name)
+                    break
+            if queue:
+                Clock.schedule_once(_next, 0)
+
+        Clock.schedule_once(_next, 0)
+
+
 class KettleApp(App):
     
     fonts_loaded = BooleanProperty(False)
@@ -2794,66 +3017,169 @@ class KettleApp(App):
     is_settings_dirty = BooleanProperty(False)
     _suppress_dirty = False
     
+    # --- LAZY SCREEN ACCESSORS (built on first use) ---
+    profiles_screen = property(lambda self: self.screen_manager.get_screen('profiles'))
+    editor_screen = property(lambda self: self.screen_manager.get_screen('editor'))
+    step_editor_screen = property(lambda self: self.screen_manager.get_screen('step_editor'))
+    alerts_screen = property(lambda self: self.screen_manager.get_screen('step_alerts'))
+    water_screen = property(lambda self: self.screen_manager.get_screen('water_calc'))
+    help_screen = property(lambda self: self.screen_manager.get_screen('help'))
+    settings_master = property(lambda self: self.screen_manager.get_screen('sys_settings'))
+
     def build(self):
         self.title = "KettleBrain"
+        startup_profiler.mark("build_start")
         src_dir = os.path.dirname(os.path.abspath(__file__))
         project_dir = os.path.dirname(src_dir)
         root_dir = os.path.dirname(project_dir)
         
+        # Only one process may drive the relays; refuse to start next to the daemon.
+        # Taken before SettingsManager, whose load rewrites the settings file.
+        global _control_lock
+        from relay_control import RelayControl, ControlLockHeld, acquire_control_lock
+        try:
+            _control_lock = acquire_control_lock(data_dir_for(root_dir))
+        except ControlLockHeld as e:
+            print(f"[App] {e}")
+            print("[App] Stop kettle_daemon.py (or the other KettleBrain window) first.")
+            raise SystemExit(1)
+
         self.settings_manager = SettingsManager(root_dir)
+        startup_profiler.mark("settings_loaded")
         
         # Initialize Metric State
         sys_units = self.settings_manager.get_system_setting("units", "imperial")
         self.is_metric = (sys_units == "metric")
         
         self.hw = HardwareInterface(self.settings_manager)
+        # Probe / sound card lists are scanned and watched in the background
+        self.device_discovery = DeviceDiscovery(self.hw)
+        # Volume changes run on the mixer's thread; re-probe controls when cards change
+        self.mixer = MixerService()
+        self.device_discovery.subscribe(lambda kind, devices: kind == AUDIO and self.mixer.invalidate())
         
         pending_profile_id = StringProperty(None)
+
+        # Main screen view-model (previous frame, for diffing)
+        self._main_vm = None
+        self._boil_temp_f = None
+        self.ui_write_counter = PropertyWriteCounter()
         
         # Initialize relay control and sequencer
-        from relay_control import RelayControl
         self.relay = RelayControl(self.settings_manager)
         self.sequencer = SequenceManager(self.settings_manager, self.relay, self.hw)
         self.sequencer.enter_manual_mode()
+        # From here the control loop is running: the kettle is controllable
+        startup_profiler.mark("sequencer_ready")
+
+        # Optional HTTP + WebSocket API for phones / other screens
+        self.web_api = None
+        if self.settings_manager.get_system_setting("enable_web_api", False):
+            from web_api import WebApi, DEFAULT_HOST
+            self.web_api = WebApi(
+                self.settings_manager, self.sequencer,
+                self.settings_manager.get_system_setting("web_api_host", DEFAULT_HOST),
+                self.settings_manager.get_system_setting("web_api_port", 8080),
+                self.settings_manager.get_system_setting("web_api_token", "")
+            )
+            self.web_api.start()
         
         # --- SCREEN MANAGER SETUP ---
-        sm = ScreenManager()
-        
-        self.main_screen = MainScreen(name='main')
-        self.profiles_screen = ProfilesScreen(name='profiles')
-        self.editor_screen = ProfileEditorScreen(name='editor')
-        self.step_editor_screen = StepEditorScreen(name='step_editor')
-        self.alerts_screen = StepAlertsScreen(name='step_alerts')
-        
-        # ADDED: Water Screen
-        self.water_screen = WaterScreen(name='water_calc')
+        # Only the dashboard is built before the first frame; every other screen
+        # is a factory built on first navigation (or pre-warmed once idle).
+        sm = LazyScreenManager()
+        self.screen_manager = sm
 
-        # Help Screen
-        self.help_screen = HelpScreen(name='help')
-        
-        # NEW SETTINGS MASTER
-        self.settings_master = SettingsMasterScreen(name='sys_settings')        
-
-        # --- FIX 2: REMOVED ORPHAN INSTANTIATION ---
-        # We do NOT create self.hw_settings_screen here anymore because 
-        # they are created automatically inside SettingsMasterScreen (via KV).
-        # Keeping them here would create duplicate "ghost" screens.
-
-        # Add widgets to ScreenManager
+        self.main_screen = MainScreen(name='main')
         sm.add_widget(self.main_screen)
-        sm.add_widget(self.profiles_screen)
-        sm.add_widget(self.editor_screen)
-        sm.add_widget(self.step_editor_screen)
-        sm.add_widget(self.alerts_screen)
-        sm.add_widget(self.water_screen)
-        sm.add_widget(self.help_screen)
-        
-        # Add the NEW Master
-        sm.add_widget(self.settings_master)        
+        startup_profiler.mark("main_screen_built")
+
+        # Status / step / profile changes are pushed by the sequencer (handled on the Kivy thread)
+        self._seq_events = self.sequencer.events.subscribe(
+            "ui", kinds=(STATUS_CHANGED, STEP_CHANGED, PROFILE_LOADED), maxsize=64,
+            notify=Clock.create_trigger(self._on_sequencer_events)
+        )
+        # Anything that changed before the subscription existed
+        Clock.schedule_once(lambda dt: self._sync_sequencer_view())
+
+        sm.register_lazy('profiles', lambda: ProfilesScreen(name='profiles'))
+        sm.register_lazy('editor', lambda: ProfileEditorScreen(name='editor'))
+        sm.register_lazy('step_editor', lambda: StepEditorScreen(name='step_editor'))
+        sm.register_lazy('step_alerts', lambda: StepAlertsScreen(name='step_alerts'))
+        sm.register_lazy('water_calc', lambda: WaterScreen(name='water_calc'))
+        sm.register_lazy('help', lambda: HelpScreen(name='help'))
+        # Settings children (view_hw, view_cal, ...) come from KV inside the master
+        sm.register_lazy('sys_settings', lambda: SettingsMasterScreen(name='sys_settings'))
                 
-        Clock.schedule_interval(self.update_ui, 0.1)
+        # --- UI REFRESH GOVERNOR (10 Hz / 1-2 Hz / blanked) ---
+        self.ui_governor = UiRateGovernor(self.settings_manager.get_system_setting("screen_timeout", 300))
+        self._blank_overlay = None
+        self._ui_event = Clock.schedule_interval(self._ui_tick, self.ui_governor.interval)
+        Window.bind(on_touch_down=self._on_any_touch)
+
+        startup_profiler.mark("build_done")
         return sm
 
+    def load_kv(self, filename=None):
+        """Times the automatic kettle.kv parse (runs just before build)."""
+        startup_profiler.mark("kv_start")
+        result = super().load_kv(filename)
+        startup_profiler.mark("kv_loaded")
+        return result
+
+    # --- UI RATE GOVERNOR ---
+    def _ui_tick(self, dt):
+        seq = self.sequencer
+        status = seq.status
+        running = (status in [SequenceStatus.RUNNING, SequenceStatus.PAUSED]
+                   or (status == SequenceStatus.MANUAL and getattr(seq, 'is_manual_running', False)))
+        alert = (status == SequenceStatus.WAITING_FOR_USER or bool(getattr(seq, 'current_alert_text', None)))
+
+        was_blank = (self.ui_governor.mode == BLANK)
+        mode, interval = self.ui_governor.decide(running, alert)
+
+        if mode == BLANK and not was_blank:
+            self._blank_screen()
+        elif was_blank and mode != BLANK:
+            self._unblank_screen()
+
+        if interval != self._ui_event.timeout:
+            self._ui_event.cancel()
+            self._ui_event = Clock.schedule_interval(self._ui_tick, interval)
+
+        if mode != BLANK:
+            self.update_ui(dt)
+
+    def _on_any_touch(self, window, touch):
+        """Every touch counts as interaction; the touch that wakes a blank screen is swallowed."""
+        if self.ui_governor.touch():
+            self._unblank_screen()
+            self._ui_event.cancel()
+            self._ui_event = Clock.schedule_interval(self._ui_tick, self.ui_governor.interval)
+            return True
+        return False
+
+    def _blank_screen(self):
+        print("[App] Screen timeout - blanking display, rendering suspended")
+        trend = self.main_screen.ids.get('trend_chart')
+        if trend:
+            trend.stop()
+        if not set_display_power(False):
+            # No controllable backlight: cover everything with black so the canvas stays static
+            overlay = Factory.BlankOverlay()
+            Window.add_widget(overlay)
+            self._blank_overlay = overlay
+
+    def _unblank_screen(self):
+        print("[App] Waking display")
+        set_display_power(True)
+        if self._blank_overlay is not None:
+            Window.remove_widget(self._blank_overlay)
+            self._blank_overlay = None
+        self.invalidate_view_model()
+        if self.main_screen.ids.hero_manager.current == 'hero_trend':
+            self.main_screen.ids.trend_chart.start()
+
     def on_start(self):
         """Called after build() when the window is ready."""
         from kivy.core.window import Window
@@ -2875,6 +3201,20 @@ class KettleApp(App):
         except Exception as e:
             print(f"[App] Window restore error: {e}")
         Clock.schedule_once(self.dismiss_splash, 0.5)
+        Clock.schedule_once(self._report_startup, 0)
+
+        # Build the deferred screens one per idle frame once the dashboard is up
+        if self.settings_manager.get_system_setting("prewarm_screens", True):
+            Clock.schedule_once(lambda dt: self.screen_manager.prewarm(), 2.0)
+
+    def _report_startup(self, dt):
+        """First frame is on screen: log the startup phases and write the report."""
+        startup_profiler.mark("first_frame")
+        print(f"[App] Startup: {startup_profiler.summary()} "
+              f"({len(self.screen_manager.pending_screens())} screens deferred)")
+        path = startup_profiler.write_report(self.settings_manager.data_dir)
+        if path:
+            print(f"[App] Startup report written to {path}")
 
     def dismiss_splash(self, dt):
         """
@@ -2963,294 +3303,109 @@ class KettleApp(App):
         screen = self.main_screen
         status = seq.status
         
-        screen.is_profile_loaded = (seq.current_profile is not None)
-
-        # --- NEW: kWh Calculation & Display ---
-        ws = getattr(seq, 'total_watt_seconds', 0.0)
-        kwh = ws / 3600000.0
-        cost = kwh * screen.cost_per_kwh
-        screen.kwh_display_text = f"kWh: {kwh:.3f} $ {cost:.2f}"
-        
-        # --- UNIT CONVERSION PREP ---
-        unit = "C" if self.is_metric else "F"
-        
-        # --- 1. TEMPERATURE COLORS ONLY ---
-        raw_temp = seq.current_temp
-        safe_temp_f = raw_temp if raw_temp is not None else 0.0
-        tgt_check_f = seq.get_target_temp()
-        
-        if tgt_check_f:
-            diff = safe_temp_f - tgt_check_f
-            if abs(diff) < 1.0: 
-                screen.temp_color = [0.2, 0.8, 0.2, 1] 
-            elif diff < 0: 
-                screen.temp_color = [0.2, 0.4, 0.8, 1] 
-            else: 
-                screen.temp_color = [0.8, 0.2, 0.2, 1] 
-        else:
-            screen.temp_color = [0.2, 0.8, 0.2, 1] 
-            
-        # --- 2. UPDATE LABELS (Temp, Target, Timer) ---
-        if raw_temp is None:
-            screen.display_temp = f"-.- °{unit}"
-        else:
-            user_temp = self.to_user_units(safe_temp_f, 'temp')
-            screen.display_temp = f"{user_temp:.1f} °{unit}"
-        
-        screen.display_timer = seq.get_display_timer()
-        screen.display_elapsed = seq.get_global_elapsed_time_str()
-        
-        # TARGET TEMP LOGIC
-        try:
-            sys_boil_f = float(self.settings_manager.get_system_setting("boil_temp_f", 212.0))
-        except:
-            sys_boil_f = 212.0
-            
-        raw_target_f = 0.0
-        is_boil_type = False
-
-        if status == SequenceStatus.MANUAL:
-            if getattr(seq, 'is_manual_running', False):
-                raw_target_f = seq.target_temp
-            else:
-                raw_target_f = self.to_backend_units(screen.slider_temp_val, 'temp')
-
-        elif status == SequenceStatus.DELAYED_WAIT:
-             raw_target_f = getattr(seq, 'delayed_target_temp', 0.0)
-
-        elif seq.current_profile and seq.current_step_index >= 0 and seq.current_step_index < len(seq.current_profile.steps):
-            step = seq.current_profile.steps[seq.current_step_index]
-            if step.step_type == StepType.BOIL:
-                is_boil_type = True
-            else:
-                raw_target_f = float(step.setpoint_f) if step.setpoint_f is not None else 0.0
-        
-        is_high_temp = (raw_target_f >= sys_boil_f)
-        
-        if is_boil_type:
-            user_boil = self.to_user_units(sys_boil_f, 'boil_temp')
-            screen.display_target = f"{int(user_boil)} (BOIL)"
-        elif is_high_temp:
-            user_val = self.to_user_units(raw_target_f, 'temp')
-            screen.display_target = f"{int(user_val)} (BOIL)"
-        elif raw_target_f < 60: 
-            screen.display_target = "--"
-        else:
-            user_target = self.to_user_units(raw_target_f, 'temp')
-            screen.display_target = f"{int(user_target)} °{unit}"
-
-        # --- 3. HEARTBEAT PULSE ---
-        import time
-        now = time.time()
-        
-        is_manual_active = (status == SequenceStatus.MANUAL and getattr(seq, 'is_manual_running', False))
-        is_auto_active = (status == SequenceStatus.RUNNING or status == SequenceStatus.WAITING_FOR_USER)
-
-        if is_manual_active or is_auto_active:
-            if int(now * 2) % 2 == 0: screen.heartbeat_color = [0, 1, 0, 1] 
-            else: screen.heartbeat_color = [0, 0.3, 0, 1]
-        elif status == SequenceStatus.PAUSED:
-            if int(now * 2) % 2 == 0: screen.heartbeat_color = [0.2, 0.4, 0.8, 1] 
-            else: screen.heartbeat_color = [0.1, 0.2, 0.4, 1] 
-        elif status == SequenceStatus.DELAYED_WAIT:
-            if int(now) % 2 == 0: screen.heartbeat_color = [0.2, 0.6, 0.8, 1]
-            else: screen.heartbeat_color = [0.1, 0.3, 0.4, 1]
-        else:
-            screen.heartbeat_color = [0.2, 0.2, 0.2, 1]
-            
-        # --- 4. HEATER INDICATORS (UPDATED 3-RELAY: Heater3) ---
-        relay_obj = getattr(seq, 'relay', getattr(seq, 'relays', None))
-        if relay_obj and hasattr(relay_obj, 'relay_states'):
-            states = relay_obj.relay_states
-            screen.heater_1_active = states.get("Heater1", False)
-            screen.heater_2_active = states.get("Heater2", False)
-            screen.heater_3_active = states.get("Heater3", False)
-        else:
-            screen.heater_1_active = False
-            screen.heater_2_active = False
-            screen.heater_3_active = False
-
-        # --- 5. STATUS TEXT & PREDICTION ---
-        sys_msg = seq.get_status_message()
-        
-        if seq.current_profile:
-            screen.display_profile_name = f"Profile: {seq.current_profile.name}"
-        else:
-            screen.display_profile_name = ""
+        # --- 1-5. VIEW-MODEL: build, diff, push only changed fields ---
+        if self._boil_temp_f is None:
+            try:
+                self._boil_temp_f = float(self.settings_manager.get_system_setting("boil_temp_f", 212.0))
+            except:
+                self._boil_temp_f = 212.0
 
-        if status == SequenceStatus.DELAYED_WAIT:
-             if hasattr(seq, 'get_delayed_status_msg'):
-                msg = seq.get_delayed_status_msg()
-                screen.display_status = f"SLEEPING\n{msg}"
-             else:
-                screen.display_status = "DELAY ACTIVE"
-        elif status == SequenceStatus.MANUAL:
-            if "ALERT" in sys_msg:
-                screen.display_status = sys_msg
-            else:
-                if hasattr(screen, '_update_prediction'): 
-                    screen._update_prediction()
-        else:
-            screen.display_status = sys_msg
+        vm = build_main_view_model(
+            seq, self.is_metric, self._boil_temp_f, screen.cost_per_kwh,
+            self.to_backend_units(screen.slider_temp_val, 'temp')
+        )
+        changes = diff_view_models(self._main_vm, vm)
+        for name, value in changes:
+            setattr(screen, name, value)
+        self._main_vm = vm
+        self.ui_write_counter.add(len(changes))
 
-        # --- 6. VIEW SWITCHING ---
-        if screen.last_status == SequenceStatus.DELAYED_WAIT and status == SequenceStatus.MANUAL:
-            screen.ids.center_content.current = 'page_manual'
-            if hasattr(screen, '_update_prediction'): screen._update_prediction()
+        # Manual mode: the prediction owns the status line unless alerting
+        if status == SequenceStatus.MANUAL and vm.display_status is None:
+            screen._update_prediction()
 
-        elif status == SequenceStatus.MANUAL:
-            if screen.ids.center_content.current != 'page_manual': 
-                screen.ids.center_content.current = 'page_manual'
-                if hasattr(screen, '_update_prediction'): screen._update_prediction()
-                
-        elif status in [SequenceStatus.RUNNING, SequenceStatus.PAUSED, SequenceStatus.WAITING_FOR_USER]:
-            if screen.ids.center_content.current != 'page_auto': 
-                screen.ids.center_content.current = 'page_auto'
-
-        # --- 7. AUTO MODE LIST REFRESH ---
+        # --- 6. STEP LIST: predicted times drift while running (changes arrive as events) ---
         now = time.time()
-        current_id = seq.current_profile.id if seq.current_profile else None
-        current_idx = seq.current_step_index
-        
-        if not hasattr(screen, 'last_refresh_time'): screen.last_refresh_time = 0
-        
-        should_refresh = False
-        if current_id != screen.last_profile_id or current_idx != screen.last_step_index:
-            should_refresh = True
-        elif seq.status == SequenceStatus.RUNNING and (now - screen.last_refresh_time > 10.0):
-            should_refresh = True
-            
-        if should_refresh:
+        if status == SequenceStatus.RUNNING and (now - screen.last_refresh_time > 10.0):
             screen.refresh_step_list()
-            screen.last_profile_id = current_id
-            screen.last_step_index = current_idx
             screen.last_refresh_time = now
 
-        # --- 8. ACTION BUTTON TEXT ---
-        desired_text = "START"
-        desired_color = [0.2, 0.8, 0.4, 1]
-
-        if status == SequenceStatus.MANUAL: 
-            if getattr(seq, 'is_manual_running', False):
-                desired_text = "PAUSE"
-                desired_color = [0.2, 0.4, 0.8, 1] 
-            else:
-                if getattr(seq, 'temp_reached', False):
-                    desired_text = "RESUME"
-                    desired_color = [1, 0.8, 0, 1] 
-                else:
-                    desired_text = "START"
-                    desired_color = [0.2, 0.8, 0.4, 1]
-        elif status == SequenceStatus.RUNNING: 
-            desired_text = "PAUSE"
-            desired_color = [0.2, 0.4, 0.8, 1]
-        elif status == SequenceStatus.PAUSED: 
-            desired_text = "RESUME"
-            desired_color = [1, 0.8, 0, 1]
-        elif status == SequenceStatus.WAITING_FOR_USER:
-            if seq.current_alert_text == "Step Complete": 
-                desired_text = "NEXT STEP"
-                desired_color = [0.2, 0.8, 0.4, 1]
-            else: 
-                desired_text = "CONFIRM"
-                desired_color = [0.8, 0.4, 0.2, 1]
-        else: 
-            desired_text = "START"
-            desired_color = [0.2, 0.8, 0.4, 1]
-
-        # ONLY update Kivy if the values changed
-        if screen.action_button_text != desired_text:
-            screen.action_button_text = desired_text
-            
-        if screen.action_button_color != desired_color:
-            screen.action_button_color = desired_color
-        
-        # # --- 8. ACTION BUTTON TEXT ---
-        # if status == SequenceStatus.MANUAL: 
-            # if getattr(seq, 'is_manual_running', False):
-                # screen.action_button_text = "PAUSE"
-                # screen.action_button_color = [0.2, 0.4, 0.8, 1] 
-            # else:
-                # if getattr(seq, 'temp_reached', False):
-                    # screen.action_button_text = "RESUME"
-                    # screen.action_button_color = [1, 0.8, 0, 1] 
-                # else:
-                    # screen.action_button_text = "START"
-                    # screen.action_button_color = [0.2, 0.8, 0.4, 1]
-        # elif status == SequenceStatus.RUNNING: 
-            # screen.action_button_text = "PAUSE"
-            # screen.action_button_color = [0.2, 0.4, 0.8, 1]
-        # elif status == SequenceStatus.PAUSED: 
-            # screen.action_button_text = "RESUME"
-            # screen.action_button_color = [1, 0.8, 0, 1]
-        # elif status == SequenceStatus.WAITING_FOR_USER:
-            # if seq.current_alert_text == "Step Complete": 
-                # screen.action_button_text = "NEXT STEP"
-                # screen.action_button_color = [0.2, 0.8, 0.4, 1]
-            # else: 
-                # screen.action_button_text = "CONFIRM"
-                # screen.action_button_color = [0.8, 0.4, 0.2, 1]
-        # else: 
-            # screen.action_button_text = "START"
-            # screen.action_button_color = [0.2, 0.8, 0.4, 1]
-
-        # --- 9. DELAYED START SYNC ---
-        if status == SequenceStatus.DELAYED_WAIT:
-            screen.is_delay_active = True
-            screen.controls_disabled = True
-            screen.delay_btn_text = "DELAY ACTIVE"
-            screen.delay_btn_color = [0.2, 0.6, 0.8, 1]
-            screen.delay_btn_disabled = False
-        elif status == SequenceStatus.MANUAL:
-            screen.is_delay_active = False
-            screen.controls_disabled = False
-            screen.delay_btn_text = "DELAY START"
-            screen.delay_btn_color = [0.2, 0.2, 0.4, 1]
-            screen.delay_btn_disabled = False
-        else:
-            screen.is_delay_active = False
-            screen.controls_disabled = False
-            screen.delay_btn_text = "DELAY START"
-            screen.delay_btn_color = [0.2, 0.2, 0.4, 1]
-            screen.delay_btn_disabled = True
-            
         # Update Est. End Label
         if hasattr(screen, '_update_est_end'):
             screen._update_est_end()
-                  
-        screen.last_status = status
+
+    def _on_sequencer_events(self, *args):
+        """Applies queued sequencer events: view switching and step list refresh."""
+        screen = self.main_screen
+        refresh = False
+        for event in self._seq_events.drain():
+            if event.kind == STATUS_CHANGED:
+                self._switch_center_view(event.data['old'], event.data['new'])
+            else:
+                if event.kind == PROFILE_LOADED:
+                    screen.invalidate_step_rows()
+                refresh = True
+        if refresh:
+            screen.refresh_step_list()
+            screen.last_refresh_time = time.time()
+
+    def _sync_sequencer_view(self):
+        self._switch_center_view(None, self.sequencer.status)
+        self.main_screen.refresh_step_list()
+        self.main_screen.last_refresh_time = time.time()
+
+    def _switch_center_view(self, old, new):
+        screen = self.main_screen
+        center = screen.ids.center_content
+        if new == SequenceStatus.MANUAL:
+            # Includes a delayed start firing (DELAYED_WAIT -> MANUAL)
+            if center.current != 'page_manual' or old == SequenceStatus.DELAYED_WAIT:
+                center.current = 'page_manual'
+                if hasattr(screen, '_update_prediction'): screen._update_prediction()
+        elif new in [SequenceStatus.RUNNING, SequenceStatus.PAUSED, SequenceStatus.WAITING_FOR_USER]:
+            if center.current != 'page_auto':
+                center.current = 'page_auto'
     
+    def invalidate_view_model(self):
+        """Forces the next update_ui to push every field (after something else wrote to the screen)."""
+        self._main_vm = None
+        self._boil_temp_f = None
+
     def refresh_all_screens(self):
         """
         Called when Global Units change. Forces screens to re-configure their sliders/labels.
         """
         print(f"[App] Refreshing all screens. Metric={self.is_metric}")
+        self.invalidate_view_model()
+        self.ui_governor.set_screen_timeout(self.settings_manager.get_system_setting("screen_timeout", 300))
         
-        # 1. Main Screen (Manual Sliders)
+        # 1. Main Screen (Manual Sliders, step list strings)
         if self.main_screen:
             self.main_screen._load_manual_settings()
+            self.main_screen.invalidate_step_rows()
             
         # 2. Water Screen (Run its existing converter)
-        if self.water_screen:
+        if self.screen_manager.is_built('water_calc'):
             self.water_screen.convert_values(self.is_metric)
             
         # --- FIX 3: TARGET THE MASTER SCREEN CHILDREN ---
         # We access the IDs defined in kettle.kv (view_hw, view_cal, view_app)
         
         # 3. Hardware Settings
-        if self.settings_master and 'view_hw' in self.settings_master.ids:
+        built = self.screen_manager.is_built('sys_settings')
+        if built and 'view_hw' in self.settings_master.ids:
             self.settings_master.ids.view_hw.on_pre_enter()
             
         # 4. Calibration Settings
-        if self.settings_master and 'view_cal' in self.settings_master.ids:
+        if built and 'view_cal' in self.settings_master.ids:
             self.settings_master.ids.view_cal.on_pre_enter()
             
         # 5. App Settings
-        if self.settings_master and 'view_app' in self.settings_master.ids:
+        if built and 'view_app' in self.settings_master.ids:
             self.settings_master.ids.view_app.on_pre_enter()
             
         # 6. Profile Editor
-        if self.editor_screen:
+        if self.screen_manager.is_built('editor'):
             self.editor_screen.refresh_steps()
     
     def open_profile_options(self, profile_id, profile_name):
@@ -3295,6 +3450,7 @@ class KettleApp(App):
             self.root.current = 'main'
             self.main_screen.ids.center_content.current = 'page_auto'
             # Trigger refresh
+            self.main_screen.invalidate_step_rows()
             self.main_screen.refresh_step_list()
     
     def copy_profile(self, profile_id):
@@ -3388,9 +3544,13 @@ class KettleApp(App):
             s.setpoint_f = float(data["temp"])
             s.duration_min = float(data["dur"])
             
+            # Steps are slotted (no ad-hoc attributes); a single power value
+            # applies to both ramp and hold, matching the schema v1 migration.
             try:
-                s.power_watts = int(data["power"])
-            except: s.power_watts = 1800
+                watts = int(data["power"])
+            except: watts = 1800
+            s.ramp_power_watts = watts
+            s.hold_power_watts = watts
             
             try:
                 s.lauter_volume = float(data["vol"]) if data["vol"] else None
@@ -3406,6 +3566,8 @@ class KettleApp(App):
     def on_stop(self):
         """Called by Kivy when the app is closing normally."""
         print("[App] Stopping...")
+        print(f"[App] Main screen property writes: {self.ui_write_counter.summary()}")
+        print(f"[App] UI refresh modes: {self.ui_governor.summary()}")
         try:
             from kivy.core.window import Window
             if hasattr(self, 'settings_manager') and self.settings_manager:
@@ -3418,15 +3580,30 @@ class KettleApp(App):
                 print(f"[App] Window saved: pos({Window.left},{Window.top}) size({safe_w}x{safe_h})")
         except Exception as e:
             print(f"[App] Window save error: {e}")
+        if getattr(self, 'web_api', None):
+            self.web_api.close()
+            print(f"[App] Web API: {self.web_api.summary()}")
         if hasattr(self, 'sequencer'):
-            self.sequencer.stop()
+            # Ends the session and flushes the loggers before their threads die with the process
+            try:
+                self.sequencer.submit("shutdown").result(SHUTDOWN_WAIT_S)
+            except Exception as e:
+                print(f"[App] Sequencer shutdown incomplete: {e}")
+            print(f"[App] Alert audio: {self.sequencer.audio.summary()}")
+            print(f"[App] Control commands: {self.sequencer.command_summary()}")
+            print(f"[App] Sequencer events: {self.sequencer.events.summary()}")
+            self.sequencer.audio.close()
+        if hasattr(self, 'device_discovery'):
+            self.device_discovery.close()
+        if hasattr(self, 'mixer'):
+            print(f"[App] Mixer: {self.mixer.summary()}")
+            self.mixer.close()
         if hasattr(self, 'relay'):
             self.relay.stop_all()
             
         # Release resources
         if hasattr(self, 'hw'):
-            # If HardwareInterface has a cleanup, call it
-            pass
+            self.hw.close()
             
     # --- GLOBAL UNIT CONVERSION HELPERS ---
     
@@ -4091,67 +4268,16 @@ class WaterScreen(Screen):
         # 3. Save to Disk
         # FIX: Correct method is save_profile(profile_object)
         app.sequencer.settings.save_profile(app.sequencer.current_profile)
+        app.sequencer.recompile_plan()
+        app.sequencer.invalidate_schedule()
+        if app.main_screen:
+            app.main_screen.invalidate_step_rows()
         
         # 4. Exit
         self.save_and_exit()
 
 
-def run_splash_screen(queue):
-    """
-    Runs a standalone Tkinter loading dialog in a separate process.
-    This appears immediately, independent of Kivy's loading time.
-    """
-    import tkinter as tk
-
-    try:
-        root = tk.Tk()
-        # Remove window decorations (frameless)
-        root.overrideredirect(True)
-        # Keep on top of the launching Kivy window
-        root.attributes('-topmost', True)
-
-        # Calculate center position
-        width = 300
-        height = 80
-        screen_width = root.winfo_screenwidth()
-        screen_height = root.winfo_screenheight()
-        x = (screen_width // 2) - (width // 2)
-        y = (screen_height // 2) - (height // 2)
-
-        root.geometry(f'{width}x{height}+{x}+{y}')
-        root.configure(bg='#222222')
-
-        # Add a simple styled frame
-        frame = tk.Frame(root, bg='#222222', highlightbackground='#FFC107', highlightthickness=2)
-        frame.pack(fill='both', expand=True)
-
-        lbl = tk.Label(frame, text="KettleBrain app loading...", font=("Arial", 16, "bold"), fg="#FFC107", bg="#222222")
-        lbl.pack(expand=True)
-
-        # Force a draw immediately
-        root.update()
-
-        # Check for kill signal every 100ms
-        def check_kill():
-            if not queue.empty():
-                root.destroy()
-            else:
-                root.after(100, check_kill)
-
-        root.after(100, check_kill)
-        root.mainloop()
-    except Exception as e:
-        print(f"Splash screen error: {e}")
-
-
 if __name__ == '__main__':
-    import multiprocessing
-
-    # 1. Start the Splash Screen immediately in a separate process
-    splash_queue = multiprocessing.Queue()
-    splash_process = multiprocessing.Process(target=run_splash_screen, args=(splash_queue,))
-    splash_process.start()
-
     try:
         app = KettleApp()
         app.splash_queue = splash_queue
@@ -4160,5 +4286,5 @@ if __name__ == '__main__':
         print("\nKettleBrain App interrupted by user.")
     finally:
         # Ensure splash process is terminated on exit
-        if splash_process.is_alive():
+        if splash_process is not None and splash_process.is_alive():
             splash_process.terminate()
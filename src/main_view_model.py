@@ -0,0 +1,237 @@
+"""
+kettlebrain app
+main_view_model.py
+
+View-model for the main screen. build_main_view_model() turns sequencer state
+into an immutable MainViewModel without touching any widget; the app diffs
+it against the previous frame and only pushes the fields that changed, so a
+steady 10 Hz refresh no longer re-dispatches every Kivy property.
+
+Field names match the MainScreen properties they feed. A value of None means
+"not owned by the view-model this frame" and is never written.
+"""
+
+import time
+from collections import namedtuple
+
+from profile_data import StepType, SequenceStatus
+
+MAIN_VM_FIELDS = (
+    "is_profile_loaded",
+    "kwh_display_text",
+    "temp_color",
+    "display_temp",
+    "display_target",
+    "display_timer",
+    "display_elapsed",
+    "heartbeat_color",
+    "heater_1_active",
+    "heater_2_active",
+    "heater_3_active",
+    "display_profile_name",
+    "display_status",
+    "action_button_text",
+    "action_button_color",
+    "is_delay_active",
+    "controls_disabled",
+    "delay_btn_text",
+    "delay_btn_color",
+    "delay_btn_disabled",
+)
+
+MainViewModel = namedtuple("MainViewModel", MAIN_VM_FIELDS)
+
+# --- COLORS (tuples so the view-model stays immutable) ---
+GREEN = (0.2, 0.8, 0.2, 1)
+BLUE = (0.2, 0.4, 0.8, 1)
+RED = (0.8, 0.2, 0.2, 1)
+
+BTN_START = (0.2, 0.8, 0.4, 1)
+BTN_PAUSE = (0.2, 0.4, 0.8, 1)
+BTN_RESUME = (1, 0.8, 0, 1)
+BTN_CONFIRM = (0.8, 0.4, 0.2, 1)
+
+DELAY_ACTIVE = (0.2, 0.6, 0.8, 1)
+DELAY_IDLE = (0.2, 0.2, 0.4, 1)
+
+
+def _user_temp(temp_f, is_metric):
+    return (temp_f - 32) * 5 / 9 if is_metric else temp_f
+
+
+def _target_text(seq, status, is_metric, unit, boil_temp_f, manual_target_f):
+    raw_target_f = 0.0
+    is_boil_type = False
+
+    if status == SequenceStatus.MANUAL:
+        if getattr(seq, 'is_manual_running', False):
+            raw_target_f = seq.target_temp
+        else:
+            raw_target_f = manual_target_f
+    elif status == SequenceStatus.DELAYED_WAIT:
+        raw_target_f = getattr(seq, 'delayed_target_temp', 0.0)
+    elif seq.current_profile and 0 <= seq.current_step_index < len(seq.current_profile.steps):
+        step = seq.current_profile.steps[seq.current_step_index]
+        if step.step_type == StepType.BOIL:
+            is_boil_type = True
+        else:
+            raw_target_f = float(step.setpoint_f) if step.setpoint_f is not None else 0.0
+
+    if is_boil_type:
+        return f"{int(_user_temp(boil_temp_f, is_metric))} (BOIL)"
+    if raw_target_f >= boil_temp_f:
+        return f"{int(_user_temp(raw_target_f, is_metric))} (BOIL)"
+    if raw_target_f < 60:
+        return "--"
+    return f"{int(_user_temp(raw_target_f, is_metric))} °{unit}"
+
+
+def _heartbeat(status, seq, now):
+    manual_active = (status == SequenceStatus.MANUAL and getattr(seq, 'is_manual_running', False))
+    auto_active = status in (SequenceStatus.RUNNING, SequenceStatus.WAITING_FOR_USER)
+
+    if manual_active or auto_active:
+        return (0, 1, 0, 1) if int(now * 2) % 2 == 0 else (0, 0.3, 0, 1)
+    if status == SequenceStatus.PAUSED:
+        return (0.2, 0.4, 0.8, 1) if int(now * 2) % 2 == 0 else (0.1, 0.2, 0.4, 1)
+    if status == SequenceStatus.DELAYED_WAIT:
+        return (0.2, 0.6, 0.8, 1) if int(now) % 2 == 0 else (0.1, 0.3, 0.4, 1)
+    return (0.2, 0.2, 0.2, 1)
+
+
+def _action_button(seq, status):
+    if status == SequenceStatus.MANUAL:
+        if getattr(seq, 'is_manual_running', False):
+            return "PAUSE", BTN_PAUSE
+        if getattr(seq, 'temp_reached', False):
+            return "RESUME", BTN_RESUME
+        return "START", BTN_START
+    if status == SequenceStatus.RUNNING:
+        return "PAUSE", BTN_PAUSE
+    if status == SequenceStatus.PAUSED:
+        return "RESUME", BTN_RESUME
+    if status == SequenceStatus.WAITING_FOR_USER:
+        if seq.current_alert_text == "Step Complete":
+            return "NEXT STEP", BTN_START
+        return "CONFIRM", BTN_CONFIRM
+    return "START", BTN_START
+
+
+def build_main_view_model(seq, is_metric, boil_temp_f, cost_per_kwh, manual_target_f, now=None):
+    """
+    Pure read of sequencer state. manual_target_f is the manual slider target
+    (imperial), used while manual mode is set up but not yet running.
+    """
+    if now is None:
+        now = time.time()
+    status = seq.status
+    unit = "C" if is_metric else "F"
+
+    # Energy
+    kwh = getattr(seq, 'total_watt_seconds', 0.0) / 3600000.0
+    kwh_text = f"kWh: {kwh:.3f} $ {kwh * cost_per_kwh:.2f}"
+
+    # Temperature + color
+    raw_temp = seq.current_temp
+    safe_temp_f = raw_temp if raw_temp is not None else 0.0
+    tgt_check_f = seq.get_target_temp()
+    if tgt_check_f:
+        diff = safe_temp_f - tgt_check_f
+        if abs(diff) < 1.0:
+            temp_color = GREEN
+        elif diff < 0:
+            temp_color = BLUE
+        else:
+            temp_color = RED
+    else:
+        temp_color = GREEN
+
+    if raw_temp is None:
+        temp_text = f"-.- °{unit}"
+    else:
+        temp_text = f"{_user_temp(safe_temp_f, is_metric):.1f} °{unit}"
+
+    # Heaters
+    relay_obj = getattr(seq, 'relay', getattr(seq, 'relays', None))
+    states = getattr(relay_obj, 'relay_states', None) or {}
+
+    # Status text (manual mode hands it to the prediction label unless alerting)
+    sys_msg = seq.get_status_message()
+    if status == SequenceStatus.DELAYED_WAIT:
+        if hasattr(seq, 'get_delayed_status_msg'):
+            status_text = f"SLEEPING\n{seq.get_delayed_status_msg()}"
+        else:
+            status_text = "DELAY ACTIVE"
+    elif status == SequenceStatus.MANUAL:
+        status_text = sys_msg if "ALERT" in sys_msg else None
+    else:
+        status_text = sys_msg
+
+    action_text, action_color = _action_button(seq, status)
+
+    # Delayed start controls
+    delay_active = (status == SequenceStatus.DELAYED_WAIT)
+
+    return MainViewModel(
+        is_profile_loaded=(seq.current_profile is not None),
+        kwh_display_text=kwh_text,
+        temp_color=temp_color,
+        display_temp=temp_text,
+        display_target=_target_text(seq, status, is_metric, unit, boil_temp_f, manual_target_f),
+        display_timer=seq.get_display_timer(),
+        display_elapsed=seq.get_global_elapsed_time_str(),
+        heartbeat_color=_heartbeat(status, seq, now),
+        heater_1_active=bool(states.get("Heater1", False)),
+        heater_2_active=bool(states.get("Heater2", False)),
+        heater_3_active=bool(states.get("Heater3", False)),
+        display_profile_name=f"Profile: {seq.current_profile.name}" if seq.current_profile else "",
+        display_status=status_text,
+        action_button_text=action_text,
+        action_button_color=action_color,
+        is_delay_active=delay_active,
+        controls_disabled=delay_active,
+        delay_btn_text="DELAY ACTIVE" if delay_active else "DELAY START",
+        delay_btn_color=DELAY_ACTIVE if delay_active else DELAY_IDLE,
+        delay_btn_disabled=not (delay_active or status == SequenceStatus.MANUAL),
+    )
+
+
+def diff_view_models(prev, cur):
+    """(name, value) pairs that changed since prev. prev=None means everything."""
+    if prev is None:
+        return [(name, value) for name, value in zip(MAIN_VM_FIELDS, cur) if value is not None]
+    return [
+        (name, value)
+        for name, old, value in zip(MAIN_VM_FIELDS, prev, cur)
+        if value is not None and value != old
+    ]
+
+
+class PropertyWriteCounter:
+    """Counts widget property writes and reports them per second."""
+
+    def __init__(self):
+        self.total = 0
+        self.frames = 0
+        self.rate = 0.0       # writes/s over the last full second
+        self.peak = 0.0
+        self._window_start = time.monotonic()
+        self._window_writes = 0
+
+    def add(self, writes):
+        self.total += writes
+        self.frames += 1
+        self._window_writes += writes
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.rate = self._window_writes / elapsed
+            if self.rate > self.peak:
+                self.peak = self.rate
+            self._window_start = now
+            self._window_writes = 0
+
+    def summary(self):
+        per_frame = (self.total / self.frames) if self.frames else 0.0
+        return (f"{self.rate:.1f} writes/s (peak {self.peak:.1f}), "
+                f"{per_frame:.2f} of {len(MAIN_VM_FIELDS)} fields per frame")
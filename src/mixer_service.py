@@ -0,0 +1,123 @@
+"""
+kettlebrain app
+mixer_service.py
+
+Off-thread ALSA volume control. Each card is probed once (`amixer scontrols`)
+for which of the usual volume controls it actually has, and the answer is
+cached until the device list changes. set_volume() only stores the request;
+a worker thread applies the latest one, so dragging the slider back and forth
+costs at most one amixer run per control in flight plus one for the final
+value.
+"""
+
+import re
+import subprocess
+import threading
+
+# Tried in this order; most cards have one or two of them
+VOLUME_CONTROLS = ["PCM", "Master", "Speaker", "Headphone", "HDMI"]
+
+_CARD_RE = re.compile(r'(?:plug)?hw:(?:CARD=)?(\d+)')
+_SCONTROL_RE = re.compile(r"Simple mixer control '([^']+)',\d+")
+
+
+def card_for_device(dev_str):
+    """ALSA card number for a device string like 'plughw:1,0', or None for the default card."""
+    match = _CARD_RE.search(dev_str or "")
+    return match.group(1) if match else None
+
+
+def _amixer(card, *args):
+    cmd = ["amixer"]
+    if card is not None:
+        cmd += ["-c", card]
+    return cmd + list(args)
+
+
+class MixerService:
+    def __init__(self):
+        self._controls = {}         # card -> [control names], probed once
+        self._pending = None        # (card, percent); newer requests overwrite it
+        self._cond = threading.Condition()
+        self._stop = False
+        self._available = True
+
+        # --- STATS ---
+        self.requested = 0
+        self.applied = 0
+        self.superseded = 0
+        self.last_volume = {}       # card -> last percent applied
+
+        self._thread = threading.Thread(target=self._run, name="MixerService", daemon=True)
+        self._thread.start()
+
+    # --- PUBLIC API ---
+
+    def set_volume(self, dev_str, percent):
+        """Requests a volume for the card behind dev_str. Never blocks."""
+        with self._cond:
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = (card_for_device(dev_str), int(percent))
+            self.requested += 1
+            self._cond.notify()
+
+    def invalidate(self):
+        """Forgets probed controls (call when the sound cards change)."""
+        with self._cond:
+            self._controls = {}
+
+    def close(self, timeout=2.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def summary(self):
+        return f"{self.requested} requested, {self.applied} applied, {self.superseded} superseded"
+
+    # --- WORKER ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                card, percent = self._pending
+                self._pending = None
+            try:
+                self._apply(card, percent)
+            except Exception as e:
+                print(f"[Mixer] Volume error: {e}")
+
+    def controls_for(self, card):
+        controls = self._controls.get(card)
+        if controls is None:
+            controls = self._probe(card)
+            with self._cond:
+                self._controls[card] = controls
+        return controls
+
+    def _probe(self, card):
+        if not self._available:
+            return []
+        try:
+            result = subprocess.run(_amixer(card, "scontrols"), capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.SubprocessError) as e:
+            # No amixer (Windows / dev box): stop trying
+            print(f"[Mixer] amixer unavailable: {e}")
+            self._available = False
+            return []
+        present = set(_SCONTROL_RE.findall(result.stdout))
+        controls = [c for c in VOLUME_CONTROLS if c in present]
+        print(f"[Mixer] Card {card if card is not None else 'default'} volume controls: {controls or 'none'}")
+        return controls
+
+    def _apply(self, card, percent):
+        for control in self.controls_for(card):
+            subprocess.run(_amixer(card, "-q", "sset", control, f"{percent}%"),
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=5)
+        self.applied += 1
+        self.last_volume[card] = percent
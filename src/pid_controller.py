@@ -14,11 +14,13 @@ class PIDController:
         self._last_time = None
         self._integral = 0.0
         self._last_error = 0.0
+        self.last_output = 0.0
 
     def reset(self):
         self._last_time = None
         self._integral = 0.0
         self._last_error = 0.0
+        self.last_output = 0.0
 
     def compute(self, current_value, setpoint):
         now = time.monotonic()
@@ -67,5 +69,6 @@ class PIDController:
         # State updates
         self._last_error = error
         self._last_time = now
+        self.last_output = output
 
         return output
@@ -0,0 +1,79 @@
+"""
+kettlebrain app
+profile_bench.py
+
+Microbenchmark for the profile codec: inflating and serializing N profiles.
+Usage: python profile_bench.py [count] [repeats]
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+from profile_data import BrewProfile, BrewStep, BrewAddition, StepType, TimeoutBehavior
+
+
+def make_sample_profile(i, legacy=False):
+    """Builds a stored-profile dict shaped like a typical 5 step recipe."""
+    profile = BrewProfile(name=f"Bench Profile {i}")
+    for n, (st, temp, dur) in enumerate([
+        (StepType.PREP_WATER, 155.0, 0.0),
+        (StepType.MASH, 152.0, 60.0),
+        (StepType.MASH_OUT, 168.0, 10.0),
+        (StepType.BOIL, 212.0, 60.0),
+        (StepType.CHILL, 70.0, 0.0),
+    ]):
+        step = BrewStep(name=f"Step {n}", step_type=st, setpoint_f=temp, duration_min=dur,
+                        ramp_power_watts=1800, hold_power_watts=1200,
+                        timeout_behavior=TimeoutBehavior.AUTO_ADVANCE)
+        for t in (60, 30, 10, 5):
+            step.additions.append(BrewAddition(name=f"Addition {t}", time_point_min=t))
+        profile.add_step(step)
+
+    data = profile.to_dict()
+    if legacy:
+        # Schema v1: no version key, one power value per step
+        del data["schema_version"]
+        for s_data in data["steps"]:
+            s_data["power_watts"] = s_data.pop("ramp_power_watts")
+            del s_data["hold_power_watts"]
+    return data
+
+
+def _time_it(label, func, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<28} {best * 1000.0:9.2f} ms (best of {repeats})")
+    return result
+
+
+def run(count=1000, repeats=5):
+    print(f"[ProfileBench] {count} profiles")
+    current = [make_sample_profile(i) for i in range(count)]
+    legacy = [make_sample_profile(i, legacy=True) for i in range(count)]
+    text = json.dumps(current)
+
+    profiles = _time_it("inflate (current schema)", lambda: [BrewProfile.from_dict(d) for d in current], repeats)
+    _time_it("inflate (legacy, upgrade)", lambda: [BrewProfile.from_dict(d) for d in legacy], repeats)
+    _time_it("json.loads + inflate", lambda: [BrewProfile.from_dict(d) for d in json.loads(text)], repeats)
+    _time_it("serialize to_dict", lambda: [p.to_dict() for p in profiles], repeats)
+    _time_it("serialize + json.dumps", lambda: json.dumps([p.to_dict() for p in profiles]), repeats)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [BrewProfile.from_dict(d) for d in current]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    print(f"  {'memory for inflated set':<28} {size / 1024.0:9.1f} KiB ({len(kept)} profiles)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    r = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run(n, r)
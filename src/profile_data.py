@@ -5,6 +5,10 @@ import uuid
 import copy
 from enum import Enum
 
+# Bump when the stored profile layout changes and add a step to _MIGRATIONS.
+# Version 1 is the unversioned legacy layout (single 'power_watts' per step).
+SCHEMA_VERSION = 2
+
 class StepType(Enum):
     STEP = "Step"
     PREP_WATER = "Prep Water"
@@ -31,6 +35,8 @@ class SequenceStatus(Enum):
     DELAYED_WAIT = "DELAY_WAIT"
 
 class BrewAddition:
+    __slots__ = ("id", "name", "time_point_min", "triggered")
+
     def __init__(self, id=None, name="Alert", time_point_min=0, triggered=False):
         self.id = id if id else str(uuid.uuid4())
         self.name = name
@@ -44,7 +50,23 @@ class BrewAddition:
             "time_point_min": self.time_point_min
         }
 
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id=data.get("id"),
+            name=data.get("name", "Alert"),
+            time_point_min=data.get("time_point_min", 0),
+            triggered=False
+        )
+
 class BrewStep:
+    __slots__ = ("id", "name", "step_type", "note",
+                 "setpoint_f", "duration_min", "target_completion_time",
+                 "ramp_power_watts", "hold_power_watts", "timeout_behavior",
+                 "sg_reading", "sg_temp_f", "sg_temp_correction", "sg_corrected_value",
+                 "lauter_temp_f", "lauter_volume", "additions",
+                 "predicted_ready_time")
+
     def __init__(self, id=None, name="New Step", step_type=StepType.STEP, note="", 
                  setpoint_f=None, duration_min=0.0, target_completion_time=None,
                  ramp_power_watts=None, hold_power_watts=None, # <--- CHANGED
@@ -80,6 +102,9 @@ class BrewStep:
         
         self.additions = []
 
+        # Runtime only (set by SequenceManager.update_predictions, never saved)
+        self.predicted_ready_time = "--"
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -103,7 +128,46 @@ class BrewStep:
             "additions": [a.to_dict() for a in self.additions]
         }
 
+    @classmethod
+    def from_dict(cls, data):
+        """Expects data already upgraded to SCHEMA_VERSION."""
+        try:
+            st_enum = StepType(data.get("step_type", "Step"))
+        except ValueError:
+            st_enum = StepType.STEP
+
+        try:
+            tb_enum = TimeoutBehavior(data.get("timeout_behavior", "Manual Advance"))
+        except ValueError:
+            tb_enum = TimeoutBehavior.MANUAL_ADVANCE
+
+        step = cls(
+            id=data.get("id"),
+            name=data.get("name", "New Step"),
+            step_type=st_enum,
+            note=data.get("note", ""),
+            setpoint_f=data.get("setpoint_f"),
+            duration_min=data.get("duration_min", 0.0),
+            target_completion_time=data.get("target_completion_time"),
+            ramp_power_watts=data.get("ramp_power_watts"),
+            hold_power_watts=data.get("hold_power_watts"),
+            timeout_behavior=tb_enum,
+            sg_reading=data.get("sg_reading"),
+            sg_temp_f=data.get("sg_temp_f"),
+            sg_temp_correction=data.get("sg_temp_correction", False),
+            sg_corrected_value=data.get("sg_corrected_value"),
+            lauter_temp_f=data.get("lauter_temp_f"),
+            lauter_volume=data.get("lauter_volume")
+        )
+
+        for add_data in data.get("additions", []):
+            if isinstance(add_data, dict):
+                step.additions.append(BrewAddition.from_dict(add_data))
+        return step
+
 class BrewProfile:
+    __slots__ = ("id", "name", "steps", "water_data", "chemistry_data")
+
     def __init__(self, id=None, name="New Profile", steps=None, water_data=None, chemistry_data=None):
         self.id = id if id else str(uuid.uuid4())
         self.name = name
@@ -118,6 +182,7 @@ class BrewProfile:
 
     def to_dict(self):
         return {
+            "schema_version": SCHEMA_VERSION,
             "id": self.id,
             "name": self.name,
             "water_data": self.water_data,
@@ -127,79 +192,65 @@ class BrewProfile:
 
     @classmethod
     def from_dict(cls, data):
+        """
+        The single inflation path for stored profiles.
+        Older layouts are upgraded first (see upgrade_profile_dict).
+        """
+        data, _ = upgrade_profile_dict(data)
+
         # 1. Reconstruct Steps
         steps = []
         for s_data in data.get("steps", []):
             try:
-                # Determine Step Type
-                st_str = s_data.get("step_type", "Step")
-                try:
-                    st_enum = StepType(st_str)
-                except ValueError:
-                    st_enum = StepType.STEP
-                
-                # Determine Timeout Behavior
-                tb_str = s_data.get("timeout_behavior", "Manual Advance")
-                try:
-                    tb_enum = TimeoutBehavior(tb_str)
-                except ValueError:
-                    tb_enum = TimeoutBehavior.MANUAL_ADVANCE
-                
-                # --- BACKWARD COMPATIBILITY LOGIC ---
-                # Check for new keys. If missing, look for legacy 'power_watts'.
-                # If legacy exists, apply it to BOTH Ramp and Hold.
-                legacy_power = s_data.get("power_watts")
-                ramp_p = s_data.get("ramp_power_watts")
-                hold_p = s_data.get("hold_power_watts")
-                
-                if ramp_p is None: ramp_p = legacy_power
-                if hold_p is None: hold_p = legacy_power
-
-                step = BrewStep(
-                    id=s_data.get("id"),
-                    name=s_data.get("name", "New Step"),
-                    step_type=st_enum,
-                    duration_min=s_data.get("duration_min", 0),
-                    setpoint_f=s_data.get("setpoint_f", 0), # Corrected key from target_temp to setpoint_f
-                    ramp_power_watts=ramp_p, # <--- NEW
-                    hold_power_watts=hold_p, # <--- NEW
-                    timeout_behavior=tb_enum,
-                    sg_reading=s_data.get("sg_reading"),
-                    sg_temp_f=s_data.get("sg_temp_f"),
-                    sg_temp_correction=s_data.get("sg_temp_correction", False),
-                    sg_corrected_value=s_data.get("sg_corrected_value"),
-                    lauter_temp_f=s_data.get("lauter_temp_f"),
-                    lauter_volume=s_data.get("lauter_volume")
-                )
-                
-                # Rehydrate Additions
-                raw_additions = s_data.get("additions", [])
-                for add_data in raw_additions:
-                    if isinstance(add_data, dict):
-                        new_add = BrewAddition(
-                            id=add_data.get("id"),
-                            name=add_data.get("name", "Alert"),
-                            time_point_min=add_data.get("time_point_min", 0),
-                            triggered=False
-                        )
-                        step.additions.append(new_add)
-                
-                steps.append(step)
+                steps.append(BrewStep.from_dict(s_data))
             except Exception as e:
                 print(f"[ProfileData] Error inflating step: {e}")
 
         # 2. Rehydrate Water Data (Ensure defaults exist)
-        w_data = data.get("water_data", {})
+        w_data = data.get("water_data") or {}
         if "tun_capacity" not in w_data:
             w_data["tun_capacity"] = 10.0 
             
         # 3. Rehydrate Chemistry Data
-        c_data = data.get("chemistry_data", {})
+        c_data = data.get("chemistry_data") or {}
 
         return cls(
             id=data.get("id"),
-            name=data.get("name", "New Profile"),
+            name=data.get("name", "Unknown Profile"),
             steps=steps,
             water_data=w_data,
             chemistry_data=c_data
         )
+
+# --- SCHEMA MIGRATIONS ---
+
+def _migrate_v1_to_v2(data):
+    """Split the legacy single 'power_watts' into ramp/hold power."""
+    for s_data in data.get("steps", []):
+        legacy_power = s_data.pop("power_watts", None)
+        if s_data.get("ramp_power_watts") is None:
+            s_data["ramp_power_watts"] = legacy_power
+        if s_data.get("hold_power_watts") is None:
+            s_data["hold_power_watts"] = legacy_power
+
+# from_version -> function that upgrades the dict in place to from_version + 1
+_MIGRATIONS = {
+    1: _migrate_v1_to_v2,
+}
+
+def upgrade_profile_dict(data):
+    """
+    Brings a stored profile dict up to SCHEMA_VERSION.
+    Returns (data, upgraded). When upgraded is True, data is a new dict
+    the caller should write back so the migration never runs again.
+    """
+    version = data.get("schema_version", 1)
+    if version >= SCHEMA_VERSION:
+        return data, False
+
+    data = copy.deepcopy(data)
+    while version < SCHEMA_VERSION:
+        _MIGRATIONS[version](data)
+        version += 1
+    data["schema_version"] = SCHEMA_VERSION
+    return data, True
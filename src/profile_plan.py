@@ -0,0 +1,110 @@
+"""
+kettlebrain app
+profile_plan.py
+
+Compiled, read-only execution plan for a BrewProfile. Everything the control
+loop used to re-derive from the step on every tick (target with its lauter
+fallback, safety clamp, ramp/hold limits with their defaults, open-loop vs PID,
+duration in seconds) is resolved once when the profile is loaded.
+
+Each step's additions are sorted into a trigger timeline (latest time point
+first, i.e. the order they come due as the step counts down). The sequencer
+keeps a cursor into it, so checking for the next due alert is O(1) however
+many additions a step has.
+"""
+
+from collections import namedtuple
+
+from profile_data import StepType, TimeoutBehavior
+
+DEFAULT_STEP_WATTS = 1800
+MAX_TARGET_F = 215.0        # safety clamp on any closed/open-loop target
+TRIGGER_TOLERANCE_MIN = 0.005   # fire an addition up to 0.3 s early
+
+# Control modes
+MODE_OFF = "off"            # no target: timer starts immediately, heaters off
+MODE_PID = "pid"
+MODE_OPEN = "open"          # boil steps / targets at or above boil: full step limit
+
+StepPlan = namedtuple("StepPlan", [
+    "index", "name", "step_type",
+    "target_f",             # display target (setpoint, else lauter temp, else 0)
+    "control_target_f",     # target_f clamped to MAX_TARGET_F
+    "latch_f",              # temperature that starts the step timer (capped at boil)
+    "ramp_watts", "hold_watts", "mode",
+    "duration_min", "duration_s", "auto_advance",
+    "additions",            # BrewAdditions in trigger order
+    "trigger_min",          # remaining-minutes threshold per addition (parallel tuple)
+])
+
+ProfilePlan = namedtuple("ProfilePlan", "profile_id boil_temp_f steps")
+
+
+def step_target_f(step):
+    """Setpoint, falling back to the lauter temp, else 0.0 (heater off)."""
+    if step.setpoint_f is not None:
+        return float(step.setpoint_f)
+    if step.lauter_temp_f is not None:
+        return float(step.lauter_temp_f)
+    return 0.0
+
+
+def _minutes(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def compile_step(index, step, boil_temp_f):
+    target = step_target_f(step)
+    control_target = min(target, MAX_TARGET_F)
+
+    if step.step_type == StepType.BOIL or control_target >= boil_temp_f:
+        mode = MODE_OPEN
+    elif control_target > 0:
+        mode = MODE_PID
+    else:
+        mode = MODE_OFF
+
+    additions = tuple(sorted(getattr(step, 'additions', None) or [],
+                             key=lambda a: _minutes(a.time_point_min), reverse=True))
+    duration_min = _minutes(step.duration_min)
+
+    return StepPlan(
+        index=index,
+        name=step.name,
+        step_type=step.step_type,
+        target_f=target,
+        control_target_f=control_target,
+        latch_f=min(control_target, boil_temp_f),
+        ramp_watts=step.ramp_power_watts if step.ramp_power_watts is not None else DEFAULT_STEP_WATTS,
+        hold_watts=step.hold_power_watts if step.hold_power_watts is not None else DEFAULT_STEP_WATTS,
+        mode=mode,
+        duration_min=duration_min,
+        duration_s=duration_min * 60.0,
+        auto_advance=(step.timeout_behavior == TimeoutBehavior.AUTO_ADVANCE),
+        additions=additions,
+        trigger_min=tuple(_minutes(a.time_point_min) + TRIGGER_TOLERANCE_MIN for a in additions),
+    )
+
+
+def compile_profile(profile, boil_temp_f=212.0):
+    try:
+        boil_temp_f = float(boil_temp_f)
+    except (TypeError, ValueError):
+        boil_temp_f = 212.0
+    steps = tuple(compile_step(i, step, boil_temp_f) for i, step in enumerate(profile.steps))
+    return ProfilePlan(profile.id, boil_temp_f, steps)
+
+
+def next_due(plan_step, cursor, remaining_min):
+    """
+    The addition at cursor if it is due, else None. Because the timeline is
+    sorted, nothing after the cursor can be due when the cursor isn't.
+    """
+    if cursor >= len(plan_step.additions):
+        return None
+    if plan_step.duration_min <= 0.0 or remaining_min <= plan_step.trigger_min[cursor]:
+        return plan_step.additions[cursor]
+    return None
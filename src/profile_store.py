@@ -0,0 +1,330 @@
+"""
+src/profile_store.py
+Storage backends for brew profiles.
+
+Profiles are stored as the plain dicts produced by BrewProfile.to_dict().
+Every backend keeps a lightweight id -> name index so the profile list can be
+shown without parsing every recipe, and saving one profile only writes that
+profile's bytes.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import urllib.parse
+
+PROFILE_DIR_NAME = "profiles"
+PROFILE_INDEX_FILE = "index.json"
+PROFILE_DB_FILE = "kettlebrain_profiles.db"
+
+# Only ids made of these characters are used verbatim as file names.
+_SAFE_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class ProfileStore:
+    """
+    Interface for profile storage backends.
+    Implementations must be safe to call from multiple threads.
+    """
+
+    def list_profiles(self):
+        """Returns a list of (profile_id, name) tuples without loading profile bodies."""
+        raise NotImplementedError
+
+    def load(self, profile_id):
+        """Returns the profile dict for profile_id, or None if missing."""
+        raise NotImplementedError
+
+    def load_all(self):
+        """Yields (profile_id, profile_dict) for every stored profile."""
+        for pid, _name in self.list_profiles():
+            data = self.load(pid)
+            if data is not None:
+                yield pid, data
+
+    def save(self, profile_dict):
+        """Inserts or replaces a single profile."""
+        raise NotImplementedError
+
+    def delete(self, profile_id):
+        """Removes a profile. Returns True if it existed."""
+        raise NotImplementedError
+
+    def get_name(self, profile_id):
+        for pid, name in self.list_profiles():
+            if pid == profile_id:
+                return name
+        return None
+
+    def is_empty(self):
+        return len(self.list_profiles()) == 0
+
+    def close(self):
+        pass
+
+
+class FileProfileStore(ProfileStore):
+    """
+    One JSON file per profile inside kettlebrain-data/profiles/.
+    A small index.json (id -> name) backs list_profiles().
+    """
+
+    def __init__(self, data_dir):
+        self.directory = os.path.join(data_dir, PROFILE_DIR_NAME)
+        self.index_file = os.path.join(self.directory, PROFILE_INDEX_FILE)
+        self._lock = threading.RLock()
+        self._index = {}
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    # --- INDEX ---
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        except FileNotFoundError:
+            self._rebuild_index()
+        except Exception as e:
+            print(f"[ProfileStore] Index unreadable ({e}). Rebuilding.")
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        """Slow path: scan every profile file once. Only runs if the index is lost."""
+        index = {}
+        for fname in os.listdir(self.directory):
+            if not fname.endswith('.json') or fname == PROFILE_INDEX_FILE:
+                continue
+            try:
+                with open(os.path.join(self.directory, fname), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                pid = data.get("id")
+                if pid:
+                    index[pid] = data.get("name", "Unknown Profile")
+            except Exception as e:
+                print(f"[ProfileStore] Skipping unreadable profile {fname}: {e}")
+        self._index = index
+        self._write_index()
+
+    def _write_index(self):
+        self._atomic_write(self.index_file, json.dumps(self._index, indent=4))
+
+    # --- HELPERS ---
+
+    def _path_for(self, profile_id):
+        if _SAFE_ID.match(profile_id):
+            fname = profile_id
+        else:
+            # Percent-encoding is reversible, so two ids never share a file
+            # ('%' itself is unsafe, so encoded names can't clash with verbatim ones)
+            fname = urllib.parse.quote(profile_id, safe='')
+        return os.path.join(self.directory, f"{fname}.json")
+
+    def _legacy_path_for(self, profile_id):
+        """Where older builds saved unsafe ids (lossy '_' substitution)."""
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_-]', '_', profile_id) + ".json")
+
+    @staticmethod
+    def _atomic_write(path, text):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    # --- INTERFACE ---
+
+    def list_profiles(self):
+        with self._lock:
+            return list(self._index.items())
+
+    def get_name(self, profile_id):
+        with self._lock:
+            return self._index.get(profile_id)
+
+    def load(self, profile_id):
+        with self._lock:
+            if profile_id not in self._index:
+                return None
+            path = self._path_for(profile_id)
+            if not os.path.exists(path):
+                path = self._legacy_path_for(profile_id)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                # A legacy file may hold a different id that collided with this one
+                return data if data.get("id") == profile_id else None
+            except Exception as e:
+                print(f"[ProfileStore] Error loading profile {profile_id}: {e}")
+                return None
+
+    def save(self, profile_dict):
+        pid = profile_dict["id"]
+        name = profile_dict.get("name", "Unknown Profile")
+        with self._lock:
+            self._atomic_write(self._path_for(pid), json.dumps(profile_dict, indent=4))
+            # Only touch the index when the listing actually changes
+            if self._index.get(pid) != name:
+                self._index[pid] = name
+                self._write_index()
+
+    def delete(self, profile_id):
+        with self._lock:
+            if profile_id not in self._index:
+                return False
+            del self._index[profile_id]
+            self._write_index()
+            try:
+                os.remove(self._path_for(profile_id))
+            except FileNotFoundError:
+                pass
+            legacy = self._legacy_path_for(profile_id)
+            if legacy != self._path_for(profile_id) and os.path.exists(legacy):
+                try:
+                    with open(legacy, 'r', encoding='utf-8') as f:
+                        owned = json.load(f).get("id") == profile_id
+                    if owned:
+                        os.remove(legacy)
+                except Exception as e:
+                    print(f"[ProfileStore] Could not remove legacy file for {profile_id}: {e}")
+            return True
+
+
+class SqliteProfileStore(ProfileStore):
+    """
+    All profiles in a single SQLite database (kettlebrain_profiles.db).
+    Each profile is one row; listing only reads the id/name columns.
+    """
+
+    def __init__(self, data_dir):
+        self.db_file = os.path.join(data_dir, PROFILE_DB_FILE)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " id TEXT PRIMARY KEY,"
+                " name TEXT NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+
+    def list_profiles(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, name FROM profiles").fetchall()
+        return [(r[0], r[1]) for r in rows]
+
+    def get_name(self, profile_id):
+        with self._lock:
+            row = self._conn.execute("SELECT name FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, profile_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        if not row:
+            return None
+        try:
+            return json.loads(row[0])
+        except Exception as e:
+            print(f"[ProfileStore] Error decoding profile {profile_id}: {e}")
+            return None
+
+    def load_all(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id, data FROM profiles").fetchall()
+        for pid, text in rows:
+            try:
+                yield pid, json.loads(text)
+            except Exception as e:
+                print(f"[ProfileStore] Error decoding profile {pid}: {e}")
+
+    def save(self, profile_dict):
+        text = json.dumps(profile_dict, separators=(',', ':'))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (id, name, data) VALUES (?, ?, ?)",
+                (profile_dict["id"], profile_dict.get("name", "Unknown Profile"), text)
+            )
+
+    def delete(self, profile_id):
+        with self._lock, self._conn:
+            cur = self._conn.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+        return cur.rowcount > 0
+
+    def is_empty(self):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM profiles LIMIT 1").fetchone()
+        return row is None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_profile_store(data_dir, backend="files"):
+    """Factory used by SettingsManager. backend: 'files' or 'sqlite'."""
+    if backend == "sqlite":
+        return SqliteProfileStore(data_dir)
+    return FileProfileStore(data_dir)
+
+
+def migrate_profiles_dict(profiles, store):
+    """Copies a legacy {id: profile_dict} mapping into store. Returns the count."""
+    count = 0
+    for pid, p_data in profiles.items():
+        if not isinstance(p_data, dict):
+            continue
+        if not p_data.get("id"):
+            p_data = dict(p_data, id=pid)
+        store.save(p_data)
+        count += 1
+    return count
+
+
+def migrate_json_file(json_path, store):
+    """
+    One-shot migration from the legacy single-document kettlebrain_profiles.json.
+    The source file is renamed to *.migrated so this never runs twice.
+    Returns the number of profiles imported.
+    """
+    if not os.path.exists(json_path):
+        return 0
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            profiles = json.load(f)
+    except Exception as e:
+        print(f"[ProfileStore] Could not read legacy profiles file: {e}")
+        return 0
+
+    count = migrate_profiles_dict(profiles, store)
+    try:
+        os.replace(json_path, json_path + ".migrated")
+    except OSError as e:
+        print(f"[ProfileStore] Could not rename legacy profiles file: {e}")
+    print(f"[ProfileStore] Migrated {count} profiles from {os.path.basename(json_path)}")
+    return count
+
+
+def migrate_from_backend(data_dir, source_backend, store):
+    """
+    Copies profiles from another backend's files (used when the user switches
+    'profile_storage'). Does nothing if that backend was never used.
+    """
+    if source_backend == "sqlite":
+        if not os.path.exists(os.path.join(data_dir, PROFILE_DB_FILE)):
+            return 0
+    elif not os.path.exists(os.path.join(data_dir, PROFILE_DIR_NAME, PROFILE_INDEX_FILE)):
+        return 0
+
+    source = create_profile_store(data_dir, source_backend)
+    try:
+        count = 0
+        for _pid, p_data in source.load_all():
+            store.save(p_data)
+            count += 1
+    finally:
+        source.close()
+    if count:
+        print(f"[ProfileStore] Copied {count} profiles from '{source_backend}' backend")
+    return count
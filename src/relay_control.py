@@ -1,7 +1,21 @@
 """
 src/relay_control.py
 Relay control for KettleBrain.
+
+Only one process may drive the relays: the touchscreen app and the headless
+daemon each take the control lock (acquire_control_lock) before creating
+RelayControl, so a second copy fails instead of fighting over the GPIO pins.
 """
+import os
+import sys
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+CONTROL_LOCK_FILE = "kettlebrain-control.lock"
 
 # --- HARDWARE IMPORT: RPi.GPIO on Linux, MockGPIO on Windows ---
 try:
@@ -45,6 +59,44 @@ except (ImportError, RuntimeError):
 
     GPIO = MockGPIO
 
+
+# --- CONTROL LOCK ---
+
+class ControlLockHeld(RuntimeError):
+    """Another process already owns the relays."""
+
+
+def acquire_control_lock(data_dir):
+    """
+    Takes the exclusive lock that marks this process as the one driving the
+    relays. Returns the open lock file, which must stay open for the life of
+    the process (the OS drops the lock when it exits).
+    Raises ControlLockHeld if another app or daemon holds it.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, CONTROL_LOCK_FILE)
+    f = open(path, 'a+', encoding='utf-8')
+    f.seek(0)
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        try:
+            holder = f.read().strip()
+        except OSError:
+            holder = ""
+        f.close()
+        raise ControlLockHeld(f"Relays are already controlled by {holder or 'another process'} (lock: {path})")
+
+    f.seek(0)
+    f.truncate()
+    f.write(f"pid {os.getpid()} ({os.path.basename(sys.argv[0]) or 'python'})\n")
+    f.flush()
+    return f
+
+
 class RelayControl:
     def __init__(self, settings_manager=None, pin_config=None):
         """
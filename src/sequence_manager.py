@@ -5,13 +5,67 @@ kettlebrain/src/sequence_manager.py
 import time
 import threading
 import math
-import csv
+import queue
+import functools
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from datetime import datetime # <--- ADD THIS
 from profile_data import BrewProfile, StepType, TimeoutBehavior, SequenceStatus
 import subprocess
 import os
 import sys
 from pid_controller import PIDController  # <--- NEW IMPORT
+from telemetry import TelemetryRecorder, TELEMETRY_FILE, DEFAULT_CAPACITY, relay_mask
+from shared_telemetry import SharedStateWriter, default_state_path
+from csv_logger import CsvSessionLogger
+from session_store import SessionStore
+from trend_buffer import TrendBuffer
+from audio_service import AudioService
+from timer_service import TimerService
+import event_bus
+from event_bus import EventBus
+from profile_plan import compile_profile, next_due, MODE_OPEN, MODE_PID
+from collections import namedtuple
+
+# --- SCHEDULE PROJECTION ---
+# One row per profile step; epochs are wall-clock seconds.
+StepProjection = namedtuple("StepProjection", "index done ready_now ready_epoch end_epoch")
+ScheduleProjection = namedtuple("ScheduleProjection", "computed_at steps end_epoch energy_kwh")
+
+# --- TIMED EVENTS (see TimerService) ---
+CSV_LOG_INTERVAL_S = 30.0
+DELAY_RECALC_INTERVAL_S = 30.0
+TEMP_LATCH_DEBOUNCE_S = 5.0     # temp must hold at target this long before the step timer starts
+NAG_RECHECK_S = 5.0             # re-read alert_repeat_freq this often while nagging is switched off
+
+# --- CONTROL THREAD COMMANDS (see control_command) ---
+CONTROL_TICK_S = 0.1
+COMMAND_WAIT_S = 1.0        # how long a UI caller waits for its command before giving up on the result
+SHUTDOWN_WAIT_S = 25.0      # shutdown() joins the CSV logger and session store (10 s each)
+
+SCHEDULE_REFRESH_S = 15.0   # slow re-projection while nothing changes (heating progress, pauses)
+HOLD_DUTY_ESTIMATE = 0.15   # fraction of hold power a mash rest draws; boils run flat out
+
+def control_command(method):
+    """
+    Marks a SequenceManager method that mutates sequencing state. Called from
+    any thread other than the control thread it is queued, executed between
+    ticks by the control thread, and the caller blocks (up to COMMAND_WAIT_S)
+    for the result, so existing call sites keep their synchronous behaviour.
+    Calls made on the control thread itself (timers, nested commands) run inline.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self._should_queue():
+            return method(self, *args, **kwargs)
+        future = self._enqueue(method, args, kwargs)
+        try:
+            return future.result(timeout=COMMAND_WAIT_S)
+        except FutureTimeout:
+            print(f"[SequenceManager] Command {method.__name__} still queued after {COMMAND_WAIT_S}s")
+            return None
+    wrapper.command = method
+    return wrapper
+
 
 class SequenceManager:
     def __init__(self, settings_manager, relay_control, hardware_interface):
@@ -20,6 +74,7 @@ class SequenceManager:
         self.hw = hardware_interface
         
         self.current_profile = None
+        self.profile_loads = 0      # bumped on every load_profile(), even of the same profile
         self.current_step_index = -1
         self.status = SequenceStatus.IDLE
         
@@ -59,21 +114,95 @@ class SequenceManager:
         self.last_alert_time = 0.0
         self.last_alert_nag_time = 0.0 
 
+        # --- ALERT AUDIO (decoded once, persistent stream per device) ---
+        self.audio = AudioService(
+            self.settings.get_system_setting("audio_device", "default"),
+            self.settings.get_system_setting("alert_sound_file", "alert.wav")
+        )
+        self.audio.configure()
+
         # --- RECOVERY HEARTBEAT ---
         self.last_recovery_save = 0.0
         self.RECOVERY_SAVE_INTERVAL = 30.0 
         
-        self.last_log_write = 0.0  
+        self.current_watts = 0
+
+        # --- TIMERS (run from the control loop; inspect with self.timers.pending()) ---
+        self.timers = TimerService()
+        self.timers.call_every(CSV_LOG_INTERVAL_S, self._log_csv, name="csv_log", first_delay=0)
+        self._timer_status = None   # status the timers were last armed for
+
+        # --- BREW SESSION / CSV LOGGING (file I/O on the logger's own thread) ---
+        self.session_id = None
+        self.session_mode = None
+        self._last_session_id = None
+        self._csv_session_open = False
+        try:
+            self.csv_logger = CsvSessionLogger(self.settings.data_dir)
+        except Exception as e:
+            print(f"[SequenceManager] CSV logger unavailable: {e}")
+            self.csv_logger = None
+
+        # --- SESSION HISTORY (SQLite time-series with rollups) ---
+        self.session_store = None
+        if self.settings.get_system_setting("enable_session_store", True):
+            try:
+                self.session_store = SessionStore(self.settings.data_dir)
+                self.session_store.on_session_closed = self._archive_closed_session
+            except Exception as e:
+                print(f"[SequenceManager] Session store unavailable: {e}")
         
         # --- NEW: ENERGY INTEGRATION ---
         self.total_watt_seconds = 0.0
         self.last_integration_time = time.monotonic()
+
+        # --- HIGH-RATE TELEMETRY (one record per control tick) ---
+        self.last_requested_watts = 0
+        self.telemetry = None
+        if self.settings.get_system_setting("enable_telemetry", True):
+            try:
+                self.telemetry = TelemetryRecorder(
+                    os.path.join(self.settings.data_dir, TELEMETRY_FILE),
+                    self.settings.get_system_setting("telemetry_capacity", DEFAULT_CAPACITY)
+                )
+            except Exception as e:
+                print(f"[SequenceManager] Telemetry disabled: {e}")
+
+        # --- LIVE SHARED STATE (mmap block other processes poll; see shared_telemetry.py) ---
+        self.shared_state = None
+        if self.settings.get_system_setting("enable_shared_state", True):
+            try:
+                self.shared_state = SharedStateWriter(default_state_path(self.settings.data_dir))
+            except Exception as e:
+                print(f"[SequenceManager] Shared state disabled: {e}")
+
+        # --- COMPILED PROFILE PLAN (see recompile_plan) ---
+        self.plan = None
+        self._add_cursor = 0    # next untriggered addition in the current step's timeline
+
+        # --- CACHED SCHEDULE PROJECTION (see get_schedule) ---
+        self._schedule = None
+        self._schedule_key = None
+
+        # --- LIVE TREND (in-memory, feeds the main screen chart) ---
+        self.trend = TrendBuffer()
         
+        # --- STATE CHANGE EVENTS (control thread -> UI, loggers; see _publish_changes) ---
+        self.events = EventBus()
+        self._published = {}        # last value published per watched attribute
+
+        # --- COMMAND QUEUE (UI -> control thread) ---
+        self._commands = queue.SimpleQueue()
+        self._wake = threading.Event()
+        self._awaiting_tick = []    # (name, submitted_at) applied, waiting for the next tick's relay output
+        self.command_stats = {}     # name -> [count, sum applied s, max applied s, sum tick s, max tick s]
+
         self._stop_event = threading.Event()
-        self._thread = threading.Thread(target=self._control_loop, daemon=True)
+        self._thread = threading.Thread(target=self._control_loop, name="SequenceControl", daemon=True)
         self._thread.start()
 
     
+    @control_command
     def reset_energy_counter(self):
         """Resets the accumulated kWh counter."""
         self.total_watt_seconds = 0.0
@@ -84,36 +213,23 @@ class SequenceManager:
         print(f"[SequenceManager] {msg}")
     
     def _play_alert_sound(self):
-        """Plays the configured alert sound using aplay (Linux) or winsound (Windows)."""
+        """Queues the configured alert sound on the audio service (never blocks the control loop)."""
         try:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            sound_filename = self.settings.get_system_setting("alert_sound_file", "alert.wav")
-            sound_file = os.path.join(base_dir, "assets", sound_filename)
-
-            if not os.path.exists(sound_file):
-                return
-
-            if sys.platform == 'win32':
-                import winsound
-                winsound.PlaySound(sound_file, winsound.SND_FILENAME | winsound.SND_ASYNC)
-            else:
-                audio_dev = self.settings.get_system_setting("audio_device", "default")
-                cmd = ["aplay", "-q"]
-                if audio_dev != "default":
-                    cmd.extend(["-D", audio_dev])
-                cmd.append(sound_file)
-                subprocess.Popen(cmd, stderr=subprocess.DEVNULL)
-
+            self.audio.play()
             self.last_alert_nag_time = time.monotonic()
 
         except Exception as e:
             print(f"[SequenceManager] Alert Sound Error: {e}")
     
+    @control_command
     def load_profile(self, profile: BrewProfile):
         self.stop()
         self.current_profile = profile
+        self.profile_loads += 1
         self.current_step_index = 0
         self.status = SequenceStatus.IDLE
+        self.recompile_plan()
+        self.invalidate_schedule()
         
         # --- NEW: Persist this selection for next startup ---
         if self.settings:
@@ -128,6 +244,7 @@ class SequenceManager:
         # self.status = SequenceStatus.IDLE
         # print(f"[Sequence] Loaded profile: {profile.name}")
 
+    @control_command
     def start_sequence(self):
         if not self.current_profile: return
         
@@ -146,6 +263,7 @@ class SequenceManager:
             self.status = SequenceStatus.RUNNING
             print("[Sequence] Started.")
 
+    @control_command
     def pause_sequence(self):
         # Ensure Soft Pause (Heat allowed to hold temp)
         self.override_hard_stop = False
@@ -162,6 +280,7 @@ class SequenceManager:
             # Save state immediately on pause
             self._save_recovery_snapshot()
 
+    @control_command
     def resume_sequence(self):
         # Clear Hard Stop flag to allow heating
         self.override_hard_stop = False
@@ -179,6 +298,7 @@ class SequenceManager:
             # Save state immediately on resume
             self._save_recovery_snapshot()
 
+    @control_command
     def reset_profile(self):
         """
         Stops the sequence and rewinds to Step 1.
@@ -205,6 +325,7 @@ class SequenceManager:
             # 4. Refresh predictions assuming a "Start Now"
             self.update_predictions()
     
+    @control_command
     def advance_step(self):
         if not self.current_profile: return
         
@@ -241,9 +362,8 @@ class SequenceManager:
         self.step_elapsed_time = 0.0
         self.temp_reached = False 
         
-        # --- NEW: DEBOUNCE TIMER ---
-        self.trigger_start_time = 0.0
-        # ---------------------------
+        # --- DEBOUNCE TIMER ---
+        self.timers.cancel("temp_latch")
         
         # --- CAPTURE INITIAL TEMP ---
         self.initial_step_temp = self.current_temp if self.current_temp is not None else 0.0
@@ -251,23 +371,61 @@ class SequenceManager:
         if self.global_start_time is None:
             self.global_start_time = time.monotonic()
         
-        # --- CENTRALIZED TARGET LOGIC ---
-        # 1. Prefer explicit Setpoint
-        # 2. Fallback to Lauter Temp (for Mash/Sparge steps)
-        # 3. Default to 0.0 (Off)
-        if step.setpoint_f is not None:
-            self.target_temp = float(step.setpoint_f)
-        elif step.lauter_temp_f is not None:
-            self.target_temp = float(step.lauter_temp_f)
-        else:
-            self.target_temp = 0.0
+        # --- CENTRALIZED TARGET LOGIC (resolved by the plan: setpoint, else lauter temp, else off) ---
+        plan_step = self._plan_step(index)
+        self.target_temp = plan_step.target_f if plan_step else 0.0
             
         print(f"[Sequence] Target calculated as: {self.target_temp} F")
             
         if hasattr(step, 'additions'):
             for add in step.additions:
                 add.triggered = False
+        self._add_cursor = 0
         self.current_alert_text = None
+
+    # --- COMPILED PLAN ---
+
+    @control_command
+    def recompile_plan(self):
+        """Compiles the loaded profile (call again after editing it in place)."""
+        if not self.current_profile:
+            self.plan = None
+            return
+        self.plan = compile_profile(self.current_profile,
+                                    self.settings.get_system_setting("boil_temp_f", 212.0))
+        self._sync_add_cursor()
+
+    def _plan_step(self, index, profile=None):
+        """
+        StepPlan for index, recompiling first if the profile or boil temp changed
+        underneath. None if there is no profile or no such step. Off the control
+        thread (UI, web) a stale plan is compiled locally and self.plan is left alone.
+        """
+        profile = profile or self.current_profile
+        if profile is None:
+            return None
+        plan = self.plan
+        boil_temp_f = self.settings.get_system_setting("boil_temp_f", 212.0)
+        if (plan is None or plan.profile_id != profile.id
+                or len(plan.steps) != len(profile.steps)
+                or plan.boil_temp_f != boil_temp_f):
+            if self._should_queue():
+                plan = compile_profile(profile, boil_temp_f)
+            else:
+                self.recompile_plan()
+                plan = self.plan
+        if plan is None or not 0 <= index < len(plan.steps):
+            return None
+        return plan.steps[index]
+
+    def _sync_add_cursor(self):
+        """Points the cursor past the additions already fired (after a recompile)."""
+        cursor = 0
+        if self.plan and 0 <= self.current_step_index < len(self.plan.steps):
+            additions = self.plan.steps[self.current_step_index].additions
+            while cursor < len(additions) and additions[cursor].triggered:
+                cursor += 1
+        self._add_cursor = cursor
         
     def calculate_ramp_minutes(self, start_temp, target_temp, vol_gal, watts):
         """
@@ -300,6 +458,7 @@ class SequenceManager:
         return delta_temp / real_rate_fpm
 
     # --- DELAYED START LOGIC ---
+    @control_command
     def start_delayed_mode(self, ready_time_dt):
         """
         Calculates when to fire the heater so water is ready at ready_time_dt.
@@ -333,6 +492,7 @@ class SequenceManager:
 
         self._save_recovery_snapshot()
 
+    @control_command
     def cancel_delayed_mode(self):
         """Cancels delay and returns to Manual mode."""
         if self.status != SequenceStatus.DELAYED_WAIT:
@@ -350,10 +510,12 @@ class SequenceManager:
     # --- MANUAL MODE METHODS ---
     
     # [Add setters for new manual controls]
+    @control_command
     def set_manual_volume(self, vol_gal):
         self.manual_volume_gal = float(vol_gal)
         self.settings.set("manual_mode_settings", "last_volume_gal", self.manual_volume_gal)
     
+    @control_command
     def enter_manual_mode(self):
         """Transitions to Manual Mode (Standby)."""
         self.stop() 
@@ -376,6 +538,7 @@ class SequenceManager:
         self.target_temp = self.manual_target_temp
         self.log_message("Entered Manual Mode")
 
+    @control_command
     def set_manual_power(self, watts):
         """
         Legacy/Batch Setter.
@@ -389,11 +552,13 @@ class SequenceManager:
         self.settings.set("manual_mode_settings", "last_ramp_watts", val)
         self.settings.set("manual_mode_settings", "last_hold_watts", val)
 
+    @control_command
     def set_manual_ramp_power(self, watts):
         """Sets the power limit for the Heating Phase."""
         self.manual_ramp_watts = int(watts)
         self.settings.set("manual_mode_settings", "last_ramp_watts", self.manual_ramp_watts)
 
+    @control_command
     def set_manual_hold_power(self, watts):
         """Sets the power limit for the Holding Phase."""
         self.manual_hold_watts = int(watts)
@@ -461,65 +626,40 @@ class SequenceManager:
         else:
             self.relay.stop_all()
 
-    def _manage_temperature(self, step):
-        # 1. Use the Target determined in _init_step
-        target = self.target_temp
-
-        # Safety Clamp
-        if target > 215: target = 215
+    def _manage_temperature(self, plan_step):
+        # 1. Target, clamp, latch threshold, limits and control mode come precompiled (profile_plan)
+        target = plan_step.control_target_f
         
         # Safety Protocol
         if self.current_temp is None:
             self.relay.set_relays(False, False, False)
             return
 
-        # Retrieve System Boil Temp
-        sys_boil = self.settings.get_system_setting("boil_temp_f", 212.0)
-
         # 2. Timer Latch Logic
         if target > 0 and not self.temp_reached:
-            trigger_threshold = min(target, sys_boil)
+            trigger_threshold = plan_step.latch_f
             
-            # FIX: Added -0.5 tolerance. 
+            # FIX: Added -0.5 tolerance. Latches after TEMP_LATCH_DEBOUNCE_S above threshold.
             if self.current_temp >= (trigger_threshold - 0.5):
-                now = time.monotonic()
-                if self.trigger_start_time == 0.0:
-                    self.trigger_start_time = now 
-                elif (now - self.trigger_start_time) >= 5.0:
-                    self.temp_reached = True
-                    self.step_start_time = time.monotonic()
-                    self.total_paused_time = 0.0
-                    self.trigger_start_time = 0.0 
-                    
-                    start_t = getattr(self, 'initial_step_temp', 0.0)
-                    # Only beep if we actually heated up to get here
-                    if start_t < (target - 0.5):
-                        self._play_alert_sound()
-                    self._save_recovery_snapshot()
+                if self.timers.get("temp_latch") is None:
+                    self.timers.call_later(TEMP_LATCH_DEBOUNCE_S, self._latch_step_temp, name="temp_latch")
             else:
-                self.trigger_start_time = 0.0
+                self.timers.cancel("temp_latch")
 
         # 3. Heater Power Logic
         watts_to_apply = 0
         
-        # --- NEW: Select Power Limit based on Phase ---
-        # Get Ramp/Hold values safely (default to 1800 if None)
-        ramp_p = step.ramp_power_watts if step.ramp_power_watts is not None else 1800
-        hold_p = step.hold_power_watts if step.hold_power_watts is not None else 1800
-        
-        if not self.temp_reached:
-            step_limit = ramp_p
-        else:
-            step_limit = hold_p
+        # --- Select Power Limit based on Phase ---
+        step_limit = plan_step.hold_watts if self.temp_reached else plan_step.ramp_watts
 
         # EXCEPTION: BOIL Steps OR High Target are Open Loop
-        if step.step_type == StepType.BOIL or target >= sys_boil:
+        if plan_step.mode == MODE_OPEN:
             # Force "In Demand" at the active limit
             watts_to_apply = step_limit
             self.is_heating = True
             
         # STANDARD: PID Control
-        elif target > 0:
+        elif plan_step.mode == MODE_PID:
             pid_out = self.pid.compute(self.current_temp, target)
             self.is_heating = (pid_out > 0)
             
@@ -547,96 +687,153 @@ class SequenceManager:
             
         self.last_applied_power = watts_to_apply
 
+    def _latch_step_temp(self):
+        """temp_latch timer: the step held at temperature for the debounce period."""
+        if self.temp_reached or not self.current_profile or self.current_temp is None:
+            return
+        if self.status not in [SequenceStatus.RUNNING, SequenceStatus.PAUSED, SequenceStatus.WAITING_FOR_USER]:
+            return
+        plan_step = self._plan_step(self.current_step_index)
+        if plan_step is None or self.current_temp < (plan_step.latch_f - 0.5):
+            return
+
+        self.temp_reached = True
+        self.step_start_time = time.monotonic()
+        self.total_paused_time = 0.0
+        
+        start_t = getattr(self, 'initial_step_temp', 0.0)
+        # Only beep if we actually heated up to get here
+        if start_t < (plan_step.control_target_f - 0.5):
+            self._play_alert_sound()
+        self._save_recovery_snapshot()
+
     def update_predictions(self):
         """
-        Refreshes 'ready_at' timestamps for the active profile.
-        Calculates when each step will be REACHED (Target Temp Hit).
-        Updated to use ramp_power_watts.
+        Refreshes each step's 'predicted_ready_time' label ("Done", "Now" or
+        HH:MM) from the cached schedule projection.
         """
         if not self.current_profile: return
-        
-        import time
-        from datetime import datetime
-        
-        # 1. Base Time: Start calculation from 'Now'
-        current_time = time.time()
-        
-        # Start simulation at current actual temp
-        sim_temp = self.current_temp if self.current_temp else 60.0
-        
-        # 2. Determine Simulation Volume
-        sim_vol = self.settings.get("manual_mode_settings", "last_volume_gal", 6.0)
-        for s in self.current_profile.steps:
+        sched = self.get_schedule()
+        if sched is None: return
+
+        steps = self.current_profile.steps
+        for proj in sched.steps:
+            if proj.index >= len(steps):
+                break
+            if proj.done:
+                text = "Done"
+            elif proj.ready_now:
+                text = "Now"
+            else:
+                text = datetime.fromtimestamp(proj.ready_epoch).strftime("%H:%M")
+            steps[proj.index].predicted_ready_time = text
+
+    # --- SCHEDULE PROJECTION ---
+
+    def invalidate_schedule(self):
+        """Forces the next get_schedule() to re-project (e.g. after editing the loaded profile)."""
+        self._schedule_key = None
+
+    def get_schedule(self, now=None):
+        """
+        Returns the cached ScheduleProjection for the loaded profile, or None.
+        Re-projects only when the sequencing state or calibration changes,
+        or every SCHEDULE_REFRESH_S seconds, so UI callers can poll freely.
+        """
+        if not self.current_profile:
+            self._schedule = None
+            return None
+        if now is None:
+            now = time.time()
+
+        key = (
+            id(self.current_profile), len(self.current_profile.steps),
+            self.current_step_index, self.status, self.temp_reached,
+            getattr(self, 'delayed_ready_epoch', None),
+            self.settings.get_system_setting("heater_ref_rate_fpm", 1.2),
+            self.settings.get_system_setting("heater_ref_volume_gal", 8.0),
+            self.settings.get_system_setting("boil_temp_f", 212.0),
+        )
+        sched = self._schedule
+        if sched is None or key != self._schedule_key or now - sched.computed_at >= SCHEDULE_REFRESH_S:
+            self._schedule = self._project_schedule(now)
+            self._schedule_key = key
+        return self._schedule
+
+    def _project_schedule(self, now):
+        """Simulates the remaining profile once: ready/end time per step, total end, energy."""
+        profile = self.current_profile
+        status = self.status
+        idx = self.current_step_index
+        active = status in [SequenceStatus.RUNNING, SequenceStatus.PAUSED, SequenceStatus.WAITING_FOR_USER]
+
+        # A delayed start brings the profile online at the ready time
+        if status == SequenceStatus.DELAYED_WAIT:
+            clock = max(now, getattr(self, 'delayed_ready_epoch', now))
+        else:
+            clock = now
+
+        # Default volume: first step that declares one, else the manual setting
+        default_vol = self.settings.get("manual_mode_settings", "last_volume_gal", 6.0)
+        for s in profile.steps:
             if s.lauter_volume and s.lauter_volume > 0:
-                sim_vol = s.lauter_volume
+                default_vol = s.lauter_volume
                 break
-        
-        # 3. Iteration
-        for i, step in enumerate(self.current_profile.steps):
-            
+
+        sim_temp = self.current_temp if self.current_temp else 60.0
+        energy_wh = 0.0
+        rows = []
+
+        for i, step in enumerate(profile.steps):
+            plan_step = self._plan_step(i, profile)
+            if plan_step is None:
+                break
+            tgt = plan_step.target_f
+            hold_sec = plan_step.duration_s
+
             # --- PAST STEPS ---
-            if i < self.current_step_index:
-                step.predicted_ready_time = "Done"
-                if step.setpoint_f: sim_temp = step.setpoint_f
+            if i < idx:
+                if tgt: sim_temp = tgt
+                rows.append(StepProjection(i, True, False, clock, clock))
                 continue
-            
-            # --- CURRENT STEP ---
-            if i == self.current_step_index:
-                is_ready_now = False
-                
-                if self.status == SequenceStatus.RUNNING and self.temp_reached:
-                    is_ready_now = True
-                elif step.setpoint_f and self.current_temp and self.current_temp >= step.setpoint_f:
-                    is_ready_now = True
-
-                if is_ready_now:
-                    step.predicted_ready_time = "Now"
-                    d_sec = (step.duration_min * 60.0) if step.duration_min else 0.0
-                    rem_sec = d_sec - self.step_elapsed_time
-                    if rem_sec < 0: rem_sec = 0
-                    current_time += rem_sec
-                    
-                    tgt = step.setpoint_f if step.setpoint_f else sim_temp
-                    sim_temp = max(tgt, self.current_temp if self.current_temp else tgt)
-                    
+
+            vol = step.lauter_volume if step.lauter_volume and step.lauter_volume > 0 else default_vol
+            # Same limits as the control loop
+            ramp_watts = plan_step.ramp_watts
+            hold_watts = plan_step.hold_watts
+
+            # --- CURRENT STEP, ALREADY AT TEMP: only the hold remains ---
+            if i == idx and active and (self.temp_reached or status == SequenceStatus.WAITING_FOR_USER):
+                if status == SequenceStatus.WAITING_FOR_USER:
+                    rem_sec = 0.0
                 else:
-                    # RAMPING
-                    tgt = step.setpoint_f if step.setpoint_f else sim_temp
-                    
-                    # --- CHANGE: Use RAMP Power for predictions ---
-                    watts = step.ramp_power_watts if step.ramp_power_watts else 1800
-                    
-                    start_t = self.current_temp if self.current_temp else sim_temp
-                    
-                    ramp_min = self.calculate_ramp_minutes(start_t, tgt, sim_vol, watts)
-                    ramp_sec = ramp_min * 60.0
-                    
-                    ready_epoch = current_time + ramp_sec
-                    dt = datetime.fromtimestamp(ready_epoch)
-                    step.predicted_ready_time = dt.strftime("%H:%M")
-                    
-                    hold_sec = (step.duration_min * 60.0) if step.duration_min else 0.0
-                    current_time += (ramp_sec + hold_sec)
+                    rem_sec = max(0.0, hold_sec - self.step_elapsed_time)
+                ready = clock
+                clock += rem_sec
+                hold_sec = rem_sec
+                if tgt: sim_temp = max(tgt, self.current_temp or tgt)
+                ready_now = True
+            else:
+                # --- RAMP + HOLD ---
+                start_t = sim_temp
+                if i == idx and self.current_temp:
+                    start_t = self.current_temp
+                ramp_sec = 0.0
+                if tgt:
+                    ramp_sec = self.calculate_ramp_minutes(start_t, tgt, vol, ramp_watts) * 60.0
                     sim_temp = tgt
+                energy_wh += ramp_watts * ramp_sec / 3600.0
+                ready = clock + ramp_sec
+                clock = ready + hold_sec
+                ready_now = False
 
-            # --- FUTURE STEPS ---
-            else:
-                tgt = step.setpoint_f if step.setpoint_f else sim_temp
-                
-                # --- CHANGE: Use RAMP Power for predictions ---
-                watts = step.ramp_power_watts if step.ramp_power_watts else 1800
-                
-                ramp_min = self.calculate_ramp_minutes(sim_temp, tgt, sim_vol, watts)
-                ramp_sec = ramp_min * 60.0
-                
-                ready_epoch = current_time + ramp_sec
-                dt = datetime.fromtimestamp(ready_epoch)
-                step.predicted_ready_time = dt.strftime("%H:%M")
-                
-                hold_sec = (step.duration_min * 60.0) if step.duration_min else 0.0
-                current_time += (ramp_sec + hold_sec)
-                sim_temp = tgt
+            duty = 1.0 if plan_step.mode == MODE_OPEN else HOLD_DUTY_ESTIMATE
+            energy_wh += hold_watts * duty * hold_sec / 3600.0
+            rows.append(StepProjection(i, False, ready_now, ready, clock))
+
+        return ScheduleProjection(now, tuple(rows), clock, energy_wh / 1000.0)
 
+    @control_command
     def start_manual(self):
         """Starts OR Resumes the heater/timer in Manual Mode."""
         # Clear Hard Stop flag
@@ -659,6 +856,7 @@ class SequenceManager:
         else:
              self.log_message("Manual Mode RESUMED")
 
+    @control_command
     def pause_manual(self):
         """
         Pauses heating/timer.
@@ -686,6 +884,7 @@ class SequenceManager:
         # We do NOT reset manual_timer_remaining here. It stays frozen.
         self.log_message("Manual Mode PAUSED (Timer Frozen, Heat Active)")
 
+    @control_command
     def stop(self):
         """Full System Reset."""
         # --- FIX: Ensure Hard Stop is cleared on Reset ---
@@ -706,10 +905,41 @@ class SequenceManager:
         self.step_start_time = 0.0
         self.log_message("STOPPED / RESET")
 
+    @control_command
+    def shutdown(self, timeout=10.0):
+        """
+        On exit: relays off, the open session ended, the control loop stopped,
+        and the CSV logger, session store, telemetry ring and shared state block
+        flushed and closed. The loggers are daemon threads, so anything still
+        queued is lost if the process exits first. Wait on submit("shutdown").
+        """
+        self.stop()
+        if self.session_id is not None:
+            self._end_session()
+        self._stop_event.set()
+
+        # The store's close hook archives the final session through self.session_store,
+        # so each one is only dropped after it has closed
+        if self.csv_logger:
+            self.csv_logger.close(timeout)
+            self.csv_logger = None
+        if self.session_store:
+            self.session_store.close(timeout)
+            self.session_store = None
+        if self.telemetry:
+            self.telemetry.close()
+            self.telemetry = None
+        if self.shared_state:
+            self.shared_state.close()
+            self.shared_state = None
+        print("[SequenceManager] Shut down, logs flushed")
+
+    @control_command
     def reset_manual_state(self):
         """Alias for enter_manual_mode to prevent legacy crashes."""
         self.enter_manual_mode()
     
+    @control_command
     def emergency_cut_power(self):
         """Smart Stop Action (Hard Stop)."""
         # 1. Engage Hard Stop Override (Prevents Control Loop from reheating)
@@ -730,6 +960,7 @@ class SequenceManager:
             
         self.log_message("EMERGENCY STOP TRIGGERED")
 
+    @control_command
     def toggle_manual_heater(self, enabled):
         """Toggles the heater on/off in manual mode."""
         self.is_heating = enabled
@@ -737,6 +968,7 @@ class SequenceManager:
         if not enabled:
             self.relay.turn_off_all_relays()
 
+    @control_command
     def set_manual_target(self, temp_f):
         """Updates the manual mode setpoint."""
         val = float(temp_f)
@@ -744,6 +976,7 @@ class SequenceManager:
         self.manual_target_temp = val  # <--- ADD THIS LINE TO SYNC PID
         self.settings.set("manual_mode_settings", "last_setpoint_f", self.target_temp)
 
+    @control_command
     def toggle_manual_timer(self):
         """Starts or Stops the manual timer."""
         if self.step_start_time > 0:
@@ -753,6 +986,7 @@ class SequenceManager:
             # START Timer
             self.step_start_time = time.monotonic()
 
+    @control_command
     def set_manual_timer_duration(self, minutes):
         self.manual_timer_duration = float(minutes) * 60.0
         self.settings.set("manual_mode_settings", "last_timer_min", float(minutes))
@@ -767,13 +1001,183 @@ class SequenceManager:
     def update(self):
         pass 
 
+    # --- COMMAND QUEUE ---
+
+    def _should_queue(self):
+        thread = getattr(self, '_thread', None)
+        return (thread is not None and thread.is_alive()
+                and threading.current_thread() is not thread)
+
+    def _enqueue(self, method, args, kwargs):
+        future = Future()
+        self._commands.put((method, args, kwargs, future, time.monotonic()))
+        self._wake.set()
+        return future
+
+    def submit(self, name, *args, **kwargs):
+        """
+        Queues the named command without waiting and returns a
+        concurrent.futures.Future for its result (for callers that must not block).
+        """
+        attr = getattr(type(self), name, None)
+        method = getattr(attr, 'command', None)
+        if method is None:
+            raise ValueError(f"{name} is not a control command")
+        if not self._should_queue():
+            future = Future()
+            try:
+                future.set_result(method(self, *args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._enqueue(method, args, kwargs)
+
+    def _run_commands(self):
+        """Control thread: executes everything queued so far, in order. Returns how many ran."""
+        count = 0
+        while True:
+            try:
+                method, args, kwargs, future, submitted = self._commands.get_nowait()
+            except queue.Empty:
+                return count
+            count += 1
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception as e:
+                print(f"[SequenceManager] Command {method.__name__} failed: {e}")
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            applied = time.monotonic() - submitted
+            stats = self.command_stats.setdefault(method.__name__, [0, 0.0, 0.0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += applied
+            stats[2] = max(stats[2], applied)
+            self._awaiting_tick.append((method.__name__, submitted))
+
+    def _record_tick_latency(self):
+        """End of tick: the relays now reflect every command applied before it."""
+        now = time.monotonic()
+        for name, submitted in self._awaiting_tick:
+            stats = self.command_stats[name]
+            stats[3] += now - submitted
+            stats[4] = max(stats[4], now - submitted)
+        self._awaiting_tick = []
+
+    def get_command_stats(self):
+        """
+        name -> {count, applied_avg_ms, applied_max_ms, relay_avg_ms, relay_max_ms}.
+        'applied' is submit -> command executed (direct relay writes such as the
+        emergency cut happen here); 'relay' is submit -> end of the next control
+        tick, when the loop's relay output reflects the command.
+        """
+        out = {}
+        for name, (count, applied_sum, applied_max, tick_sum, tick_max) in self.command_stats.items():
+            out[name] = {
+                "count": count,
+                "applied_avg_ms": applied_sum / count * 1000.0,
+                "applied_max_ms": applied_max * 1000.0,
+                "relay_avg_ms": tick_sum / count * 1000.0,
+                "relay_max_ms": tick_max * 1000.0,
+            }
+        return out
+
+    def command_summary(self):
+        stats = self.get_command_stats()
+        if not stats:
+            return "no commands"
+        return ", ".join(
+            f"{name} x{s['count']} applied {s['applied_max_ms']:.1f} ms / relay {s['relay_max_ms']:.0f} ms max"
+            for name, s in sorted(stats.items())
+        )
+
+    # --- TIMED EVENTS ---
+
+    def _arm_status_timers(self):
+        """Arms/cancels the timers that only run in one status. Checked once per tick."""
+        status = self.status
+        if status is self._timer_status:
+            return
+        previous = self._timer_status
+        self._timer_status = status
+
+        if previous == SequenceStatus.WAITING_FOR_USER:
+            self.timers.cancel("alert_nag")
+        if previous == SequenceStatus.DELAYED_WAIT:
+            self.timers.cancel("delay_recalc")
+
+        if status == SequenceStatus.WAITING_FOR_USER:
+            self._arm_nag()
+        elif status == SequenceStatus.DELAYED_WAIT:
+            self.timers.call_every(DELAY_RECALC_INTERVAL_S, self._recalc_delayed_start,
+                                   name="delay_recalc", first_delay=0)
+
+    def _arm_nag(self):
+        freq = self.settings.get_system_setting("alert_repeat_freq", 15)
+        if freq > 0:
+            self.timers.call_at(self.last_alert_nag_time + freq, self._nag, name="alert_nag")
+        else:
+            self.timers.call_later(NAG_RECHECK_S, self._nag, name="alert_nag")
+
+    def _nag(self):
+        """alert_nag timer: repeats the alert sound every alert_repeat_freq seconds while waiting."""
+        if self.status != SequenceStatus.WAITING_FOR_USER:
+            return
+        freq = self.settings.get_system_setting("alert_repeat_freq", 15)
+        if freq > 0 and (time.monotonic() - self.last_alert_nag_time >= freq):
+            self._play_alert_sound()
+        self._arm_nag()
+
+    def _recalc_delayed_start(self):
+        """delay_recalc timer: re-fits the heater start time to the current water temp."""
+        if self.status != SequenceStatus.DELAYED_WAIT:
+            return
+        if not (hasattr(self, 'delayed_target_temp') and hasattr(self, 'delayed_ready_epoch')):
+            return
+        now = time.time()
+        old_start = getattr(self, 'delayed_start_epoch', now)
+        current_t = self.current_temp if self.current_temp else 60.0
+        ramp_watts = getattr(self, 'manual_ramp_watts', 1800)
+        ramp_min = self.calculate_ramp_minutes(
+            current_t,
+            self.delayed_target_temp,
+            getattr(self, 'delayed_vol', 8.0),
+            ramp_watts
+        )
+        new_start = self.delayed_ready_epoch - (ramp_min * 60.0)
+        # Never push a past start time into the future
+        if old_start <= now and new_start > now:
+            new_start = old_start
+        self.delayed_start_epoch = new_start
+        self.delayed_start_time_str = datetime.fromtimestamp(self.delayed_start_epoch).strftime("%H:%M")
+        try:
+            self.invalidate_schedule()
+            self.update_predictions()
+        except Exception as pred_e:
+            print(f"[SequenceManager] Prediction update error during delay: {pred_e}")
+
     def _control_loop(self):
-        last_delay_calc = 0.0  
+        next_tick = time.monotonic() + CONTROL_TICK_S
 
         while not self._stop_event.is_set():
-            time.sleep(0.1) 
+            # Commands run as soon as they arrive; the control tick keeps its own cadence
+            if self._run_commands():
+                self._publish_changes()
+            if self._stop_event.is_set():
+                break
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+            next_tick += CONTROL_TICK_S
+            if next_tick <= time.monotonic():
+                next_tick = time.monotonic() + CONTROL_TICK_S
             
             try:
+                self.last_requested_watts = 0
                 try:
                     self.current_temp = self.hw.read_temperature()
                 except:
@@ -799,10 +1203,13 @@ class SequenceManager:
                     if states.get("Heater2", False): current_watts += w2
                     if states.get("Heater3", False): current_watts += w3
                 
+                self.current_watts = current_watts
                 if current_watts > 0 and dt > 0:
                     self.total_watt_seconds += (current_watts * dt)
                 # --- NEW: ENERGY INTEGRATION END ---
 
+                self._update_session()
+
                 # Safety: If sensor fails, kill power
                 if self.current_temp is None:
                     self.relay.set_relays(False, False, False)
@@ -813,59 +1220,25 @@ class SequenceManager:
                      self.relay.set_relays(False, False, False)
                      continue
 
-                # --- CSV LOGGING ---
-                if now_mono - self.last_log_write > 30.0:
-                    self._log_csv()
-                    self.last_log_write = now_mono
-
-                # --- ALERT NAG / REPEAT LOGIC ---
-                if self.status == SequenceStatus.WAITING_FOR_USER:
-                    freq = self.settings.get_system_setting("alert_repeat_freq", 15)
-                    if freq > 0 and (now_mono - self.last_alert_nag_time > freq):
-                        self._play_alert_sound() 
-
-                # --- DELAYED START WAIT ---
+                # --- DELAYED START WAIT (trigger check; recalculation is the delay_recalc timer) ---
                 if self.status == SequenceStatus.DELAYED_WAIT:
                     now = time.time()
-
-                    # 1. TRIGGER CHECK (before recalculation so recalc can never suppress an overdue trigger)
                     if hasattr(self, 'delayed_start_epoch'):
                         if now >= self.delayed_start_epoch:
                              print(f"[SequenceManager] Delayed Start Triggered! (epoch={self.delayed_start_epoch:.0f}, now={now:.0f})")
                              self.reset_energy_counter()
                              self.start_manual()
-
-                    # 2. RECALCULATION (only if still waiting — trigger above may have changed status)
-                    if self.status == SequenceStatus.DELAYED_WAIT and now - last_delay_calc > 30.0:
-                        last_delay_calc = now
-                        if hasattr(self, 'delayed_target_temp') and hasattr(self, 'delayed_ready_epoch'):
-                             old_start = getattr(self, 'delayed_start_epoch', now)
-                             current_t = self.current_temp if self.current_temp else 60.0
-                             ramp_watts = getattr(self, 'manual_ramp_watts', 1800)
-                             ramp_min = self.calculate_ramp_minutes(
-                                 current_t,
-                                 self.delayed_target_temp,
-                                 getattr(self, 'delayed_vol', 8.0),
-                                 ramp_watts
-                             )
-                             new_start = self.delayed_ready_epoch - (ramp_min * 60.0)
-                             # Never push a past start time into the future
-                             if old_start <= now and new_start > now:
-                                 new_start = old_start
-                             self.delayed_start_epoch = new_start
-                             self.delayed_start_time_str = datetime.fromtimestamp(self.delayed_start_epoch).strftime("%H:%M")
-                             try:
-                                 self.update_predictions()
-                             except Exception as pred_e:
-                                 print(f"[SequenceManager] Prediction update error during delay: {pred_e}")
                 
                 # --- MAIN SEQUENCE LOGIC ---
                 elif self.status in [SequenceStatus.RUNNING, SequenceStatus.PAUSED, SequenceStatus.WAITING_FOR_USER]:
                     if self.current_profile:
-                         step = self.current_profile.steps[self.current_step_index]
-                         self._manage_temperature(step)
+                         plan_step = self._plan_step(self.current_step_index)
+                         if plan_step is None:
+                             self.relay.set_relays(False, False, False)
+                             continue
+                         self._manage_temperature(plan_step)
                          if self.status == SequenceStatus.RUNNING:
-                             self._process_time_logic(step)
+                             self._process_time_logic(plan_step)
                 
                 # --- MANUAL MODE LOGIC ---
                 elif self.status == SequenceStatus.MANUAL:
@@ -873,11 +1246,134 @@ class SequenceManager:
                     
                 else:
                     self.relay.set_relays(False, False, False)
+
+                # --- TIMED EVENTS (CSV row, alert nag, delay recalc, temp latch) ---
+                self._arm_status_timers()
+                self.timers.run_due(now_mono)
                     
             except Exception as e:
                 print(f"[SequenceManager] CRITICAL CONTROL LOOP ERROR: {e}")
+            finally:
+                # Runs on every tick, including the early 'continue' safety paths
+                self._record_telemetry()
+                self._record_shared_state()
+                self._record_session_sample()
+                self.trend.append(time.time(), self.current_temp, self.target_temp, self.current_watts)
+                if self._awaiting_tick:
+                    self._record_tick_latency()
+                self._publish_changes(sample=True)
+
+    # --- STATE CHANGE EVENTS ---
+
+    def _publish_changes(self, sample=False):
+        """
+        Control thread: publishes an event for each watched attribute that
+        differs from what was last published, then (once per tick) a SAMPLE.
+        """
+        events, last = self.events, self._published
+        try:
+            profile = self.current_profile
+            profile_key = (self.profile_loads, id(profile))
+            if last.get('profile') != profile_key:
+                last['profile'] = profile_key
+                if profile is not None:
+                    events.publish(event_bus.PROFILE_LOADED, profile_id=profile.id, name=profile.name)
+
+            status = self.status
+            if last.get('status', SequenceStatus.IDLE) != status:
+                events.publish(event_bus.STATUS_CHANGED, old=last.get('status', SequenceStatus.IDLE), new=status)
+            last['status'] = status
+
+            index = self.current_step_index
+            if last.get('step', -1) != index:
+                name = ""
+                if profile is not None and 0 <= index < len(profile.steps):
+                    name = profile.steps[index].name
+                events.publish(event_bus.STEP_CHANGED, old=last.get('step', -1), new=index, name=name)
+            last['step'] = index
+
+            if self.temp_reached and not last.get('temp_reached'):
+                events.publish(event_bus.TEMP_REACHED, step=index, temp_f=self.current_temp)
+            last['temp_reached'] = self.temp_reached
+
+            alert = self.current_alert_text
+            old_alert = last.get('alert')
+            if alert != old_alert:
+                if old_alert:
+                    events.publish(event_bus.ALERT_CLEARED, text=old_alert)
+                if alert:
+                    events.publish(event_bus.ALERT_RAISED, text=alert)
+            last['alert'] = alert
+
+            mask = relay_mask(self.relay.relay_states)
+            if last.get('relays', 0) != mask:
+                events.publish(event_bus.RELAYS_CHANGED, mask=mask, watts=self.current_watts)
+            last['relays'] = mask
+
+            if sample:
+                events.publish(event_bus.SAMPLE, temp_f=self.current_temp, target_f=self.target_temp,
+                               watts=self.last_requested_watts, relay_mask=mask)
+        except Exception as e:
+            print(f"[SequenceManager] Event publish error: {e}")
+
+    def _record_session_sample(self):
+        store = self.session_store
+        if store is None or self.session_id is None:
+            return
+        step_index, step_name, step_type = -1, "", ""
+        if self.session_mode == "AUTO" and self.current_profile:
+            if 0 <= self.current_step_index < len(self.current_profile.steps):
+                step = self.current_profile.steps[self.current_step_index]
+                step_index, step_name, step_type = self.current_step_index, step.name, step.step_type.value
+        store.record(
+            self.session_id, time.time(), self.current_temp, self.target_temp,
+            self.current_watts, self.status.value, relay_mask(self.relay.relay_states),
+            step_index, step_name, step_type
+        )
 
-    def _process_time_logic(self, step):
+    def _record_telemetry(self):
+        recorder = self.telemetry
+        if recorder is None:
+            return
+        try:
+            recorder.record(
+                time.time(),
+                self.current_temp,
+                self.target_temp,
+                self.last_requested_watts,
+                self.pid.last_output,
+                relay_mask(self.relay.relay_states),
+                self.status
+            )
+        except Exception as e:
+            print(f"[SequenceManager] Telemetry write failed, disabling: {e}")
+            self.telemetry = None
+
+    def _record_shared_state(self):
+        writer = self.shared_state
+        if writer is None:
+            return
+        try:
+            step_remaining = 0.0
+            profile = self.current_profile
+            if (profile and self.status != SequenceStatus.MANUAL
+                    and 0 <= self.current_step_index < len(profile.steps)):
+                plan_step = self._plan_step(self.current_step_index, profile)
+                if plan_step is not None:
+                    step_remaining = max(0.0, plan_step.duration_s - self.step_elapsed_time)
+            writer.write(
+                self.current_temp, self.get_target_temp(), self.last_requested_watts,
+                self.current_watts, self.total_watt_seconds / 3600000.0,
+                self.step_elapsed_time, step_remaining, self._get_total_elapsed_seconds(),
+                getattr(self, 'manual_timer_remaining', 0.0),
+                self.current_step_index, relay_mask(self.relay.relay_states),
+                self.status, self.temp_reached, self.current_alert_text
+            )
+        except Exception as e:
+            print(f"[SequenceManager] Shared state write failed, disabling: {e}")
+            self.shared_state = None
+
+    def _process_time_logic(self, plan_step):
         # 1. Strict Check: If Temp Not Reached, NO TIME PASSES.
         if not self.temp_reached:
             self.step_elapsed_time = 0
@@ -900,40 +1396,30 @@ class SequenceManager:
         if self.status == SequenceStatus.WAITING_FOR_USER:
             return
 
-        duration_val = step.duration_min if step.duration_min is not None else 0.0
-        duration_sec = duration_val * 60.0
-        remaining_sec = duration_sec - self.step_elapsed_time
-        remaining_min = remaining_sec / 60.0
+        duration_sec = plan_step.duration_s
+        remaining_min = (duration_sec - self.step_elapsed_time) / 60.0
 
-        if hasattr(step, 'additions'):
-            for add in step.additions:
-                if not add.triggered:
-                    should_trigger = False
-                    # Trigger if within 0.005 min (0.3 sec)
-                    if remaining_min <= (add.time_point_min + 0.005):
-                        should_trigger = True
-                    if duration_val <= 0.0:
-                        should_trigger = True
-
-                    if should_trigger:
-                        add.triggered = True 
-                        self.status = SequenceStatus.WAITING_FOR_USER
-                        self.current_alert_text = add.name
-                        
-                        self._play_alert_sound()
-                        self._save_recovery_snapshot()
-                        return
+        # Additions: only the one under the cursor can be next (timeline is sorted)
+        add = next_due(plan_step, self._add_cursor, remaining_min)
+        if add is not None:
+            self._add_cursor += 1
+            add.triggered = True 
+            self.status = SequenceStatus.WAITING_FOR_USER
+            self.current_alert_text = add.name
+            
+            self._play_alert_sound()
+            self._save_recovery_snapshot()
+            return
 
         if self.step_elapsed_time >= duration_sec:
-            if hasattr(step, 'additions'):
-                # Ensure all additions have fired before completing step
-                if any(not a.triggered for a in step.additions):
-                    return 
+            # Ensure all additions have fired before completing step
+            if self._add_cursor < len(plan_step.additions):
+                return 
 
-            if duration_val > 0.0:
+            if plan_step.duration_min > 0.0:
                 self._play_alert_sound()
 
-            if step.timeout_behavior == TimeoutBehavior.AUTO_ADVANCE:
+            if plan_step.auto_advance:
                 self.advance_step()
             else:
                 self.status = SequenceStatus.WAITING_FOR_USER
@@ -1053,82 +1539,119 @@ class SequenceManager:
             
             self.settings.save_recovery_state(state)
             
+    # --- BREW SESSIONS ---
+
+    def _session_mode(self):
+        """Mode label for the current status, or None when no session is active."""
+        if self.status == SequenceStatus.DELAYED_WAIT:
+            return "DELAY"
+        if self.status == SequenceStatus.MANUAL:
+            return "MANUAL"
+        if self.status in (SequenceStatus.IDLE, SequenceStatus.COMPLETED):
+            return None
+        return "AUTO" if self.current_profile else None
+
+    def _update_session(self):
+        """
+        Tracks brew session boundaries. A session starts when the sequencer
+        leaves IDLE and ends when it returns to IDLE/COMPLETED or switches
+        between AUTO and MANUAL. A delayed start that fires into Manual mode
+        stays in the same session.
+        """
+        mode = self._session_mode()
+        if mode == self.session_mode:
+            return
+
+        if self.session_mode == "DELAY" and mode == "MANUAL":
+            self.session_mode = mode
+            return
+
+        if self.session_id is not None:
+            self._end_session()
+        if mode is not None:
+            self._begin_session(mode)
+
+    def _begin_session(self, mode):
+        # Ids have one-second resolution; a session started in the same second as
+        # the previous one (e.g. an auto-resume right after a stop) gets -2, -3, ...
+        session_id = datetime.now().strftime("%Y%m%d-%H%M%S")
+        last = self._last_session_id or ""
+        if last == session_id:
+            session_id += "-2"
+        elif last.startswith(session_id + "-"):
+            session_id += f"-{int(last.rsplit('-', 1)[1]) + 1}"
+        self.session_id = self._last_session_id = session_id
+        self.session_mode = mode
+        print(f"[Sequence] Session {self.session_id} started ({mode})")
+        if self.session_store:
+            profile_name = self.current_profile.name if (mode == "AUTO" and self.current_profile) else None
+            self.session_store.begin_session(self.session_id, mode, profile_name)
+        # Log the first row immediately rather than up to 30s later
+        self.timers.call_every(CSV_LOG_INTERVAL_S, self._log_csv, name="csv_log", first_delay=0)
+
+    def _end_session(self):
+        print(f"[Sequence] Session {self.session_id} ended")
+        if self.session_store:
+            self.session_store.end_session(self.session_id)
+        if self._csv_session_open:
+            self.csv_logger.end_session()
+            self._csv_session_open = False
+        self.session_id = None
+        self.session_mode = None
+
+    def _archive_closed_session(self, session_id):
+        """
+        Runs on the session store's worker thread once a session is committed.
+        Moves the raw ticks into a compact .kbla archive; rollups stay in SQLite.
+        """
+        if not self.settings.get_system_setting("archive_closed_sessions", True):
+            return
+        # Imported here: only needed once per brew, keeps gzip/csv out of startup
+        from log_archive import archive_session, ARCHIVE_DIR_NAME
+        archive_dir = os.path.join(self.settings.data_dir, ARCHIVE_DIR_NAME)
+        if archive_session(self.session_store, session_id, archive_dir):
+            self.session_store.delete_raw(session_id)
+
     def _log_csv(self):
-        """Appends a row to the CSV log if enabled."""
-        # 1. Check if enabled
-        if not self.settings.get_system_setting("enable_csv_logging", False):
+        """Queues a row for the CSV logger. All file work happens on its thread."""
+        if not self.csv_logger or self.session_id is None:
             return
 
-        # 2. Skip if IDLE (User requested only Active modes)
-        if self.status == SequenceStatus.IDLE:
+        # Logging can be toggled mid-session from Settings
+        if not self.settings.get_system_setting("enable_csv_logging", False):
+            if self._csv_session_open:
+                self.csv_logger.end_session()
+                self._csv_session_open = False
             return
 
         try:
-            # 3. Gather Data points
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            mode = "UNKNOWN"
-            status = self.status.value
-
-            # Determine Mode & Step Info
+            if not self._csv_session_open:
+                meta = {
+                    "mode": self.session_mode,
+                    "profile": self.current_profile.name if (self.session_mode == "AUTO" and self.current_profile) else "-",
+                    "units": self.settings.get_system_setting("units", "imperial"),
+                    "heater_config": self.settings.get_section("heater_config"),
+                }
+                self.csv_logger.start_session(self.session_id, meta)
+                self._csv_session_open = True
+
+            mode = self.session_mode
             step_info = "-"
             if self.status == SequenceStatus.DELAYED_WAIT:
-                mode = "DELAY"
                 step_info = f"Starts: {self.delayed_start_time_str}"
-            elif self.status == SequenceStatus.MANUAL:
-                mode = "MANUAL"
-                step_info = "Manual Hold"
-            elif self.current_profile:
-                mode = "AUTO"
-                if 0 <= self.current_step_index < len(self.current_profile.steps):
-                    step_info = self.current_profile.steps[self.current_step_index].name
-
-            # Temperatures
-            curr_t = f"{self.current_temp:.2f}" if self.current_temp else "0.00"
-
-            # Determine Target Temp
-            if self.status == SequenceStatus.DELAYED_WAIT:
                 tgt = getattr(self, 'delayed_target_temp', 0.0)
             else:
                 tgt = self.target_temp
-            tgt_t = f"{tgt:.0f}"
-
-            # --- FIX: REAL HARDWARE POWER (Dynamic Config) ---
-            # Checks the physical state of the relays at this exact moment.
-            watts = 0
-            if self.relay and hasattr(self.relay, 'relay_states'):
-                states = self.relay.relay_states
-                
-                # Retrieve Dynamic Settings instead of Hardcoded Values
-                h_cfg = self.settings.get_section("heater_config")
-                w1 = int(h_cfg.get("relay1_watts", 1000))
-                w2 = int(h_cfg.get("relay2_watts", 800))
-                w3 = int(h_cfg.get("relay3_watts", 1000))
-                
-                val_1 = w1 if states.get("Heater1", False) else 0
-                val_2 = w2 if states.get("Heater2", False) else 0
-                val_3 = w3 if states.get("Heater3", False) else 0
-
-                watts = val_1 + val_2 + val_3
-            # --------------------------------
-
-            # Determine Timer
-            timer_str = self.get_display_timer()
-
-            # 4. Write to File
-            data_dir = self.settings.data_dir
-            log_file = os.path.join(data_dir, "kettlebrain-log.csv")
-            file_exists = os.path.isfile(log_file)
-
-            with open(log_file, mode='a', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-
-                # Write Header if new file
-                if not file_exists:
-                    writer.writerow(["Timestamp", "Mode", "Status", "Temp(F)", "Target(F)", "Power(W)", "Step", "Timer"])
-
-                # Write Data
-                writer.writerow([timestamp, mode, status, curr_t, tgt_t, watts, step_info, timer_str])
+                if self.status == SequenceStatus.MANUAL:
+                    step_info = "Manual Hold"
+                elif self.current_profile and 0 <= self.current_step_index < len(self.current_profile.steps):
+                    step_info = self.current_profile.steps[self.current_step_index].name
 
+            # Real hardware power, computed from relay states once per tick
+            self.csv_logger.log((
+                time.time(), mode, self.status.value, self.current_temp, tgt,
+                self.current_watts, step_info, self.get_display_timer()
+            ))
         except Exception as e:
             print(f"[Sequence] Log Error: {e}")
 
@@ -1137,6 +1660,7 @@ class SequenceManager:
         return time.monotonic() - self.global_start_time - self.global_paused_time
         
     # --- RESTORE LOGIC ---
+    @control_command
     def restore_from_recovery(self, state_dict):
         """Called by Main to resume a crashed/interrupted session."""
         mode_type = state_dict.get("mode_type", "PROFILE")
@@ -1239,6 +1763,7 @@ class SequenceManager:
         Allocates relays (100% or PWM) to match target_watts.
         """
         import time
+        self.last_requested_watts = target_watts
         
         # 1. Retrieve Configured Watts [cite: 35]
         h_cfg = self.settings.get_section("heater_config")
@@ -1426,13 +1951,13 @@ class SequenceManager:
         
     def get_upcoming_additions(self):
         if not self.current_profile or self.status == SequenceStatus.IDLE: return ""
-        step = self.current_profile.steps[self.current_step_index]
-        if not hasattr(step, 'additions') or not step.additions: return ""
-        
-        sorted_adds = sorted(step.additions, key=lambda x: x.time_point_min, reverse=True)
-        
-        for add in sorted_adds:
-            if not add.triggered:
-                 return f"Next: {add.name} @ {add.time_point_min}m"
+        plan_step = self._plan_step(self.current_step_index)
+        if plan_step is None: return ""
+        additions = plan_step.additions
+        if not additions: return ""
+        
+        if self._add_cursor < len(additions):
+            add = additions[self._add_cursor]
+            return f"Next: {add.name} @ {add.time_point_min}m"
         return "No more alerts"
         
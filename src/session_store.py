@@ -0,0 +1,399 @@
+"""
+kettlebrain app
+session_store.py
+
+Local time-series store for brew sessions (kettlebrain-data/kettlebrain_sessions.db).
+
+Per-tick samples from the sequencer are queued by the control thread and
+written in batches by a worker thread. Alongside the raw rows the worker
+maintains 10 second and 1 minute rollups (min/max/mean temperature, energy,
+heater duty), and a step table recording when each profile step ran, so
+questions like "the last 20 mash rests" only read a handful of rollup rows.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SESSION_DB_FILE = "kettlebrain_sessions.db"
+
+# Rollup tiers: table name -> bucket width in seconds
+ROLLUPS = (("rollup_10s", 10), ("rollup_1m", 60))
+
+BATCH_INTERVAL = 5.0    # seconds between batched commits
+QUEUE_SIZE = 20000
+MAX_SAMPLE_GAP = 1.0    # longer gaps between ticks are not counted as energy/duty time
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        mode TEXT,
+        profile TEXT,
+        started REAL,
+        ended REAL)""",
+    """CREATE TABLE IF NOT EXISTS steps (
+        session_id TEXT,
+        step_index INTEGER,
+        name TEXT,
+        step_type TEXT,
+        started REAL,
+        ended REAL,
+        PRIMARY KEY (session_id, step_index, started))""",
+    "CREATE INDEX IF NOT EXISTS steps_type ON steps (step_type, started)",
+    """CREATE TABLE IF NOT EXISTS samples (
+        session_id TEXT,
+        ts REAL,
+        temp REAL,
+        target REAL,
+        watts REAL,
+        status TEXT,
+        relay_mask INTEGER)""",
+    "CREATE INDEX IF NOT EXISTS samples_session_ts ON samples (session_id, ts)",
+]
+
+for _table, _width in ROLLUPS:
+    _SCHEMA.append(
+        f"""CREATE TABLE IF NOT EXISTS {_table} (
+            session_id TEXT,
+            bucket INTEGER,
+            n INTEGER,
+            temp_min REAL,
+            temp_max REAL,
+            temp_sum REAL,
+            target REAL,
+            energy_ws REAL,
+            on_seconds REAL,
+            seconds REAL,
+            PRIMARY KEY (session_id, bucket))"""
+    )
+
+# Merges a batch's partial bucket into an existing row
+_UPSERT = """INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (session_id, bucket) DO UPDATE SET
+        n = n + excluded.n,
+        temp_min = min(temp_min, excluded.temp_min),
+        temp_max = max(temp_max, excluded.temp_max),
+        temp_sum = temp_sum + excluded.temp_sum,
+        target = excluded.target,
+        energy_ws = energy_ws + excluded.energy_ws,
+        on_seconds = on_seconds + excluded.on_seconds,
+        seconds = seconds + excluded.seconds"""
+
+# Queue message kinds
+_SAMPLE = 0
+_BEGIN = 1
+_END = 2
+_STOP = 3
+_PURGE = 4
+
+
+class SessionStore:
+    def __init__(self, data_dir):
+        self.db_file = os.path.join(data_dir, SESSION_DB_FILE)
+        self.dropped_samples = 0
+
+        # Optional callback(session_id), run on the worker thread once a
+        # session's final samples are committed (used for archiving).
+        self.on_session_closed = None
+
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._read_lock = threading.Lock()
+
+        # Worker-side per-session state: last sample ts and open step
+        self._last_ts = {}
+        self._open_step = {}
+
+        # Separate connections so readers never wait on a batch in progress
+        self._write_conn = self._connect()
+        with self._write_conn:
+            for stmt in _SCHEMA:
+                self._write_conn.execute(stmt)
+        self._read_conn = self._connect()
+
+        self._thread = threading.Thread(target=self._run, name="SessionStore", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- PRODUCER API (control thread) ---
+
+    def begin_session(self, session_id, mode, profile_name=None):
+        self._put((_BEGIN, (session_id, mode, profile_name, time.time())))
+
+    def end_session(self, session_id):
+        self._put((_END, (session_id, time.time())))
+
+    def record(self, session_id, ts, temp, target, watts, status, relay_mask=0,
+               step_index=-1, step_name="", step_type=""):
+        """Queues one tick. Never blocks; samples are dropped (and counted) if the writer falls behind."""
+        try:
+            self._queue.put_nowait((_SAMPLE, (session_id, ts, temp, target, watts, status, relay_mask,
+                                              step_index, step_name, step_type)))
+        except queue.Full:
+            self.dropped_samples += 1
+
+    def delete_raw(self, session_id):
+        """Drops a session's raw ticks (rollups and steps are kept)."""
+        self._put((_PURGE, session_id))
+
+    def close(self, timeout=5.0):
+        self._put((_STOP, None))
+        self._thread.join(timeout)
+
+    def _put(self, item):
+        try:
+            self._queue.put(item, timeout=1.0)
+        except queue.Full:
+            print("[SessionStore] Queue full, control message dropped")
+
+    # --- WORKER ---
+
+    def _run(self):
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + BATCH_INTERVAL
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                if item[0] != _SAMPLE:
+                    # Session boundaries are written promptly
+                    break
+
+            if batch:
+                try:
+                    running = self._write_batch(batch)
+                except Exception as e:
+                    print(f"[SessionStore] Write error: {e}")
+
+        # The close hook archives the final session and queues its purge
+        # behind _STOP; apply it rather than leave the raw ticks duplicated
+        while True:
+            try:
+                kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == _PURGE:
+                try:
+                    with self._write_conn as conn:
+                        conn.execute("DELETE FROM samples WHERE session_id = ?", (payload,))
+                except Exception as e:
+                    print(f"[SessionStore] Purge error: {e}")
+        self._write_conn.close()
+
+    def _write_batch(self, batch):
+        running = True
+        closed = []
+        raw = []
+        buckets = {table: {} for table, _ in ROLLUPS}
+
+        with self._write_conn as conn:
+            for kind, payload in batch:
+                if kind == _SAMPLE:
+                    self._ingest(conn, payload, raw, buckets)
+                elif kind == _BEGIN:
+                    session_id, mode, profile_name, ts = payload
+                    conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, NULL)",
+                                 (session_id, mode, profile_name, ts))
+                elif kind == _END:
+                    session_id, ts = payload
+                    self._close_step(conn, session_id, ts)
+                    self._last_ts.pop(session_id, None)
+                    conn.execute("UPDATE sessions SET ended = ? WHERE id = ?", (ts, session_id))
+                    closed.append(session_id)
+                elif kind == _PURGE:
+                    conn.execute("DELETE FROM samples WHERE session_id = ?", (payload,))
+                elif kind == _STOP:
+                    running = False
+
+            if raw:
+                conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)", raw)
+            for table, rows in buckets.items():
+                if rows:
+                    conn.executemany(_UPSERT.format(table=table), [
+                        (sid, bucket) + tuple(agg) for (sid, bucket), agg in rows.items()
+                    ])
+
+        callback = self.on_session_closed
+        if callback:
+            for session_id in closed:
+                try:
+                    callback(session_id)
+                except Exception as e:
+                    print(f"[SessionStore] Session close hook failed for {session_id}: {e}")
+        return running
+
+    def _ingest(self, conn, payload, raw, buckets):
+        session_id, ts, temp, target, watts, status, mask, step_index, step_name, step_type = payload
+        raw.append((session_id, ts, temp, target, watts, status, mask))
+
+        # Step boundaries
+        open_step = self._open_step.get(session_id)
+        if open_step is None or open_step[0] != step_index:
+            self._close_step(conn, session_id, ts)
+            if step_index >= 0:
+                conn.execute("INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, NULL)",
+                             (session_id, step_index, step_name, step_type, ts))
+                self._open_step[session_id] = (step_index, ts)
+
+        # Time covered by this sample (for energy and duty)
+        prev = self._last_ts.get(session_id)
+        self._last_ts[session_id] = ts
+        dt = 0.0 if prev is None else ts - prev
+        if dt < 0 or dt > MAX_SAMPLE_GAP:
+            dt = 0.0
+
+        if temp is None:
+            return
+        for table, width in ROLLUPS:
+            key = (session_id, int(ts // width) * width)
+            agg = buckets[table].get(key)
+            if agg is None:
+                # n, min, max, sum, target, energy_ws, on_seconds, seconds
+                agg = [0, temp, temp, 0.0, target, 0.0, 0.0, 0.0]
+                buckets[table][key] = agg
+            agg[0] += 1
+            if temp < agg[1]: agg[1] = temp
+            if temp > agg[2]: agg[2] = temp
+            agg[3] += temp
+            agg[4] = target
+            agg[5] += watts * dt
+            if watts > 0:
+                agg[6] += dt
+            agg[7] += dt
+
+    def _close_step(self, conn, session_id, ts):
+        open_step = self._open_step.pop(session_id, None)
+        if open_step is not None:
+            conn.execute("UPDATE steps SET ended = ? WHERE session_id = ? AND step_index = ? AND started = ?",
+                         (ts, session_id, open_step[0], open_step[1]))
+
+    # --- QUERIES (any thread) ---
+
+    def _query(self, sql, params=()):
+        with self._read_lock:
+            return self._read_conn.execute(sql, params).fetchall()
+
+    def list_sessions(self, limit=50, mode=None):
+        """Returns [(id, mode, profile, started, ended), ...] newest first."""
+        if mode:
+            return self._query("SELECT * FROM sessions WHERE mode = ? ORDER BY started DESC LIMIT ?", (mode, limit))
+        return self._query("SELECT * FROM sessions ORDER BY started DESC LIMIT ?", (limit,))
+
+    def find_steps(self, step_type=None, name=None, limit=20):
+        """
+        Returns [(session_id, step_index, name, step_type, started, ended), ...] newest first.
+        e.g. find_steps(step_type="Mash", limit=20) for the last 20 mash rests.
+        """
+        sql = "SELECT * FROM steps WHERE ended IS NOT NULL"
+        params = []
+        if step_type:
+            sql += " AND step_type = ?"
+            params.append(step_type)
+        if name:
+            sql += " AND name = ?"
+            params.append(name)
+        sql += " ORDER BY started DESC LIMIT ?"
+        params.append(limit)
+        return self._query(sql, params)
+
+    @staticmethod
+    def pick_resolution(start, end, max_points=500):
+        """Chooses the coarsest tier that still gives about max_points points."""
+        span = max(0.0, end - start)
+        for table, width in ROLLUPS:
+            if span / width <= max_points:
+                return width
+        return ROLLUPS[-1][1]
+
+    def query_range(self, session_id, start=None, end=None, resolution=None):
+        """
+        Returns rollup rows for charting/analytics:
+            [(bucket_ts, temp_min, temp_mean, temp_max, target, energy_wh, duty), ...]
+        resolution is 10 or 60 seconds; by default it is picked from the span.
+        Only the rollup tables are read.
+        """
+        if start is None or end is None:
+            bounds = self._query("SELECT started, ended FROM sessions WHERE id = ?", (session_id,))
+            if not bounds:
+                return []
+            s_start, s_end = bounds[0]
+            start = s_start if start is None else start
+            end = (s_end or time.time()) if end is None else end
+
+        width = resolution or self.pick_resolution(start, end)
+        table = dict((w, t) for t, w in ROLLUPS).get(width)
+        if table is None:
+            raise ValueError(f"No rollup tier for {width}s")
+
+        rows = self._query(
+            f"SELECT bucket, temp_min, temp_sum / n, temp_max, target, energy_ws / 3600.0,"
+            f" CASE WHEN seconds > 0 THEN on_seconds / seconds ELSE 0 END"
+            f" FROM {table} WHERE session_id = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+            (session_id, int(start // width) * width, end)
+        )
+        return rows
+
+    def query_raw(self, session_id, start, end):
+        """Raw ticks [(ts, temp, target, watts, status, relay_mask), ...]. Use for short windows only."""
+        return self._query(
+            "SELECT ts, temp, target, watts, status, relay_mask FROM samples"
+            " WHERE session_id = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            (session_id, start, end)
+        )
+
+    def iter_raw(self, session_id, batch=5000):
+        """Streams every raw tick of a session in ts order (own connection, any thread)."""
+        conn = sqlite3.connect(self.db_file)
+        try:
+            cur = conn.execute(
+                "SELECT ts, temp, target, watts, status, relay_mask FROM samples"
+                " WHERE session_id = ? ORDER BY ts", (session_id,)
+            )
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def get_session(self, session_id):
+        """Returns (id, mode, profile, started, ended) or None."""
+        rows = self._query("SELECT * FROM sessions WHERE id = ?", (session_id,))
+        return rows[0] if rows else None
+
+    def get_steps(self, session_id):
+        """Returns the session's steps [(session_id, step_index, name, step_type, started, ended), ...]."""
+        return self._query("SELECT * FROM steps WHERE session_id = ? ORDER BY started", (session_id,))
+
+    def summarize(self, session_id, start=None, end=None):
+        """Min/mean/max temp, energy (Wh) and duty for a window, from the 10 s tier."""
+        table, width = ROLLUPS[0]
+        sql = (f"SELECT min(temp_min), sum(temp_sum) / sum(n), max(temp_max), sum(energy_ws) / 3600.0,"
+               f" CASE WHEN sum(seconds) > 0 THEN sum(on_seconds) / sum(seconds) ELSE 0 END"
+               f" FROM {table} WHERE session_id = ?")
+        params = [session_id]
+        if start is not None:
+            sql += " AND bucket >= ?"
+            params.append(int(start // width) * width)
+        if end is not None:
+            sql += " AND bucket <= ?"
+            params.append(end)
+        row = self._query(sql, params)[0]
+        return {
+            "temp_min": row[0], "temp_mean": row[1], "temp_max": row[2],
+            "energy_wh": row[3] or 0.0, "duty": row[4] or 0.0
+        }
@@ -9,9 +9,16 @@ import threading
 import uuid
 import copy
 from datetime import datetime
-from profile_data import BrewProfile, BrewStep, BrewAddition, StepType, TimeoutBehavior
+from profile_data import BrewProfile, BrewStep, BrewAddition, StepType, TimeoutBehavior, SCHEMA_VERSION, upgrade_profile_dict
+from profile_store import create_profile_store, migrate_json_file, migrate_profiles_dict, migrate_from_backend
 
 SETTINGS_FILE = "kettlebrain_settings.json"
+DATA_DIR_NAME = "kettlebrain-data"
+
+
+def data_dir_for(base_dir):
+    """Data folder SettingsManager(base_dir) uses; lets callers find it without loading settings."""
+    return os.path.join(base_dir, DATA_DIR_NAME)
 
 DEFAULT_SETTINGS = {
     "system_settings": {
@@ -24,6 +31,7 @@ DEFAULT_SETTINGS = {
         "buzzer_gpio": 13,
         "sensor_type": "DS18B20",
         "screen_timeout": 300,
+        "prewarm_screens": True,    # build deferred UI screens in idle frames after startup
         "boil_temp_f": 212,         
         "relay_active_high": False,
         "relay_logic_configured": False,
@@ -33,6 +41,16 @@ DEFAULT_SETTINGS = {
         "auto_start_enabled": True,
         "auto_resume_enabled": False,
         "enable_csv_logging": False,
+        "enable_telemetry": True,
+        "telemetry_capacity": 216000,
+        "enable_shared_state": True,  # live state block in /dev/shm for out-of-process UIs
+        "enable_web_api": False,      # HTTP + WebSocket API (web_api.py)
+        "web_api_host": "127.0.0.1",  # non-loopback addresses need web_api_token
+        "web_api_port": 8080,
+        "web_api_token": "",          # if set, clients must send it (Bearer header or ?token=)
+        "enable_session_store": True,
+        "archive_closed_sessions": True,
+        "profile_storage": "files",   # 'files' (one JSON per profile) or 'sqlite'
         "heater_ref_volume_gal": 8.0,
         "heater_ref_rate_fpm": 1.3,
         "last_profile_id": None,
@@ -90,19 +108,21 @@ DEFAULT_SETTINGS = {
 class SettingsManager:
     def __init__(self, base_dir):
         self.base_dir = base_dir
-        self.data_dir = os.path.join(base_dir, 'kettlebrain-data')
+        self.data_dir = data_dir_for(base_dir)
         self.settings_file = os.path.join(self.data_dir, 'kettlebrain_settings.json')
         self.profiles_file = os.path.join(self.data_dir, 'kettlebrain_profiles.json')
         self._data_lock = threading.RLock()
         
         self.settings = {}
-        self.profiles = {}
+        self.profile_store = None
         
         self.last_shutdown_was_clean = True 
         
         self._ensure_data_dir()
         self._load_settings()
         self._load_profiles()
+        # Loading only updates memory; write the result back once
+        self._save_settings()
 
     def _ensure_data_dir(self):
         try:
@@ -218,7 +238,6 @@ class SettingsManager:
                 self.settings = copy.deepcopy(DEFAULT_SETTINGS)
                 # Initialize session with defaults on new file creation
                 self.settings["manual_water_session"] = copy.deepcopy(self.settings["water_defaults"])
-                self._save_settings()
             else:
                 try:
                     with open(self.settings_file, 'r', encoding='utf-8') as f:
@@ -246,32 +265,35 @@ class SettingsManager:
             self.last_shutdown_was_clean = self.settings.get("system_settings", {}).get("controlled_shutdown", False)
             if "system_settings" not in self.settings: self.settings["system_settings"] = {}
             self.settings["system_settings"]["controlled_shutdown"] = False
-            self._save_settings()
 
     def _load_profiles(self):
         with self._data_lock:
+            backend = self.settings.get("system_settings", {}).get("profile_storage", "files")
+            try:
+                self.profile_store = create_profile_store(self.data_dir, backend)
+            except Exception as e:
+                print(f"[SettingsManager] Error opening '{backend}' profile store: {e}. Using files.")
+                self.profile_store = create_profile_store(self.data_dir, "files")
+
+            # 1. Legacy: profiles embedded in the settings file
             if "profiles" in self.settings:
                 legacy_profiles = self.settings.pop("profiles")
                 if legacy_profiles:
-                    print("[SettingsManager] Migrating profiles to kettlebrain_profiles.json")
-                    self.profiles = legacy_profiles
-                    self._save_profiles()
-                    self._save_settings() 
-                    return
-                self._save_settings()
-
-            if not os.path.exists(self.profiles_file):
-                print(f"[SettingsManager] No profiles file. Creating default.")
-                self.profiles = self._create_default_profile_dict()
-                self._save_profiles()
-            else:
-                try:
-                    with open(self.profiles_file, 'r', encoding='utf-8') as f:
-                        self.profiles = json.load(f)
-                except Exception as e:
-                    print(f"[SettingsManager] Error loading profiles: {e}. Reverting.")
-                    self.profiles = self._create_default_profile_dict()
-                    self._save_profiles()
+                    print("[SettingsManager] Migrating embedded profiles to profile store")
+                    migrate_profiles_dict(legacy_profiles, self.profile_store)
+
+            # 2. Legacy: single-document kettlebrain_profiles.json
+            migrate_json_file(self.profiles_file, self.profile_store)
+
+            # 3. Backend switched: pull profiles across from the previous backend
+            if self.profile_store.is_empty():
+                other = "files" if backend == "sqlite" else "sqlite"
+                migrate_from_backend(self.data_dir, other, self.profile_store)
+
+            if self.profile_store.is_empty():
+                print(f"[SettingsManager] No profiles found. Creating default.")
+                for p_data in self._create_default_profile_dict().values():
+                    self.profile_store.save(p_data)
 
     def _save_settings(self):
         with self._data_lock:
@@ -281,14 +303,6 @@ class SettingsManager:
             except Exception as e:
                 print(f"[SettingsManager] Error saving settings: {e}")
 
-    def _save_profiles(self):
-        with self._data_lock:
-            try:
-                with open(self.profiles_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.profiles, f, indent=4)
-            except Exception as e:
-                print(f"[SettingsManager] Error saving profiles: {e}")
-
     # --- GETTERS / SETTERS ---
 
     def get(self, section, key, default=None):
@@ -336,94 +350,57 @@ class SettingsManager:
 
     def save_profile(self, profile: BrewProfile):
         with self._data_lock:
-            self.profiles[profile.id] = profile.to_dict()
-            self._save_profiles()
-            print(f"[SettingsManager] Saved profile: {profile.name}")
+            try:
+                self.profile_store.save(profile.to_dict())
+                print(f"[SettingsManager] Saved profile: {profile.name}")
+            except Exception as e:
+                print(f"[SettingsManager] Error saving profile: {e}")
 
     def delete_profile(self, profile_id: str):
         with self._data_lock:
-            if profile_id in self.profiles:
-                p_data = self.profiles[profile_id]
-                if p_data.get("name") == "Default Profile":
-                    print("[SettingsManager] Prevented deletion of Default Profile.")
-                    return False
-                del self.profiles[profile_id]
-                self._save_profiles()
-                return True
-            return False
+            name = self.profile_store.get_name(profile_id)
+            if name is None:
+                return False
+            if name == "Default Profile":
+                print("[SettingsManager] Prevented deletion of Default Profile.")
+                return False
+            return self.profile_store.delete(profile_id)
+
+    def list_profiles(self):
+        """Returns [(profile_id, name), ...] without inflating any profile."""
+        with self._data_lock:
+            return self.profile_store.list_profiles()
 
     def get_all_profiles(self) -> list[BrewProfile]:
         profiles = []
         with self._data_lock:
-            for pid, p_data in self.profiles.items():
-                try:
-                    profile = BrewProfile(
-                        id=p_data.get("id", pid),
-                        name=p_data.get("name", "Unknown Profile"),
-                        water_data=p_data.get("water_data", {}),
-                        chemistry_data=p_data.get("chemistry_data", {})
-                    )
-                    
-                    raw_steps = p_data.get("steps", [])
-                    for s_data in raw_steps:
-                        try:
-                            s_type = StepType(s_data.get("step_type", "Step"))
-                        except ValueError:
-                            s_type = StepType.STEP
-                        
-                        try:
-                            t_behavior = TimeoutBehavior(s_data.get("timeout_behavior", "Manual Advance"))
-                        except ValueError:
-                            t_behavior = TimeoutBehavior.MANUAL_ADVANCE
-
-                        # --- BACKWARD COMPATIBILITY LOGIC ---
-                        legacy_power = s_data.get("power_watts")
-                        ramp_p = s_data.get("ramp_power_watts")
-                        hold_p = s_data.get("hold_power_watts")
-                        
-                        if ramp_p is None: ramp_p = legacy_power
-                        if hold_p is None: hold_p = legacy_power
-
-                        step = BrewStep(
-                            id=s_data.get("id"),
-                            name=s_data.get("name", "Step"),
-                            step_type=s_type,
-                            note=s_data.get("note", ""),
-                            setpoint_f=s_data.get("setpoint_f"),
-                            duration_min=s_data.get("duration_min", 0.0),
-                            target_completion_time=s_data.get("target_completion_time"),
-                            ramp_power_watts=ramp_p, # <--- NEW
-                            hold_power_watts=hold_p, # <--- NEW
-                            timeout_behavior=t_behavior,
-                            sg_reading=s_data.get("sg_reading"),
-                            sg_temp_f=s_data.get("sg_temp_f"),
-                            sg_temp_correction=s_data.get("sg_temp_correction", False),
-                            sg_corrected_value=s_data.get("sg_corrected_value"),
-                            lauter_temp_f=s_data.get("lauter_temp_f"),
-                            lauter_volume=s_data.get("lauter_volume")
-                        )
-                        
-                        raw_additions = s_data.get("additions", [])
-                        for add_data in raw_additions:
-                            if isinstance(add_data, dict):
-                                new_add = BrewAddition(
-                                    id=add_data.get("id"),
-                                    name=add_data.get("name", "Alert"),
-                                    time_point_min=add_data.get("time_point_min", 0),
-                                    triggered=False
-                                )
-                                step.additions.append(new_add)
-                        
-                        profile.add_step(step)
+            for pid, p_data in self.profile_store.load_all():
+                profile = self._inflate_profile(pid, p_data)
+                if profile:
                     profiles.append(profile)
-                except Exception as e:
-                    print(f"[SettingsManager] Error inflating profile {pid}: {e}")
-        
         return profiles
 
     def get_profile_by_id(self, profile_id: str):
-        all_profiles = self.get_all_profiles()
-        for p in all_profiles:
-            if p.id == profile_id:
-                return p
-        return None
+        with self._data_lock:
+            p_data = self.profile_store.load(profile_id)
+        if p_data is None:
+            return None
+        return self._inflate_profile(profile_id, p_data)
+
+    def _inflate_profile(self, pid, p_data):
+        """
+        Upgrades old schema versions once (writing the result back to the store)
+        and inflates via BrewProfile.from_dict.
+        """
+        try:
+            p_data, upgraded = upgrade_profile_dict(p_data)
+            if not p_data.get("id"):
+                p_data["id"] = pid
+            if upgraded:
+                with self._data_lock:
+                    self.profile_store.save(p_data)
+                print(f"[SettingsManager] Upgraded profile {p_data.get('name')} to schema v{SCHEMA_VERSION}")
+            return BrewProfile.from_dict(p_data)
+        except Exception as e:
+            print(f"[SettingsManager] Error inflating profile {pid}: {e}")
+            return None
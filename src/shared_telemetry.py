@@ -0,0 +1,304 @@
+"""
+kettlebrain app
+shared_telemetry.py
+
+Live state block for out-of-process UIs. The sequencer overwrites one
+fixed-layout record in a memory-mapped file every control tick; any number of
+readers map the same file and poll it at their own rate, without touching the
+control thread (compare kettle_daemon.py, where every query is a round trip).
+
+Consistency is a seqlock: the writer makes the sequence counter odd, writes
+the payload, then makes it even again. A reader copies the payload between
+two reads of the counter and retries if they differ or the first was odd.
+There is a single writer (the control thread), so write() takes no lock.
+
+One process publishes at a time: the writer holds a flock on <path>.lock and
+builds the block as <path>.tmp before renaming it into place, so a reader
+never maps a half-initialised header. close() removes the file only if it is
+still the writer's own. Readers notice a restarted writer (new file, new
+writer_pid) and re-map.
+
+The file lives in /dev/shm (RAM) when the host has it, named per data dir,
+else in the data dir itself.
+
+Watch from a shell: python shared_telemetry.py [path | --data-dir DIR] [--rate HZ]
+"""
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:     # Windows: os.replace fails while another writer has the file mapped
+    fcntl = None
+
+from telemetry import STATUS_CODES, STATUS_NAMES
+from log_query import default_data_dir
+
+STATE_FILE = "kettlebrain-state"
+SHM_DIR = "/dev/shm"
+
+_MAGIC = b"KBST"
+_VERSION = 1
+
+# magic, version, payload size, writer pid
+_HEADER = struct.Struct("<4sHHI4x")
+_SEQ_OFFSET = _HEADER.size
+_SEQ = struct.Struct("<Q")
+_PAYLOAD_OFFSET = _SEQ_OFFSET + _SEQ.size
+
+# Payload. Temperatures are F; temp_f is NaN when the probe read failed.
+_PAYLOAD = struct.Struct(
+    "<d"        # timestamp (epoch)
+    "I"         # tick counter
+    "fff"       # temp_f, target_f, requested watts
+    "f"         # actual watts (relays on)
+    "d"         # energy kWh since the counter was reset
+    "ffff"      # step elapsed s, step remaining s, session elapsed s, manual timer remaining s
+    "h"         # step index (-1 = none)
+    "BBB"       # relay bitmask, status code, temp reached
+    "B"         # alert kind (ALERT_*)
+    "I"         # alert id: increments each time a new alert is raised
+)
+PAYLOAD_SIZE = _PAYLOAD.size
+BLOCK_SIZE = _PAYLOAD_OFFSET + PAYLOAD_SIZE
+
+# Alert kinds
+ALERT_NONE = 0
+ALERT_STEP_COMPLETE = 1
+ALERT_ADDITION = 2
+
+READ_RETRIES = 100
+WRITER_CHECK_S = 0.5    # how often a reader looks for a replaced block (new writer)
+
+LiveState = namedtuple("LiveState", [
+    "timestamp", "tick", "temp_f", "target_f", "watts", "actual_watts", "kwh",
+    "step_elapsed_s", "step_remaining_s", "session_elapsed_s", "manual_remaining_s",
+    "step_index", "relay_mask", "status", "temp_reached", "alert_kind", "alert_id",
+])
+
+
+def default_state_path(data_dir=None):
+    """
+    State file for a data dir. In /dev/shm the name carries a short hash of the
+    data dir, so two installs on one host each get their own block.
+    """
+    data_dir = data_dir or default_data_dir()
+    if os.path.isdir(SHM_DIR) and os.access(SHM_DIR, os.W_OK):
+        tag = hashlib.sha1(os.path.realpath(data_dir).encode("utf-8")).hexdigest()[:12]
+        return os.path.join(SHM_DIR, f"{STATE_FILE}-{tag}")
+    return os.path.join(data_dir, STATE_FILE)
+
+
+class SharedStateWriter:
+    """Writer side; only the control thread calls write()."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock_file = _lock_writer(path)
+        tmp_path = path + ".tmp"
+        self._file = self._mm = None
+        self._identity = None
+        try:
+            self._file = open(tmp_path, 'w+b')
+            self._file.truncate(BLOCK_SIZE)
+            self._mm = mmap.mmap(self._file.fileno(), BLOCK_SIZE)
+            _HEADER.pack_into(self._mm, 0, _MAGIC, _VERSION, PAYLOAD_SIZE, os.getpid())
+            os.replace(tmp_path, path)
+        except Exception:
+            self.close()
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        st = os.fstat(self._file.fileno())
+        self._identity = (st.st_dev, st.st_ino)
+        self._seq = 0
+        self._tick = 0
+        self._alert_text = None
+        self._alert_id = 0
+        print(f"[SharedState] Publishing live state at {path}")
+
+    def write(self, temp_f, target_f, watts, actual_watts, kwh,
+              step_elapsed_s, step_remaining_s, session_elapsed_s, manual_remaining_s,
+              step_index, mask, status, temp_reached, alert_text):
+        mm = self._mm
+        if mm is None:
+            return
+        if alert_text != self._alert_text:
+            self._alert_text = alert_text
+            if alert_text:
+                self._alert_id += 1
+        if not alert_text:
+            alert_kind = ALERT_NONE
+        elif alert_text == "Step Complete":
+            alert_kind = ALERT_STEP_COMPLETE
+        else:
+            alert_kind = ALERT_ADDITION
+        self._tick += 1
+
+        seq = self._seq + 1         # odd: write in progress
+        _SEQ.pack_into(mm, _SEQ_OFFSET, seq)
+        _PAYLOAD.pack_into(
+            mm, _PAYLOAD_OFFSET,
+            time.time(), self._tick & 0xFFFFFFFF,
+            math.nan if temp_f is None else temp_f, target_f, watts,
+            actual_watts, kwh,
+            step_elapsed_s, step_remaining_s, session_elapsed_s, manual_remaining_s,
+            step_index, mask, STATUS_CODES.get(status, 0), 1 if temp_reached else 0,
+            alert_kind, self._alert_id
+        )
+        self._seq = seq + 1         # even: consistent
+        _SEQ.pack_into(mm, _SEQ_OFFSET, self._seq)
+
+    def close(self):
+        # Unlink only our own block, never one a newer writer has put in place
+        owned = False
+        if self._file is not None and self._identity is not None:
+            try:
+                st = os.stat(self.path)
+                owned = (st.st_dev, st.st_ino) == self._identity
+            except OSError:
+                pass
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if owned:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+def _lock_writer(path):
+    """Open <path>.lock holding an exclusive flock; raises RuntimeError if another writer has it."""
+    lock_file = open(path + ".lock", 'a+b')
+    if fcntl is None:
+        return lock_file
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise RuntimeError(f"another process is already publishing live state at {path}")
+    return lock_file
+
+
+class SharedStateReader:
+    """Maps the block read-only. read() never blocks the writer."""
+
+    def __init__(self, path=None):
+        self.path = path or default_state_path()
+        self._mm = None
+        self._map()
+        self._checked_at = time.monotonic()
+        self._present = True
+        self.retries = 0
+        self.reopens = 0
+
+    def _map(self):
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), BLOCK_SIZE, access=mmap.ACCESS_READ)
+        magic, version, payload_size, writer_pid = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or version != _VERSION or payload_size != PAYLOAD_SIZE:
+            mm.close()
+            raise ValueError(f"{self.path} is not a v{_VERSION} kettlebrain state block")
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mm
+        self._identity = (st.st_dev, st.st_ino)
+        self.writer_pid = writer_pid
+
+    def _check_writer(self):
+        """Re-maps the block if a new writer has replaced it. False while no block exists."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if (st.st_dev, st.st_ino) != self._identity:
+            old_pid = self.writer_pid
+            try:
+                self._map()
+            except (OSError, ValueError):
+                return False
+            self.reopens += 1
+            if self.writer_pid != old_pid:
+                print(f"[SharedState] Writer changed: pid {old_pid} -> {self.writer_pid}")
+        return True
+
+    def read(self):
+        """Latest consistent LiveState, or None if there is no writer or it never finished one."""
+        now = time.monotonic()
+        if now - self._checked_at >= WRITER_CHECK_S:
+            self._checked_at = now
+            self._present = self._check_writer()
+        if not self._present:
+            return None
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            before = _SEQ.unpack_from(mm, _SEQ_OFFSET)[0]
+            if before & 1:
+                self.retries += 1
+                time.sleep(0)
+                continue
+            raw = mm[_PAYLOAD_OFFSET:_PAYLOAD_OFFSET + PAYLOAD_SIZE]
+            if _SEQ.unpack_from(mm, _SEQ_OFFSET)[0] == before:
+                if before == 0:
+                    return None
+                values = list(_PAYLOAD.unpack(raw))
+                if math.isnan(values[2]):
+                    values[2] = None
+                values[13] = STATUS_NAMES[values[13]] if values[13] < len(STATUS_NAMES) else "?"
+                values[14] = bool(values[14])
+                return LiveState(*values)
+            self.retries += 1
+        return None
+
+    def close(self):
+        self._mm.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the sequencer's live shared state.")
+    parser.add_argument("path", nargs="?", default=None)
+    parser.add_argument("--data-dir", default=None, help="kettlebrain-data folder whose state to watch")
+    parser.add_argument("--rate", type=float, default=0, help="keep printing at this many Hz")
+    args = parser.parse_args(argv)
+    try:
+        reader = SharedStateReader(args.path or default_state_path(args.data_dir))
+    except (OSError, ValueError) as e:
+        print(f"Cannot open state block: {e}", file=sys.stderr)
+        return 1
+    try:
+        while True:
+            state = reader.read()
+            if state is not None:
+                temp = "--" if state.temp_f is None else f"{state.temp_f:.1f}"
+                print(f"{state.status:<10} step {state.step_index:>2}  {temp:>6}F -> {state.target_f:.1f}F  "
+                      f"{state.watts:>5.0f}W req / {state.actual_watts:>5.0f}W  relays {state.relay_mask:03b}  "
+                      f"{state.kwh:.3f} kWh  alert #{state.alert_id}", flush=True)
+            if args.rate <= 0:
+                return 0
+            time.sleep(1.0 / args.rate)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
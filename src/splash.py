@@ -0,0 +1,55 @@
+"""
+kettlebrain app
+splash.py
+
+Tkinter "loading" window shown while Kivy starts. Kept in its own tiny module
+so main.py can fork it off before importing Kivy.
+"""
+
+
+def run_splash_screen(queue):
+    """
+    Runs a standalone Tkinter loading dialog in a separate process.
+    This appears immediately, independent of Kivy's loading time.
+    """
+    import tkinter as tk
+
+    try:
+        root = tk.Tk()
+        # Remove window decorations (frameless)
+        root.overrideredirect(True)
+        # Keep on top of the launching Kivy window
+        root.attributes('-topmost', True)
+
+        # Calculate center position
+        width = 300
+        height = 80
+        screen_width = root.winfo_screenwidth()
+        screen_height = root.winfo_screenheight()
+        x = (screen_width // 2) - (width // 2)
+        y = (screen_height // 2) - (height // 2)
+
+        root.geometry(f'{width}x{height}+{x}+{y}')
+        root.configure(bg='#222222')
+
+        # Add a simple styled frame
+        frame = tk.Frame(root, bg='#222222', highlightbackground='#FFC107', highlightthickness=2)
+        frame.pack(fill='both', expand=True)
+
+        lbl = tk.Label(frame, text="KettleBrain app loading...", font=("Arial", 16, "bold"), fg="#FFC107", bg="#222222")
+        lbl.pack(expand=True)
+
+        # Force a draw immediately
+        root.update()
+
+        # Check for kill signal every 100ms
+        def check_kill():
+            if not queue.empty():
+                root.destroy()
+            else:
+                root.after(100, check_kill)
+
+        root.after(100, check_kill)
+        root.mainloop()
+    except Exception as e:
+        print(f"Splash screen error: {e}")
@@ -0,0 +1,156 @@
+"""
+kettlebrain app
+startup_bench.py
+
+Startup regression benchmark. Each case runs in a fresh interpreter so
+import caches don't hide regressions:
+
+    imports     backend modules the app needs before it can heat (-X importtime)
+    kivy        Kivy modules main.py imports (skipped if Kivy isn't installed)
+    settings    SettingsManager first boot (empty data dir) and warm boot
+
+Usage:
+    python startup_bench.py [--repeats N] [--save] [--baseline PATH] [--tolerance 0.2]
+
+--save records the results as the baseline; otherwise results are compared
+with it and the exit status is 1 if any case got slower than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from log_query import default_data_dir
+
+BASELINE_FILE = "startup-bench-baseline.json"
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BACKEND_MODULES = [
+    "settings_manager", "hardware_interface", "relay_control", "sequence_manager",
+    "brew_math", "main_view_model", "ui_governor", "startup_profiler",
+]
+KIVY_MODULES = [
+    "kivy.app", "kivy.uix.screenmanager", "kivy.uix.boxlayout", "kivy.uix.popup",
+    "kivy.uix.textinput", "kivy.lang", "kivy.uix.slider", "kivy.uix.scrollview",
+    "kivy.uix.spinner", "kivy.graphics",
+]
+
+_SETTINGS_SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+from settings_manager import SettingsManager
+SettingsManager(sys.argv[1])
+print(time.perf_counter() - t0)
+"""
+
+
+def _run(args, env=None):
+    return subprocess.run([sys.executable] + args, cwd=SRC_DIR, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+def time_imports(modules):
+    """Cumulative import time (seconds) of the given top-level modules, or None if they fail."""
+    proc = _run(["-X", "importtime", "-c", "import " + ", ".join(modules)])
+    if proc.returncode != 0:
+        return None
+    wanted = set(modules)
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or parts[1].strip() == "cumulative":
+            continue
+        name = parts[2].rstrip()
+        # Top-level entries have a single leading space; nested ones are indented further
+        if not name.startswith("  ") and name.strip() in wanted:
+            total_us += int(parts[1])
+    return total_us / 1e6
+
+
+def time_settings(base_dir):
+    proc = _run(["-c", _SETTINGS_SNIPPET, base_dir])
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def run(repeats=3):
+    results = {}
+
+    def best(label, func):
+        values = [v for v in (func() for _ in range(repeats)) if v is not None]
+        if values:
+            results[label] = min(values)
+            print(f"  {label:<24} {results[label] * 1000:9.1f} ms (best of {repeats})")
+        else:
+            print(f"  {label:<24} {'skipped':>9}")
+
+    print(f"[StartupBench] python {sys.version.split()[0]}")
+    best("imports.backend", lambda: time_imports(BACKEND_MODULES))
+    best("imports.kivy", lambda: time_imports(KIVY_MODULES))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def first_boot():
+            base = tempfile.mkdtemp(dir=tmp)
+            return time_settings(base)
+        best("settings.first_boot", first_boot)
+
+        warm_base = tempfile.mkdtemp(dir=tmp)
+        time_settings(warm_base)
+        best("settings.warm_boot", lambda: time_settings(warm_base))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Prints the change per case; returns the list of regressed case names."""
+    regressed = []
+    for label, value in results.items():
+        base = baseline.get(label)
+        if not base:
+            continue
+        change = (value - base) / base
+        flag = ""
+        if change > tolerance:
+            flag = "  <-- REGRESSION"
+            regressed.append(label)
+        print(f"  {label:<24} {base * 1000:9.1f} -> {value * 1000:9.1f} ms ({change * 100:+.0f}%){flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KettleBrain startup regression benchmark")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--save", action="store_true", help="store results as the new baseline")
+    parser.add_argument("--baseline", default=os.path.join(default_data_dir(), BASELINE_FILE))
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeats)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[StartupBench] Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("[StartupBench] No baseline yet (run with --save)")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"[StartupBench] vs baseline (tolerance {args.tolerance * 100:.0f}%)")
+    regressed = compare(results, baseline, args.tolerance)
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
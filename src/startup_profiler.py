@@ -0,0 +1,143 @@
+"""
+kettlebrain app
+startup_profiler.py
+
+Startup instrumentation. mark() records named phases as seconds since the
+process was created (read from /proc, so interpreter start-up is included).
+With KETTLEBRAIN_PROFILE_STARTUP=1 in the environment it also times every
+first import, like `python -X importtime`, until the report is written.
+
+write_report() saves startup-report.txt to the data dir and appends the
+phase timings to startup-history.jsonl for comparing boots over time.
+"""
+
+import builtins
+import json
+import os
+import sys
+import time
+
+REPORT_FILE = "startup-report.txt"
+HISTORY_FILE = "startup-history.jsonl"
+ENV_FLAG = "KETTLEBRAIN_PROFILE_STARTUP"
+
+
+def _process_start_epoch():
+    """Wall-clock time this process was created (Linux), else now."""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # Field 22 (starttime, in clock ticks since boot) follows the ')' of the comm field
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        # Age from the boot clock: /proc/stat's btime is whole seconds, up to 1 s off
+        age = _seconds_since_boot() - start_ticks / os.sysconf("SC_CLK_TCK")
+        return time.time() - age
+    except Exception:
+        return time.time()
+
+
+def _seconds_since_boot():
+    try:
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    except (AttributeError, OSError):
+        with open("/proc/uptime", "r") as f:
+            return float(f.read().split()[0])
+
+
+PROCESS_START = _process_start_epoch()
+_phases = []            # [(name, seconds since process start)]
+_imports = []           # [(depth, module, self_us, cumulative_us)] in completion order
+_import_state = {"orig": None, "depth": 0}
+
+
+def mark(phase):
+    _phases.append((phase, time.time() - PROCESS_START))
+
+
+def phases():
+    return list(_phases)
+
+
+def elapsed(phase):
+    for name, t in _phases:
+        if name == phase:
+            return t
+    return None
+
+
+# --- IMPORT TIMER ---
+
+def maybe_install_import_timer():
+    if os.environ.get(ENV_FLAG):
+        install_import_timer()
+
+
+def install_import_timer():
+    if _import_state["orig"] is not None:
+        return
+    orig = builtins.__import__
+    _import_state["orig"] = orig
+    child_time = [0.0]
+
+    def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return orig(name, globals, locals, fromlist, level)
+        depth = _import_state["depth"]
+        _import_state["depth"] = depth + 1
+        outer_children = child_time[0]
+        child_time[0] = 0.0
+        start = time.perf_counter()
+        try:
+            return orig(name, globals, locals, fromlist, level)
+        finally:
+            cumulative = time.perf_counter() - start
+            own = cumulative - child_time[0]
+            _imports.append((depth, name, int(own * 1e6), int(cumulative * 1e6)))
+            child_time[0] = outer_children + cumulative
+            _import_state["depth"] = depth
+
+    builtins.__import__ = timed_import
+
+
+def uninstall_import_timer():
+    if _import_state["orig"] is not None:
+        builtins.__import__ = _import_state["orig"]
+        _import_state["orig"] = None
+
+
+# --- REPORTING ---
+
+def summary():
+    return ", ".join(f"{name} {t * 1000:.0f} ms" for name, t in _phases)
+
+
+def write_report(data_dir, top=40):
+    """Writes the phase table and (if timed) the slowest imports. Returns the report path."""
+    uninstall_import_timer()
+    path = os.path.join(data_dir, REPORT_FILE)
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# KettleBrain startup report {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write("# phase                         ms since process start\n")
+            for name, t in _phases:
+                f.write(f"{name:<32}{t * 1000:10.0f}\n")
+
+            if _imports:
+                f.write(f"\n# slowest imports (top {top} by cumulative time)\n")
+                f.write("import time: self [us] | cumulative | imported package\n")
+                for depth, name, own, cumulative in sorted(_imports, key=lambda r: -r[3])[:top]:
+                    f.write(f"import time: {own:>9} | {cumulative:>10} | {'  ' * depth}{name}\n")
+
+                f.write("\n# full import tree (-X importtime order)\n")
+                for depth, name, own, cumulative in _imports:
+                    f.write(f"import time: {own:>9} | {cumulative:>10} | {'  ' * depth}{name}\n")
+
+        with open(os.path.join(data_dir, HISTORY_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "ts": int(time.time()),
+                "phases": {name: round(t, 4) for name, t in _phases},
+            }) + "\n")
+    except OSError as e:
+        print(f"[Startup] Could not write report: {e}")
+        return None
+    return path
@@ -0,0 +1,202 @@
+"""
+kettlebrain app
+telemetry.py
+
+High-rate binary telemetry log. Every control tick is stored as a fixed-size
+record in a preallocated, mmap-backed ring file that wraps around when full,
+so the last few hours of temperature/power behaviour are always on disk.
+
+Export: python telemetry.py <ring_file> [out.csv]
+"""
+
+import csv
+import math
+import mmap
+import os
+import struct
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+from profile_data import SequenceStatus
+
+TELEMETRY_FILE = "kettlebrain-telemetry.ring"
+DEFAULT_CAPACITY = 216000  # 6 hours at the 10 Hz control rate
+
+_MAGIC = b"KBTL"
+_VERSION = 1
+
+# magic, version, record size, capacity, total records written
+_HEADER = struct.Struct("<4sHHIQ")
+HEADER_SIZE = 32
+_COUNT_OFFSET = 12
+_COUNT = struct.Struct("<Q")
+
+# timestamp, temp F, target F, requested watts, pid output %, relay bitmask, status code
+_RECORD = struct.Struct("<dffffBB2x")
+RECORD_SIZE = _RECORD.size
+
+# Status codes are the enum's declaration order; never reorder SequenceStatus.
+STATUS_CODES = {status: i for i, status in enumerate(SequenceStatus)}
+STATUS_NAMES = [status.value for status in SequenceStatus]
+
+# Relay bitmask
+RELAY_BITS = (("Heater1", 1), ("Heater2", 2), ("Heater3", 4))
+
+TelemetryRecord = namedtuple(
+    "TelemetryRecord",
+    ["timestamp", "temp_f", "target_f", "watts", "pid_output", "relay_mask", "status"]
+)
+
+
+def relay_mask(relay_states):
+    """Packs a RelayControl.relay_states dict into a bitmask."""
+    mask = 0
+    for name, bit in RELAY_BITS:
+        if relay_states.get(name, False):
+            mask |= bit
+    return mask
+
+
+class TelemetryRecorder:
+    """
+    Writer side. Only the control thread calls record(); it packs straight into
+    the mapped file so no bytes objects are built per tick.
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = int(capacity)
+        self._file = None
+        self._mm = None
+        self._count = 0
+        self._open()
+
+    def _open(self):
+        size = HEADER_SIZE + self.capacity * RECORD_SIZE
+        reuse = False
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) == size:
+            try:
+                with open(self.path, 'rb') as f:
+                    magic, version, rec_size, capacity, count = _HEADER.unpack(f.read(_HEADER.size))
+                reuse = (magic == _MAGIC and version == _VERSION
+                         and rec_size == RECORD_SIZE and capacity == self.capacity)
+            except Exception:
+                reuse = False
+
+        if reuse:
+            self._file = open(self.path, 'r+b')
+            self._count = count
+        else:
+            # Preallocate the whole ring up front
+            self._file = open(self.path, 'w+b')
+            self._file.truncate(size)
+            self._count = 0
+
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        if not reuse:
+            _HEADER.pack_into(self._mm, 0, _MAGIC, _VERSION, RECORD_SIZE, self.capacity, 0)
+            print(f"[Telemetry] Created ring file ({self.capacity} records, {size // 1024} KiB)")
+
+    def record(self, timestamp, temp_f, target_f, watts, pid_output, mask, status):
+        mm = self._mm
+        if mm is None:
+            return
+        n = self._count
+        _RECORD.pack_into(
+            mm, HEADER_SIZE + (n % self.capacity) * RECORD_SIZE,
+            timestamp,
+            math.nan if temp_f is None else temp_f,
+            target_f, watts, pid_output, mask,
+            STATUS_CODES.get(status, 0)
+        )
+        # Publish the record only after its bytes are in place
+        n += 1
+        self._count = n
+        _COUNT.pack_into(mm, _COUNT_OFFSET, n)
+
+    def flush(self):
+        if self._mm is not None:
+            self._mm.flush()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TelemetryReader:
+    """
+    Reader side. Safe to use while the recorder is running; records that are
+    overwritten mid-read are dropped rather than returned torn.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def records(self, since=None, until=None):
+        """Yields TelemetryRecord oldest first, optionally bounded by epoch seconds."""
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, version, rec_size, capacity, count = _HEADER.unpack_from(mm, 0)
+                if magic != _MAGIC or version != _VERSION or rec_size != RECORD_SIZE:
+                    raise ValueError(f"{self.path} is not a telemetry ring file")
+
+                for n in range(max(0, count - capacity), count):
+                    values = _RECORD.unpack_from(mm, HEADER_SIZE + (n % capacity) * RECORD_SIZE)
+                    # Writer lapped us: this slot now holds a newer record
+                    live_count = _COUNT.unpack_from(mm, _COUNT_OFFSET)[0]
+                    if n < live_count - capacity:
+                        continue
+
+                    ts = values[0]
+                    if since is not None and ts < since:
+                        continue
+                    if until is not None and ts > until:
+                        break
+
+                    temp = None if math.isnan(values[1]) else values[1]
+                    code = values[6]
+                    status = STATUS_NAMES[code] if code < len(STATUS_NAMES) else "UNKNOWN"
+                    yield TelemetryRecord(ts, temp, values[2], values[3], values[4], values[5], status)
+
+    def __iter__(self):
+        return self.records()
+
+    def export_csv(self, out_path, since=None, until=None):
+        """Writes records to a CSV file. Returns the number of rows written."""
+        rows = 0
+        with open(out_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Timestamp", "Epoch", "Temp(F)", "Target(F)", "Power(W)",
+                             "PID(%)", "Heater1", "Heater2", "Heater3", "Status"])
+            for r in self.records(since, until):
+                writer.writerow([
+                    datetime.fromtimestamp(r.timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+                    f"{r.timestamp:.3f}",
+                    f"{r.temp_f:.2f}" if r.temp_f is not None else "",
+                    f"{r.target_f:.1f}",
+                    f"{r.watts:.0f}",
+                    f"{r.pid_output:.1f}",
+                    int(bool(r.relay_mask & 1)),
+                    int(bool(r.relay_mask & 2)),
+                    int(bool(r.relay_mask & 4)),
+                    r.status
+                ])
+                rows += 1
+        return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python telemetry.py <ring_file> [out.csv]")
+        sys.exit(1)
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".csv"
+    n = TelemetryReader(src).export_csv(dst)
+    print(f"[Telemetry] Exported {n} records to {dst}")
@@ -0,0 +1,146 @@
+"""
+kettlebrain app
+timer_service.py
+
+Deadline heap for the sequencer's timed events (CSV interval, alert nag,
+delayed-start recalculation, temperature-latch debounce). The control loop
+calls run_due(now) once per tick; with nothing due that is a single
+comparison against the earliest deadline, however many timers exist.
+
+Times are time.monotonic() seconds. Timers are cancelled lazily (flagged and
+skipped when they reach the top of the heap). Registering or cancelling from
+another thread (UI) is safe; callbacks always run on the thread calling
+run_due(). pending() lists what is scheduled, for debugging and tests.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class Timer:
+    __slots__ = ("name", "deadline", "interval", "callback", "cancelled", "fired")
+
+    def __init__(self, name, deadline, interval, callback):
+        self.name = name
+        self.deadline = deadline
+        self.interval = interval    # None for one-shot
+        self.callback = callback
+        self.cancelled = False
+        self.fired = 0
+
+    @property
+    def active(self):
+        return not self.cancelled and (self.interval is not None or self.fired == 0)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def __repr__(self):
+        kind = f"every {self.interval:g}s" if self.interval is not None else "once"
+        return f"<Timer {self.name} @{self.deadline:.1f} {kind}>"
+
+
+class TimerService:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = []             # (deadline, seq, Timer)
+        self._seq = itertools.count()
+        self._named = {}            # name -> Timer (latest registration wins)
+        self._lock = threading.Lock()
+        self.fired = 0
+
+    # --- REGISTRATION ---
+
+    def call_at(self, deadline, callback, name=None):
+        """One-shot at a monotonic deadline. A timer with the same name is replaced."""
+        return self._add(Timer(name or getattr(callback, "__name__", "timer"), deadline, None, callback))
+
+    def call_later(self, delay, callback, name=None):
+        return self.call_at(self.clock() + delay, callback, name)
+
+    def call_every(self, interval, callback, name=None, first_delay=None):
+        """Periodic timer; the first run is after first_delay (default: one interval)."""
+        interval = float(interval)
+        start = self.clock() + (interval if first_delay is None else first_delay)
+        return self._add(Timer(name or getattr(callback, "__name__", "timer"), start, interval, callback))
+
+    def cancel(self, name):
+        with self._lock:
+            timer = self._named.pop(name, None)
+        if timer:
+            timer.cancel()
+
+    def get(self, name):
+        timer = self._named.get(name)
+        return timer if timer is not None and timer.active else None
+
+    def _add(self, timer):
+        with self._lock:
+            old = self._named.get(timer.name)
+            if old is not None:
+                old.cancel()
+            self._named[timer.name] = timer
+            heapq.heappush(self._heap, (timer.deadline, next(self._seq), timer))
+        return timer
+
+    # --- DISPATCH ---
+
+    def run_due(self, now=None):
+        """Runs every timer whose deadline has passed. Returns how many fired."""
+        if now is None:
+            now = self.clock()
+        heap = self._heap
+        if not heap or heap[0][0] > now:
+            return 0
+
+        count = 0
+        while True:
+            with self._lock:
+                if not heap or heap[0][0] > now:
+                    break
+                _, _, timer = heapq.heappop(heap)
+                if timer.cancelled:
+                    continue
+                if timer.interval is not None:
+                    # Skip missed periods rather than firing a burst to catch up
+                    timer.deadline += timer.interval
+                    if timer.deadline <= now:
+                        timer.deadline = now + timer.interval
+                    heapq.heappush(heap, (timer.deadline, next(self._seq), timer))
+                elif self._named.get(timer.name) is timer:
+                    del self._named[timer.name]
+            timer.fired += 1
+            count += 1
+            try:
+                timer.callback()
+            except Exception as e:
+                print(f"[Timers] {timer.name} failed: {e}")
+        self.fired += count
+        return count
+
+    # --- INSPECTION ---
+
+    def next_deadline(self):
+        with self._lock:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def pending(self, now=None):
+        """[(name, seconds until due, interval or None)] soonest first."""
+        if now is None:
+            now = self.clock()
+        with self._lock:
+            timers = sorted((t for t in self._named.values() if t.active), key=lambda t: t.deadline)
+        return [(t.name, t.deadline - now, t.interval) for t in timers]
+
+    def describe(self, now=None):
+        rows = self.pending(now)
+        if not rows:
+            return "no timers"
+        return ", ".join(
+            f"{name} in {due:.1f}s" + (f" (every {interval:g}s)" if interval is not None else "")
+            for name, due, interval in rows
+        )
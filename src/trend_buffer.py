@@ -0,0 +1,132 @@
+"""
+kettlebrain app
+trend_buffer.py
+
+Live trend data for the main screen chart.
+
+TrendBuffer is a fixed-capacity ring of parallel arrays written by the
+control thread once per tick (no per-sample objects). MinMaxDecimator reduces
+whatever slice of it the chart shows to one (min, max) pair per pixel column,
+updating incrementally so each redraw only touches samples that arrived since
+the previous one, whether the window is 10 minutes or 4 hours.
+"""
+
+import math
+from array import array
+from collections import deque
+
+DEFAULT_CAPACITY = 144000  # 4 hours at the 10 Hz control rate
+
+_NAN = float("nan")
+
+
+class TrendBuffer:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = int(capacity)
+        self.ts = array('d', bytes(8 * self.capacity))
+        self.temp = array('f', bytes(4 * self.capacity))
+        self.target = array('f', bytes(4 * self.capacity))
+        self.watts = array('f', bytes(4 * self.capacity))
+        # Total samples ever written; slot = count % capacity
+        self.count = 0
+
+    def append(self, ts, temp, target, watts):
+        """Control thread only. temp may be None (sensor fault)."""
+        i = self.count % self.capacity
+        self.ts[i] = ts
+        self.temp[i] = _NAN if temp is None else temp
+        self.target[i] = target
+        self.watts[i] = watts
+        self.count += 1
+
+    def oldest_index(self):
+        return max(0, self.count - self.capacity)
+
+    def latest(self):
+        """Returns (ts, temp, target, watts) of the newest sample, or None."""
+        if self.count == 0:
+            return None
+        i = (self.count - 1) % self.capacity
+        return self.ts[i], self.temp[i], self.target[i], self.watts[i]
+
+    def find_index(self, since_ts):
+        """First absolute sample index with ts >= since_ts (binary search over the ring)."""
+        lo, hi = self.oldest_index(), self.count
+        cap = self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts[mid % cap] < since_ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class MinMaxDecimator:
+    """
+    Keeps one column per (window / columns) seconds, aligned to absolute time.
+    Each column holds [col_id, temp_min, temp_max, target_last, watts_max].
+    """
+
+    def __init__(self, buffer, window_s=600.0, columns=400):
+        self.buffer = buffer
+        self.columns = deque()
+        self._next = 0
+        self.configure(window_s, columns)
+
+    def configure(self, window_s, columns):
+        """Changing the window or width rebuilds once from the buffer."""
+        self.window_s = float(window_s)
+        self.n_columns = max(2, int(columns))
+        self.col_width = self.window_s / self.n_columns
+        self.columns.clear()
+        self._next = None
+
+    def update(self, now):
+        """Folds in new samples and drops columns that scrolled out. Returns the column deque."""
+        buf = self.buffer
+        start_ts = now - self.window_s
+        if self._next is None:
+            self._next = buf.find_index(start_ts)
+        # Samples overwritten before we saw them are skipped
+        idx = max(self._next, buf.oldest_index())
+        end = buf.count
+
+        cap = buf.capacity
+        width = self.col_width
+        cols = self.columns
+        ts_a, temp_a, target_a, watts_a = buf.ts, buf.temp, buf.target, buf.watts
+        isnan = math.isnan
+
+        while idx < end:
+            i = idx % cap
+            idx += 1
+            col_id = int(ts_a[i] // width)
+            temp = temp_a[i]
+            if not cols or cols[-1][0] != col_id:
+                if cols and col_id < cols[-1][0]:
+                    continue  # clock went backwards; ignore
+                cols.append([col_id, _NAN, _NAN, target_a[i], watts_a[i]])
+            col = cols[-1]
+            if not isnan(temp):
+                if isnan(col[1]) or temp < col[1]: col[1] = temp
+                if isnan(col[2]) or temp > col[2]: col[2] = temp
+            col[3] = target_a[i]
+            if watts_a[i] > col[4]: col[4] = watts_a[i]
+        self._next = end
+
+        first_col = int(start_ts // width)
+        while cols and cols[0][0] < first_col:
+            cols.popleft()
+        return cols
+
+    def value_range(self):
+        """(lo, hi) over visible temps and targets, or None when empty."""
+        lo = hi = None
+        for _cid, tmin, tmax, target, _w in self.columns:
+            for v in (tmin, tmax, target if target > 0 else _NAN):
+                if math.isnan(v):
+                    continue
+                if lo is None or v < lo: lo = v
+                if hi is None or v > hi: hi = v
+        return None if lo is None else (lo, hi)
@@ -0,0 +1,127 @@
+"""
+kettlebrain app
+ui_governor.py
+
+Picks how often the main screen should refresh, and keeps CPU accounting per
+refresh mode so the savings can be measured on the Pi:
+
+    active  10 Hz   recent touch (last 10 s) or an alert waiting for the user
+    steady  2 Hz    a brew or manual heat is running, no interaction
+            1 Hz    idle / delayed wait / complete
+    blank   off     no touch for screen_timeout seconds; the app blanks the
+                    display and skips all rendering until the next touch
+
+Kivy-free: the app owns the Clock event, the touch hook and the blanking.
+"""
+
+import glob
+import time
+
+ACTIVE = "active"
+STEADY = "steady"
+BLANK = "blank"
+MODES = (ACTIVE, STEADY, BLANK)
+
+ACTIVE_INTERVAL = 0.1
+STEADY_INTERVAL = 0.5
+IDLE_INTERVAL = 1.0
+BLANK_INTERVAL = 1.0      # still polled (no rendering) so an alert can wake the screen
+INTERACTION_HOLD_S = 10.0
+
+
+class UiRateGovernor:
+    def __init__(self, screen_timeout=300):
+        self.screen_timeout = screen_timeout
+        self.last_touch = time.monotonic()
+        self.mode = ACTIVE
+        self.interval = ACTIVE_INTERVAL
+
+        # mode -> [wall seconds, process cpu seconds]
+        self._usage = {m: [0.0, 0.0] for m in MODES}
+        self._mark_wall = time.monotonic()
+        self._mark_cpu = time.process_time()
+
+    def set_screen_timeout(self, seconds):
+        try:
+            self.screen_timeout = float(seconds)
+        except (TypeError, ValueError):
+            self.screen_timeout = 0
+
+    def touch(self, now=None):
+        """Records interaction. Returns True if the screen was blanked (caller should swallow the touch)."""
+        self.last_touch = time.monotonic() if now is None else now
+        was_blank = (self.mode == BLANK)
+        if self.mode != ACTIVE:
+            self._switch(ACTIVE, ACTIVE_INTERVAL)
+        return was_blank
+
+    def decide(self, running, alert_active, now=None):
+        """
+        running: a brew / manual heat is in progress.
+        alert_active: something is waiting on the user (always wakes the screen).
+        Returns (mode, interval).
+        """
+        if now is None:
+            now = time.monotonic()
+        idle_for = now - self.last_touch
+
+        if alert_active or idle_for < INTERACTION_HOLD_S:
+            mode, interval = ACTIVE, ACTIVE_INTERVAL
+        elif self.screen_timeout and self.screen_timeout > 0 and idle_for >= self.screen_timeout:
+            mode, interval = BLANK, BLANK_INTERVAL
+        elif running:
+            mode, interval = STEADY, STEADY_INTERVAL
+        else:
+            mode, interval = STEADY, IDLE_INTERVAL
+
+        if mode != self.mode or interval != self.interval:
+            self._switch(mode, interval)
+        return mode, interval
+
+    def _switch(self, mode, interval):
+        self._account()
+        self.mode = mode
+        self.interval = interval
+
+    def _account(self):
+        wall = time.monotonic()
+        cpu = time.process_time()
+        usage = self._usage[self.mode]
+        usage[0] += wall - self._mark_wall
+        usage[1] += cpu - self._mark_cpu
+        self._mark_wall = wall
+        self._mark_cpu = cpu
+
+    # --- REPORTING ---
+
+    def cpu_report(self):
+        """mode -> (seconds spent in mode, whole-process CPU % of one core while in it)."""
+        self._account()
+        report = {}
+        for mode, (wall, cpu) in self._usage.items():
+            report[mode] = (wall, (cpu / wall * 100.0) if wall > 0 else 0.0)
+        return report
+
+    def summary(self):
+        parts = []
+        for mode, (wall, pct) in self.cpu_report().items():
+            if wall > 0:
+                parts.append(f"{mode} {wall / 60.0:.1f} min @ {pct:.1f}% CPU")
+        return ", ".join(parts) if parts else "no data"
+
+
+def set_display_power(on):
+    """
+    Switches the panel backlight through sysfs (official Pi touchscreen and most
+    DSI panels). Returns False if no writable backlight was found, in which
+    case the app falls back to a black overlay.
+    """
+    done = False
+    for path in glob.glob("/sys/class/backlight/*/bl_power"):
+        try:
+            with open(path, "w") as f:
+                f.write("0" if on else "1")
+            done = True
+        except OSError:
+            pass
+    return done
@@ -0,0 +1,620 @@
+"""
+kettlebrain app
+web_api.py
+
+Local HTTP + WebSocket API (stdlib asyncio, no web framework) so a phone or
+another screen can watch and drive the kettle. Runs its own event loop on a
+background thread inside the touchscreen app or kettle_daemon.py.
+
+REST (JSON; one request per connection):
+    GET   /api/status                   state snapshot (same fields as the socket daemon)
+    GET   /api/schedule                 projected step times and energy
+    GET   /api/commands                 command list
+    POST  /api/commands/<name>          body: JSON args, e.g. {"temp_f": 152}
+    GET   /api/profiles                 [{id, name}]
+    GET   /api/profiles/<id>            full profile
+    POST  /api/profiles/<id>/load
+    GET   /api/settings[/<section>]
+    PATCH /api/settings/<section>       body: {key: value}; existing keys only, not PROTECTED_SETTINGS
+    GET   /api/sessions                 brew sessions (log_query.discover_sessions)
+    GET   /api/logs?session=&since=&until=&mode=&step=&format=csv|json|ndjson   (streamed)
+
+WebSocket /ws[?rate=HZ]:
+    server -> {"type": "state", "full": true, "state": {...}}  on connect
+              {"type": "diff", "state": {changed fields}}       at most rate Hz (default 2)
+              {"type": "event", "event": "status_changed", ...}  sequencer events
+              {"type": "reply", "id": ..., "ok": ..., "result"/"error": ...}
+    client -> {"id": 1, "cmd": "pause", "args": {}}               any /api/commands name
+
+The server holds a single event-bus subscription and builds at most one
+snapshot per SNAPSHOT_MIN_S however many clients are connected; each client
+only costs a dict diff and its own send rate. If web_api_token is set, every
+request needs "Authorization: Bearer <token>" or ?token=<token>.
+
+The server listens on 127.0.0.1 by default and refuses to start on any other
+address without a token. The token itself is never returned by GET
+/api/settings, and the hardware/safety keys (PROTECTED_SETTINGS) cannot be
+changed over HTTP (a remote client could otherwise rewire the relays or unlock
+the API).
+
+Browser guards, since a web page open on the Pi can reach loopback:
+  - POST/PATCH must be Content-Type: application/json (a cross-site form or
+    text/plain POST is sent without a CORS preflight)
+  - the Host header must name this server (defeats DNS rebinding)
+  - an Origin header, when sent, must be this server (POST/PATCH and /ws)
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import http
+import ipaddress
+import json
+import socket
+import struct
+import threading
+import time
+import urllib.parse
+from collections import deque, namedtuple
+from datetime import datetime
+
+import event_bus
+import log_query
+from kettle_daemon import ControlCommands, CommandError, status_snapshot, encode
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_RATE_HZ = 2.0
+MAX_RATE_HZ = 10.0
+SNAPSHOT_MIN_S = 0.1        # shared snapshot rebuild limit (control tick rate)
+HEADER_TIMEOUT_S = 10.0
+MAX_BODY = 1024 * 1024
+MAX_WS_FRAME = 64 * 1024
+PENDING_EVENTS = 64         # per WebSocket client; oldest dropped
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_WS_TEXT, _WS_CLOSE, _WS_PING, _WS_PONG = 0x1, 0x8, 0x9, 0xA
+
+Request = namedtuple("Request", "method path query headers body")
+
+# Settings never exposed (GET) or never writable (PATCH) over HTTP
+HIDDEN_SETTINGS = frozenset(["web_api_token"])
+PROTECTED_SETTINGS = frozenset([
+    "heater1_gpio", "heater2_gpio", "heater3_gpio", "pump_gpio", "buzzer_gpio",
+    "relay_active_high", "relay_logic_configured", "temp_sensor_id", "sensor_type", "dev_mode",
+    "controlled_shutdown", "auto_start_enabled", "auto_resume_enabled",
+    "enable_web_api", "web_api_host", "web_api_port", "web_api_token",
+])
+MUTATING_METHODS = ("POST", "PATCH", "PUT", "DELETE")
+_LOOPBACK_NAMES = ("localhost", "127.0.0.1", "::1")
+_WILDCARD_HOSTS = ("", "0.0.0.0", "::")
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _split_host(value, default_port):
+    """'host[:port]' (IPv6 in brackets) -> (lowercase host, port); port None if unparsable."""
+    try:
+        url = urllib.parse.urlsplit("//" + value)
+        return (url.hostname or "").lower(), url.port or default_port
+    except ValueError:
+        return "", None
+
+
+def _visible(section):
+    if not isinstance(section, dict):
+        return section
+    return {k: v for k, v in section.items() if k not in HIDDEN_SETTINGS}
+
+
+def _query_time(text):
+    """Epoch seconds or an ISO date/time."""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _WsClosed(Exception):
+    pass
+
+
+def _ws_frame(opcode, payload):
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def _ws_read(reader):
+    """One frame -> (opcode, payload). Client frames are masked."""
+    b1, b2 = await reader.readexactly(2)
+    opcode = b1 & 0x0F
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if n > MAX_WS_FRAME or not b1 & 0x80:
+        raise _WsClosed("frame too large or fragmented")
+    mask = await reader.readexactly(4) if b2 & 0x80 else None
+    data = await reader.readexactly(n)
+    if mask and n:
+        key = (mask * (n // 4 + 1))[:n]
+        data = (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+    return opcode, data
+
+
+class _WsClient:
+    def __init__(self, writer, rate_hz):
+        self.writer = writer
+        self.interval = 1.0 / rate_hz
+        self.last = {}
+        self.events = deque(maxlen=PENDING_EVENTS)
+        self.dirty = asyncio.Event()
+        self.diffs = 0
+
+    async def send(self, obj):
+        self.writer.write(_ws_frame(_WS_TEXT, encode(obj)[:-1]))
+        await self.writer.drain()
+
+
+class WebApi:
+    def __init__(self, settings_manager, sequencer, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+        self.settings = settings_manager
+        self.sequencer = sequencer
+        self.commands = ControlCommands(settings_manager, sequencer)
+        self.host = host or DEFAULT_HOST
+        self.port = int(port)
+        self.token = token or None
+        # Host / Origin names that mean "this server"; a wildcard bind also takes any IP literal
+        self._any_ip = self.host.lower() in _WILDCARD_HOSTS
+        self._host_names = self._allowed_host_names()
+
+        self._loop = None
+        self._stop = None
+        self._ready = threading.Event()
+        self._thread = None
+        self._clients = set()
+        self._sub = None
+        self._wake = None
+        self.state = None
+        self._last_snapshot = 0.0
+
+        # --- STATS ---
+        self.requests = 0
+        self.ws_connections = 0
+        self.snapshots = 0
+
+    # --- LIFECYCLE ---
+
+    def start(self, timeout=5.0):
+        """Starts the server thread; returns False if it could not listen."""
+        if not self.token and not _is_loopback(self.host):
+            print(f"[WebApi] Refusing to listen on {self.host} without web_api_token; "
+                  f"set a token or use {DEFAULT_HOST}")
+            return False
+        self._thread = threading.Thread(target=self._run, name="WebApi", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        return self._stop is not None
+
+    def close(self, timeout=2.0):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def summary(self):
+        return (f"{self.requests} requests, {self.ws_connections} websocket clients, "
+                f"{self.snapshots} snapshots")
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            print(f"[WebApi] Server stopped: {e}")
+        finally:
+            self._ready.set()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            print(f"[WebApi] Cannot listen on {self.host}:{self.port}: {e}")
+            return
+        self._stop = asyncio.Event()
+        print(f"[WebApi] Listening on http://{self.host}:{self.port}/")
+        self._ready.set()
+        broadcaster = asyncio.create_task(self._broadcast())
+        try:
+            await self._stop.wait()
+        finally:
+            self._unsubscribe()
+            broadcaster.cancel()
+            server.close()
+            for client in list(self._clients):
+                client.writer.close()
+            await server.wait_closed()
+
+    # --- HTTP ---
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await self._read_request(reader)
+        except HttpError as e:
+            await self._send(writer, e.status, {"error": str(e)})
+            return
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                asyncio.TimeoutError, ConnectionError, ValueError):
+            writer.close()
+            return
+        self.requests += 1
+        try:
+            self._check_origin(request)
+            self._check_token(request)
+            if request.path == "/ws":
+                await self._websocket(request, reader, writer)
+                return
+            await self._route(request, writer)
+        except HttpError as e:
+            await self._send(writer, e.status, {"error": str(e)})
+        except CommandError as e:
+            await self._send(writer, 400, {"error": str(e)})
+        except ConnectionError:
+            writer.close()
+        except Exception as e:
+            print(f"[WebApi] {request.method} {request.path} failed: {e}")
+            await self._send(writer, 500, {"error": "internal error"})
+
+    async def _read_request(self, reader):
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT_S)
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        url = urllib.parse.urlsplit(target)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        length = int(headers.get("content-length", 0) or 0)
+        if length > MAX_BODY:
+            raise HttpError(413, "request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), urllib.parse.unquote(url.path).rstrip("/") or "/", query, headers, body)
+
+    def _allowed_host_names(self):
+        host = self.host.lower()
+        if _is_loopback(host):
+            return frozenset(_LOOPBACK_NAMES)
+        if host in _WILDCARD_HOSTS:
+            # Names only if they are this machine's; IP literals are checked in _host_allowed
+            name = socket.gethostname().lower()
+            return frozenset(_LOOPBACK_NAMES + (name, name + ".local"))
+        return frozenset([host])
+
+    def _host_allowed(self, value, default_port):
+        name, port = _split_host(value, default_port)
+        if port != self.port:
+            return False
+        if name in self._host_names:
+            return True
+        if self._any_ip:
+            try:
+                ipaddress.ip_address(name)
+                return True
+            except ValueError:
+                return False
+        return False
+
+    def _check_origin(self, request):
+        """Host always; Origin and Content-Type on anything that changes state or opens /ws."""
+        if not self._host_allowed(request.headers.get("host", ""), 80):
+            raise HttpError(403, "unexpected Host header")
+        mutating = request.method in MUTATING_METHODS
+        if not mutating and request.path != "/ws":
+            return
+        origin = request.headers.get("origin")
+        if origin is not None:
+            url = urllib.parse.urlsplit(origin)
+            if url.scheme != "http" or not self._host_allowed(url.netloc, 80):
+                raise HttpError(403, "cross-origin request refused")
+        if mutating:
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                raise HttpError(415, "Content-Type must be application/json")
+
+    def _check_token(self, request):
+        if not self.token:
+            return
+        supplied = request.query.get("token", "")
+        auth = request.headers.get("authorization", "")
+        if auth.lower().startswith("bearer "):
+            supplied = auth[7:].strip()
+        if not hmac.compare_digest(supplied.encode(), self.token.encode()):
+            raise HttpError(401, "missing or wrong token")
+
+    async def _send(self, writer, status, obj=None, content_type="application/json", body=None):
+        if body is None:
+            body = encode(obj) if obj is not None else b""
+        head = (f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                "Cache-Control: no-store\r\nConnection: close\r\n\r\n")
+        try:
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _call(self, fn, *args):
+        """Runs a blocking call (settings I/O, sequencer command) off the loop."""
+        return await self._loop.run_in_executor(None, fn, *args)
+
+    def _json_body(self, request):
+        if not request.body:
+            return {}
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            raise HttpError(400, "body is not valid JSON")
+        if not isinstance(body, dict):
+            raise HttpError(400, "body must be a JSON object")
+        return body
+
+    async def _route(self, request, writer):
+        parts = request.path.strip("/").split("/")
+        method = request.method
+        if parts[0] != "api" or len(parts) < 2:
+            raise HttpError(404, "not found")
+        resource, rest = parts[1], parts[2:]
+
+        if resource == "status" and method == "GET" and not rest:
+            result = await self._call(status_snapshot, self.sequencer)
+        elif resource == "schedule" and method == "GET" and not rest:
+            result = await self._call(self.commands.cmd_schedule)
+        elif resource == "commands" and method == "GET" and not rest:
+            result = self.commands.cmd_help()
+        elif resource == "commands" and method == "POST" and len(rest) == 1:
+            result = await self._call(self.commands.dispatch, rest[0], self._json_body(request))
+        elif resource == "profiles":
+            result = await self._profiles(method, rest)
+        elif resource == "settings":
+            result = await self._settings(method, rest, request)
+        elif resource == "sessions" and method == "GET" and not rest:
+            sessions = await self._call(log_query.discover_sessions, self.settings.data_dir)
+            result = [{"id": s.session_id, "kind": s.kind, "mode": s.mode,
+                       "started": s.started, "ended": s.ended} for s in sessions]
+        elif resource == "logs" and method == "GET" and not rest:
+            await self._stream_logs(request, writer)
+            return
+        else:
+            raise HttpError(404 if method in ("GET", "POST", "PATCH") else 405, "not found")
+        await self._send(writer, 200, {"ok": True, "result": result})
+
+    async def _profiles(self, method, rest):
+        if method == "GET" and not rest:
+            return await self._call(self.commands.cmd_profiles)
+        if method == "GET" and len(rest) == 1:
+            profile = await self._call(self.settings.get_profile_by_id, rest[0])
+            if profile is None:
+                raise HttpError(404, f"no profile with id {rest[0]}")
+            return profile.to_dict()
+        if method == "POST" and len(rest) == 2 and rest[1] == "load":
+            return await self._call(self.commands.cmd_load_profile, rest[0])
+        raise HttpError(404, "not found")
+
+    async def _settings(self, method, rest, request):
+        if method == "GET" and not rest:
+            return {k: _visible(self.settings.get_section(k))
+                    for k in list(self.settings.settings) if k != "recovery_state"}
+        if not rest or len(rest) != 1 or rest[0] == "recovery_state":
+            raise HttpError(404, "not found")
+        section = self.settings.get_section(rest[0])
+        if not isinstance(section, dict) or not section:
+            raise HttpError(404, f"no settings section {rest[0]}")
+        if method == "GET":
+            return _visible(section)
+        if method != "PATCH":
+            raise HttpError(405, "use GET or PATCH")
+        changes = self._json_body(request)
+        for key, value in changes.items():
+            if key in PROTECTED_SETTINGS:
+                raise HttpError(403, f"{rest[0]}.{key} can only be changed on the kettle")
+            if key not in section:
+                raise HttpError(400, f"unknown setting {rest[0]}.{key}")
+            old = section[key]
+            numeric = (int, float)
+            if old is not None and not (isinstance(value, type(old))
+                                        or (isinstance(old, numeric) and isinstance(value, numeric)
+                                            and not isinstance(value, bool))):
+                raise HttpError(400, f"{rest[0]}.{key} expects {type(old).__name__}")
+        for key, value in changes.items():
+            await self._call(self.settings.set, rest[0], key, value)
+        return _visible(self.settings.get_section(rest[0]))
+
+    async def _stream_logs(self, request, writer):
+        q = request.query
+        fmt = q.get("format", "json")
+        if fmt not in ("csv", "json", "ndjson"):
+            raise HttpError(400, "format must be csv, json or ndjson")
+        try:
+            since = _query_time(q["since"]) if "since" in q else None
+            until = _query_time(q["until"]) if "until" in q else None
+        except ValueError:
+            raise HttpError(400, "bad since/until")
+        rows = log_query.query(
+            self.settings.data_dir,
+            [q["session"]] if "session" in q else None, since, until,
+            [q["mode"]] if "mode" in q else None, q.get("step"))
+        if fmt == "csv":
+            chunks, content_type = log_query.iter_csv_chunks(rows), "text/csv"
+        else:
+            chunks = log_query.iter_json_chunks(rows, lines=(fmt == "ndjson"))
+            content_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+
+        writer.write((f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n"
+                      "Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n").encode("latin-1"))
+        try:
+            while True:
+                # Log files are read on an executor thread, one chunk at a time
+                chunk = await self._call(next, chunks, None)
+                if chunk is None:
+                    break
+                data = chunk.encode("utf-8")
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    # --- WEBSOCKET ---
+
+    async def _websocket(self, request, reader, writer):
+        key = request.headers.get("sec-websocket-key")
+        if request.headers.get("upgrade", "").lower() != "websocket" or not key:
+            raise HttpError(400, "expected a websocket upgrade")
+        try:
+            rate = float(request.query.get("rate", DEFAULT_RATE_HZ))
+        except ValueError:
+            raise HttpError(400, "rate must be a number")
+        rate = min(max(rate, 0.1), MAX_RATE_HZ)
+
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        client = _WsClient(writer, rate)
+        self.ws_connections += 1
+        if not self._clients:
+            self._subscribe()
+        self._clients.add(client)
+        if self.state is None:
+            await self._snapshot()
+        pump = asyncio.create_task(self._pump(client))
+        try:
+            await self._ws_receive(client, reader)
+        except (_WsClosed, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            pump.cancel()
+            self._clients.discard(client)
+            if not self._clients:
+                self._unsubscribe()
+            try:
+                writer.write(_ws_frame(_WS_CLOSE, b""))
+            except Exception:
+                pass
+            writer.close()
+
+    async def _ws_receive(self, client, reader):
+        while True:
+            opcode, data = await _ws_read(reader)
+            if opcode == _WS_CLOSE:
+                return
+            if opcode == _WS_PING:
+                client.writer.write(_ws_frame(_WS_PONG, data))
+                continue
+            if opcode != _WS_TEXT:
+                continue
+            reply = {"type": "reply", "id": None}
+            try:
+                msg = json.loads(data)
+                reply["id"] = msg.get("id")
+                result = await self._call(self.commands.dispatch, msg.get("cmd"), msg.get("args") or {})
+                reply.update(ok=True, result=result)
+            except (ValueError, AttributeError, CommandError) as e:
+                reply.update(ok=False, error=str(e))
+            await client.send(reply)
+
+    async def _pump(self, client):
+        """Per-client sender: queued events, then one diff, at most once per interval."""
+        try:
+            await client.send({"type": "state", "full": True, "state": self.state})
+            client.last = self.state
+            while True:
+                await client.dirty.wait()
+                client.dirty.clear()
+                while client.events:
+                    await client.send(client.events.popleft())
+                state = self.state
+                diff = {k: v for k, v in state.items() if client.last.get(k) != v}
+                if diff:
+                    await client.send({"type": "diff", "state": diff})
+                    client.last = state
+                    client.diffs += 1
+                await asyncio.sleep(client.interval)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    # --- SHARED STATE (one subscription, one snapshot for all clients) ---
+
+    def _subscribe(self):
+        loop, wake = self._loop, self._wake
+        self._sub = self.sequencer.events.subscribe(
+            "web_api", notify=lambda: loop.call_soon_threadsafe(wake.set))
+        wake.set()
+
+    def _unsubscribe(self):
+        if self._sub is not None:
+            self._sub.close()
+            self._sub = None
+        self.state = None
+
+    async def _snapshot(self):
+        # Off the loop: status getters may wait on the control thread
+        self.state = await self._call(status_snapshot, self.sequencer)
+        self._last_snapshot = time.monotonic()
+        self.snapshots += 1
+
+    async def _broadcast(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            sub = self._sub
+            if sub is None:
+                continue
+            for event in sub.drain():
+                if event.kind == event_bus.SAMPLE:
+                    continue
+                msg = {"type": "event", "event": event.kind, "seq": event.seq,
+                       "ts": event.ts, "data": event.data}
+                for client in self._clients:
+                    client.events.append(msg)
+                    client.dirty.set()
+            wait = self._last_snapshot + SNAPSHOT_MIN_S - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            previous = self.state
+            try:
+                await self._snapshot()
+            except Exception as e:
+                print(f"[WebApi] Snapshot failed: {e}")
+                continue
+            if self.state != previous:
+                for client in self._clients:
+                    client.dirty.set()